@@ -1,35 +1,28 @@
 #!/usr/bin/python3
+from typing import Iterator, override
 # user's modules
-from base_switch import BaseSwitch
-import commands
+from L2_switch_session import L2SwitchSession
 
 
 ##### CLASS TO COMMUNICATE WITH L2 SWITCH #####
 
-class L2Switch(BaseSwitch):
-    __user_port: str
+class L2Switch(L2SwitchSession):
+    __user_port: int
 
     # L2 manager inits by user's port and base constructor
     def __init__(self, ipaddress: str, user_port: int, print_output: bool = False) -> None:
-        super().__init__(ipaddress, "L2 switch", print_output)
+        super().__init__(ipaddress, print_output)
 
-        # user's port
+        # user's port is the only watched one
         self.__user_port = user_port
+        self.add_port(user_port)
 
-        # save base model for further diagnosing
-        self._model = commands.SWITCHES[self._model]["base_switch"]
-    
-    # get packages bytes on port
-    def get_packets_port(self) -> tuple[int]:
-        # command
-        command_regex = commands.show_packet(self._model, self.__user_port)
-        self._session.sendline(command_regex["command"])
-        self._session.expect(command_regex["regex"])
-        
-        # save match and quit dynamic page on some switches
-        match = self._session.match
-        if self._model in {"DGS-3200-24", "DES-3200-28"}:
-            self._quit_output()
-        
-        # return rx and tx bytes as integers
-        return tuple(map(int, match.group(2, 3)))
+    # get packages bytes on user's port or on another port of the session
+    @override
+    def get_packets_port(self, user_port: int | None = None, counters: bool = False) -> tuple[int]:
+        return super().get_packets_port(self.__user_port if user_port is None else user_port, counters)
+
+    # stream packages bytes on user's port or on another port of the session
+    @override
+    def stream_packets_port(self, user_port: int | None = None, counters: bool = False) -> Iterator[tuple[int]]:
+        return super().stream_packets_port(self.__user_port if user_port is None else user_port, counters)
@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import threading
+from collections import Counter
+from typing import Iterator, override
+# user's modules
+from base_switch import BaseSwitch
+from device_logic import L2SwitchLogic
+from timings import Timings
+from const import CitySwitch
+
+
+##### CLASS TO SHARE ONE TELNET SESSION WITH L2 SWITCH BETWEEN SEVERAL PORTS #####
+
+class L2SwitchSession(L2SwitchLogic, BaseSwitch):
+    __sessions: dict[str, L2SwitchSession] = {}
+    __ip_locks: dict[str, threading.Lock] = {}
+    __registry_lock: threading.Lock = threading.Lock()
+    __watchers: Counter[int]
+    __lock: threading.RLock
+
+    # session inits by ip only, ports are added by watchers, bytes are read by snmp if it's turned on
+    def __init__(self, ipaddress: str, print_output: bool = False, snmp: bool = CitySwitch.SNMP) -> None:
+        # watched ports with number of watchers, lock for commands from different threads
+        self.__watchers = Counter()
+        self.__lock = threading.RLock()
+
+        super().__init__(ipaddress, "L2 switch", print_output)
+        self._start_snmp(snmp)
+
+    # get existing session with switch or connect once, then watch port
+    @classmethod
+    def acquire(cls, ipaddress: str, user_port: int, print_output: bool = False) -> L2SwitchSession:
+        # lock for this ip only, so other switches connect in parallel
+        with L2SwitchSession.__get_ip_lock(ipaddress):
+            session = L2SwitchSession.__sessions.get(ipaddress)
+            if session is None or not session._session.isalive():
+                session = L2SwitchSession(ipaddress, print_output)
+                L2SwitchSession.__sessions[ipaddress] = session
+            session.add_port(user_port)
+            return session
+
+    # lock of ip for connecting and closing session, created once
+    @staticmethod
+    def __get_ip_lock(ipaddress: str) -> threading.Lock:
+        with L2SwitchSession.__registry_lock:
+            return L2SwitchSession.__ip_locks.setdefault(ipaddress, threading.Lock())
+
+    # one more watcher for port
+    def add_port(self, user_port: int) -> None:
+        with self.__lock:
+            self.__watchers[user_port] += 1
+
+    # one watcher less for port, session is closed when the last watcher leaves
+    def remove_port(self, user_port: int) -> None:
+        # ip's lock first like acquiring, so session isn't closed between finding it and adding port
+        with L2SwitchSession.__get_ip_lock(self._ipaddress), self.__lock:
+            if self.__watchers[user_port] > 1:
+                self.__watchers[user_port] -= 1
+            else:
+                del self.__watchers[user_port]
+
+            # nobody watches, close and forget session
+            if not self.__watchers:
+                self.close()
+                with L2SwitchSession.__registry_lock:
+                    if L2SwitchSession.__sessions.get(self._ipaddress) is self:
+                        del L2SwitchSession.__sessions[self._ipaddress]
+
+    # connection is open, switch may close it e.g. after idle time
+    def isalive(self) -> bool:
+        return self._session is not None and self._session.isalive()
+
+    # watched ports
+    def get_ports(self) -> list[int]:
+        with self.__lock:
+            return list(self.__watchers)
+
+    # get packages bytes per second on port, or cumulative bytes counters
+    def get_packets_port(self, user_port: int, counters: bool = False) -> tuple[int]:
+        # only one command at a time in the session
+        with self.__lock, self._commands():
+            # by snmp if switch has it and port has rate already
+            packets = self.__get_snmp_packets([user_port], counters)
+            if user_port in packets:
+                return packets[user_port]
+            return self.__get_cli_packets_port(user_port, counters)
+
+    # get packages bytes on port by cli command
+    def __get_cli_packets_port(self, user_port: int, counters: bool) -> tuple[int]:
+        # waiting for the lock isn't timed
+        with Timings.span("poll", self._model):
+            # pre-built command, read output's lines until rx and tx are found and output ends
+            self._session.sendline(self._profile.show_packet(user_port))
+            parser = self._packet_parser(counters)
+            self._expect_parser(parser)
+
+            # quit dynamic page on some switches
+            if self._profile.live_page:
+                self._quit_output()
+        return self._packets(parser)
+
+    # packages bytes of every redraw of self-refreshing page at switch's own rate, page stays open until iterator is closed
+    def stream_packets_port(self, user_port: int, counters: bool = False) -> Iterator[tuple[int]]:
+        # session is busy with the page while it's streamed
+        with self.__lock, self._commands():
+            self._session.sendline(self._profile.show_packet(user_port))
+            try:
+                while True:
+                    # wait for next redraw, it's timed apart from polls as it's paced by switch
+                    with Timings.span("refresh", self._model):
+                        parser = self._packet_parser(counters)
+                        self._expect_parser(parser)
+                    yield self._packets(parser)
+
+            # quit page only when streaming stops, if connection is still alive
+            finally:
+                if self._session.isalive():
+                    self._quit_output()
+
+    # get packages bytes on several ports by one command, port as key
+    def get_packets_ports(self, user_ports: list[int], counters: bool = False) -> dict[int, tuple[int]]:
+        # only one command at a time in the session
+        with self.__lock, self._commands():
+            # by snmp if switch has it, the rest by cli
+            packets = self.__get_snmp_packets(user_ports, counters)
+            missing = [user_port for user_port in user_ports if user_port not in packets]
+            if missing:
+                with Timings.span("poll", self._model):
+                    # command for all ports, read output's lines until all ports are found and output ends
+                    self._session.sendline(self._profile.show_packet_ports(missing))
+                    parser = self._ports_parser(missing, counters)
+                    self._expect_parser(parser)
+
+                    # quit dynamic page on some switches
+                    if self._profile.live_page:
+                        self._quit_output()
+                Timings.observe("parse", self._model, parser.seconds)
+
+                # rx and tx bytes as integers from every port's block
+                packets.update(parser.result())
+
+            # ports missing in output (e.g. only first port shown on dynamic page) are asked one by one
+            for user_port in missing:
+                if user_port not in packets:
+                    packets[user_port] = self.__get_cli_packets_port(user_port, counters)
+
+        return {user_port: packets[user_port] for user_port in user_ports}
+
+    # ports' bytes by snmp, nothing if switch has no snmp or snmp failed
+    def __get_snmp_packets(self, user_ports: list[int], counters: bool) -> dict[int, tuple[int]]:
+        if self._snmp is None:
+            return {}
+        try:
+            with Timings.span("snmp", self._model):
+                return self._snmp.get_packets_ports(user_ports, counters)
+        except (OSError, ValueError) as error:
+            return self._snmp_failed(error)
+
+    # close session, all watchers leave
+    @override
+    def close(self) -> None:
+        with self.__lock:
+            self.__watchers.clear()
+            self._close_snmp()
+            super().close()
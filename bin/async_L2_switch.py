@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import asyncio
+from typing import AsyncIterator, override
+# user's modules
+from async_base_switch import AsyncBaseSwitch
+from device_logic import L2SwitchLogic
+from timings import Timings
+from const import CitySwitch
+
+
+##### CLASS TO COMMUNICATE WITH L2 SWITCH IN THE EVENT LOOP #####
+
+class AsyncL2Switch(L2SwitchLogic, AsyncBaseSwitch):
+    __lock: asyncio.Lock
+
+    # L2 manager inits by ip only, any port can be asked in the session
+    def __init__(self, ipaddress: str, print_output: bool = False, timeout: float | None = None) -> None:
+        super().__init__(ipaddress, "L2 switch", print_output, timeout)
+
+        # only one command at a time in the session
+        self.__lock = asyncio.Lock()
+
+    # create switch manager and connect, bytes are read by snmp if it's turned on
+    @classmethod
+    async def create(cls, ipaddress: str, print_output: bool = False, timeout: float | None = None,
+                     snmp: bool = CitySwitch.SNMP) -> AsyncL2Switch:
+        switch = cls(ipaddress, print_output, timeout)
+        await switch.connect()
+        switch._start_snmp(snmp)
+        return switch
+
+    # get packages bytes per second on port, or cumulative bytes counters
+    async def get_packets_port(self, user_port: int, counters: bool = False) -> tuple[int]:
+        async with self.__lock, self._commands():
+            # by snmp if switch has it and port has rate already
+            packets = await self.__get_snmp_packets([user_port], counters)
+            if user_port in packets:
+                return packets[user_port]
+            return await self.__get_cli_packets_port(user_port, counters)
+
+    # get packages bytes on port by cli command
+    async def __get_cli_packets_port(self, user_port: int, counters: bool) -> tuple[int]:
+        with Timings.span("poll", self._model):
+            # pre-built command, read output's lines until rx and tx are found and output ends
+            await self._session.sendline(self._profile.show_packet(user_port))
+            parser = self._packet_parser(counters)
+            await self._expect_parser(parser)
+
+            # quit dynamic page on some switches
+            if self._profile.live_page:
+                await self._quit_output()
+        return self._packets(parser)
+
+    # packages bytes of every redraw of self-refreshing page at switch's own rate, page stays open until iterator is closed
+    async def stream_packets_port(self, user_port: int, counters: bool = False) -> AsyncIterator[tuple[int]]:
+        # session is busy with the page while it's streamed
+        async with self.__lock, self._commands():
+            await self._session.sendline(self._profile.show_packet(user_port))
+            try:
+                while True:
+                    # wait for next redraw, it's timed apart from polls as it's paced by switch
+                    with Timings.span("refresh", self._model):
+                        parser = self._packet_parser(counters)
+                        await self._expect_parser(parser)
+                    yield self._packets(parser)
+
+            # quit page only when streaming stops, if connection is still alive
+            finally:
+                if self._session.isalive():
+                    await self._quit_output()
+
+    # get packages bytes on several ports by one command, port as key
+    async def get_packets_ports(self, user_ports: list[int], counters: bool = False) -> dict[int, tuple[int]]:
+        async with self.__lock, self._commands():
+            # by snmp if switch has it, the rest by cli
+            packets = await self.__get_snmp_packets(user_ports, counters)
+            missing = [user_port for user_port in user_ports if user_port not in packets]
+            if missing:
+                with Timings.span("poll", self._model):
+                    # command for all ports, read output's lines until all ports are found and output ends
+                    await self._session.sendline(self._profile.show_packet_ports(missing))
+                    parser = self._ports_parser(missing, counters)
+                    await self._expect_parser(parser)
+
+                    # quit dynamic page on some switches
+                    if self._profile.live_page:
+                        await self._quit_output()
+                Timings.observe("parse", self._model, parser.seconds)
+
+                # rx and tx bytes from every port's block
+                packets.update(parser.result())
+
+            # ports missing in output are asked one by one
+            for user_port in missing:
+                if user_port not in packets:
+                    packets[user_port] = await self.__get_cli_packets_port(user_port, counters)
+
+        return {user_port: packets[user_port] for user_port in user_ports}
+
+    # ports' bytes by snmp, nothing if switch has no snmp or snmp failed
+    async def __get_snmp_packets(self, user_ports: list[int], counters: bool) -> dict[int, tuple[int]]:
+        if self._snmp is None:
+            return {}
+        try:
+            with Timings.span("snmp", self._model):
+                return await self._snmp.async_get_packets_ports(user_ports, counters)
+        except (OSError, ValueError) as error:
+            return self._snmp_failed(error)
+
+    # close snmp socket and cli session
+    @override
+    async def close(self) -> None:
+        self._close_snmp()
+        await super().close()
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import asyncio
+import sys
+import time
+from abc import abstractmethod
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator
+# user's modules
+from device_logic import NetworkDeviceLogic
+from timings import Timings
+from switch_health import SwitchHealth
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from async_telnet import AsyncTelnetSession
+
+
+##### BASE CLASS FOR ALL NETWORK DEVICES IN THE EVENT LOOP #####
+
+class AsyncBaseNetworkDevice(NetworkDeviceLogic):
+    _session: AsyncTelnetSession | None
+
+    # start, the whole connection with actions after it is timed, model is known at the end; connection is opened in the event loop,
+    # not by constructor
+    async def connect(self) -> None:
+        with Timings.span("connect") as span:
+            await self.__connect()
+            span.model = self._get_model_label()
+
+    # connect and perform actions after connection
+    async def __connect(self) -> None:
+        self._check_health()
+
+        # try connecting within timeout learned for this device
+        try:
+            seconds = await self.__attempt(SwitchHealth.timeout(self._ipaddress))
+
+        # if timeout or another connection error
+        except (asyncio.TimeoutError, EOFError, OSError):
+            # close old session
+            print(f"Failed to connect to {self._device_type_name}")
+            await self.__close_session()
+
+            # fails by packet loss of device or tries connecting again with longer timeout
+            self._failed_attempt(await self.__check_ping())
+            try:
+                seconds = await self.__attempt(SwitchHealth.timeout(self._ipaddress, retry=True))
+
+            # can't connect if timeout repeatedly
+            except (asyncio.TimeoutError, EOFError, OSError):
+                print(f"Failed to connect to {self._device_type_name}")
+                await self.__close_session()
+                self._fail("CANNOT_CONNECT")
+
+        # actions that needed right after connection
+        try:
+            await self._enter_action()
+        except asyncio.TimeoutError:
+            await self.__close_session()
+            self._froze_after_connecting()
+        self._connected(seconds)
+
+    # connection attempt, seconds it took
+    async def __attempt(self, timeout: float) -> float:
+        started = time.perf_counter()
+        await self._connection_attempt(timeout)
+        return time.perf_counter() - started
+
+    # commands of connected device, timeout is remembered as failure
+    @asynccontextmanager
+    async def _commands(self) -> AsyncIterator[None]:
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self._command_timeout()
+            raise
+
+    # commands to try connecting to device within timeout in seconds
+    @abstractmethod
+    async def _connection_attempt(self, timeout: float):
+        raise NotImplementedError(f"Method {sys._getframe(0).f_code.co_name} not implemented in child class")
+
+    # commands to perform after connecting
+    @abstractmethod
+    async def _enter_action(self):
+        raise NotImplementedError(f"Method {sys._getframe(0).f_code.co_name} not implemented in child class")
+
+    # check switch availability by 4 icmp packets and return packet loss without blocking the loop, switches pinged just before
+    # connecting aren't pinged again
+    async def __check_ping(self) -> float:
+        loss = self._known_loss()
+        if loss is not None:
+            return loss
+        from icmplib import async_ping   # imported by the first failed connection only
+        return (await async_ping(self._ipaddress, count=4, timeout=1, interval=0.25, privileged=False)).packet_loss
+
+    # close session if it was opened
+    async def __close_session(self) -> None:
+        if self._session:
+            await self._session.close()
+
+    # close connection with pre-exit actions
+    async def close(self) -> None:
+        # if session is not active, it's nothing to close
+        if not self._session or not self._session.isalive():
+            return
+
+        print(f"Closing connection to {self._device_type_name}...")
+
+        # perform pre-exit actions
+        await self._exit_action()
+
+        await self._session.close()
+        print("Success")
+
+    # override if necessary to perform commands before closing connection
+    async def _exit_action(self):
+        pass
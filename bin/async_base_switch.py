@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import asyncio
+import time
+from typing import override
+# user's modules
+from const import CitySwitch
+from async_base_network_device import AsyncBaseNetworkDevice
+from async_telnet import AsyncTelnetSession
+from device_logic import SwitchLogic
+from switch_health import SwitchHealth
+import commands
+import switch_parser
+
+
+##### BASE CLASS FOR L2-L3 SWITCHES IN THE EVENT LOOP #####
+
+class AsyncBaseSwitch(SwitchLogic, AsyncBaseNetworkDevice):
+    _timeout: float
+
+    # init by ip, timeout in seconds for every operation, learned one by default
+    def __init__(self, ipaddress: str, device_type_name: str, print_output: bool, timeout: float | None = None) -> None:
+        self._timeout = timeout if timeout is not None else SwitchHealth.command_timeout(ipaddress)
+        super().__init__(ipaddress, device_type_name, print_output)
+
+    # trying to connect by telnet stream, waiting for login prompt within timeout, commands have their own one
+    @override
+    async def _connection_attempt(self, timeout: float) -> None:
+        async with asyncio.timeout(timeout):
+            self._session = await AsyncTelnetSession.connect(self._ipaddress, CitySwitch.TELNET_PORT, self._timeout, self._output)
+            await self._session.expect(self._LOGIN_PROMPT)
+
+    # perform base actions after connecting
+    @override
+    async def _enter_action(self) -> None:
+        # login
+        started = time.perf_counter()
+        for line, prompt in self._login_dialog():
+            await self._session.sendline(line)
+            await self._session.expect(prompt)
+        logged_in = time.perf_counter()
+
+        # model known from previous connections, otherwise get through two types of cli to get switch model and remember it
+        if not self._cached_model():
+            for cli_type in CitySwitch.CLI_TYPES:
+                await self.__get_model(cli_type)
+                if self._model:
+                    break
+            self._remember_model(cli_type, logged_in)
+
+        # turn off clipaging to see commands' whole results
+        self._logged_in(started, logged_in)
+        await self._turn_off_clipaging()
+
+    # try to figure out switch model name
+    async def __get_model(self, cli_type: str) -> None:
+        # try to show model info
+        await self._session.sendline(commands.model_command(cli_type))
+
+        # read output's lines until ending or continuation and try to find device model
+        parser = switch_parser.ModelParser(cli_type)
+        await self._expect_parser(parser)
+        self._take_model(parser)
+
+        # quit if needed
+        if parser.end_index == 0:
+            await self._quit_output()
+
+    # perform exit actions
+    @override
+    async def _exit_action(self) -> None:
+        if self._restores_clipaging():
+            await self._turn_on_clipaging()
+
+    # disable clipaging
+    async def _turn_off_clipaging(self) -> None:
+        await self._session.sendline(self._profile.clipaging_disable)
+        await self._session.expect_list([commands.PROMPT])
+
+    # enable clipaging
+    async def _turn_on_clipaging(self) -> None:
+        await self._session.sendline(self._profile.clipaging_enable)
+        await self._session.expect_list([commands.PROMPT])
+
+    # feed output to incremental parser until output ends, too long output without ending is unexpected
+    async def _expect_parser(self, parser: switch_parser.StreamParser) -> None:
+        try:
+            await self._session.expect_parser(parser)
+        except switch_parser.OutputLimitError:
+            raise self._unexpected_output() from None
+
+    # quit long output with escape symbol
+    async def _quit_output(self) -> None:
+        await self._session.send(commands.QUIT)
+        await self._session.expect_list([commands.PROMPT])
@@ -0,0 +1,208 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import asyncio
+import re
+import time
+from typing import TYPE_CHECKING
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from io import BufferedWriter
+    from switch_parser import StreamParser
+
+
+##### TELNET PROTOCOL BYTES #####
+
+IAC = 255   # interpret as command
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250    # subnegotiation begin
+SE = 240    # subnegotiation end
+ECHO = 1
+SGA = 3     # suppress go ahead
+
+
+##### ASYNC TELNET SESSION WITH PEXPECT-LIKE INTERFACE #####
+
+class AsyncTelnetSession:
+    __reader: asyncio.StreamReader
+    __writer: asyncio.StreamWriter
+    __buffer: bytearray
+    __telnet_command: bytearray
+    __timeout: float
+    __logfile: BufferedWriter | None
+    __eof: bool
+    before: bytes
+    after: bytes
+    match: re.Match[bytes] | None
+
+    # init by opened stream, use "connect" to open it
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 timeout: float, logfile: BufferedWriter | None) -> None:
+        self.__reader = reader
+        self.__writer = writer
+
+        # received data without telnet commands, unfinished telnet command
+        self.__buffer = bytearray()
+        self.__telnet_command = bytearray()
+
+        # default timeout for every operation and output for session log
+        self.__timeout = timeout
+        self.__logfile = logfile
+        self.__eof = False
+
+        # results of last expect like in pexpect
+        self.before = b""
+        self.after = b""
+        self.match = None
+
+    # open tcp connection to device in the event loop, no child process
+    @classmethod
+    async def connect(cls, host: str, port: int = 23, timeout: float = 5,
+                      logfile: BufferedWriter | None = None) -> AsyncTelnetSession:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        return cls(reader, writer, timeout, logfile)
+
+    # send string or pre-encoded bytes as is
+    async def send(self, data: str | bytes) -> None:
+        self.__writer.write(data.encode("utf-8") if isinstance(data, str) else data)
+        await self.__writer.drain()
+
+    # send string or pre-encoded bytes with line ending
+    async def sendline(self, data: str | bytes = b"") -> None:
+        await self.send((data.encode("utf-8") if isinstance(data, str) else data) + b"\r\n")
+
+    # wait for pattern or one of patterns, return index of found one, timeout in seconds for this operation
+    async def expect(self, pattern: str | list[str], timeout: float | None = None) -> int:
+        patterns = [pattern] if isinstance(pattern, str) else pattern
+        return await self.expect_list([re.compile(p.encode("utf-8"), re.DOTALL) for p in patterns], timeout)
+
+    # wait for one of compiled patterns, without compiling them again
+    async def expect_list(self, patterns: list[re.Pattern[bytes]], timeout: float | None = None) -> int:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.__timeout if timeout is None else timeout)
+
+        while True:
+            # earliest match among patterns, as pexpect does, match keeps immutable copy of buffer
+            data = bytes(self.__buffer)
+            found = min(((match.start(), index, match) for index, p in enumerate(patterns)
+                         if (match := p.search(data))), default=None, key=lambda item: item[:2])
+            if found:
+                _, index, self.match = found
+                self.before = data[:self.match.start()]
+                self.after = self.match.group(0)
+                del self.__buffer[:self.match.end()]
+                return index
+
+            # no more data will come
+            if self.__eof:
+                raise EOFError(f"End of stream while waiting for {patterns}")
+
+            # read more data until deadline
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Timeout while waiting for {patterns}")
+            await self.__read(remaining)
+
+    # feed data to incremental parser until output ends, without searching whole buffer again, the rest stays in buffer
+    async def expect_parser(self, parser: StreamParser, timeout: float | None = None) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.__timeout if timeout is None else timeout)
+
+        # only new data is given to parser
+        while True:
+            data = bytes(self.__buffer)
+            self.__buffer.clear()
+            started = time.perf_counter()
+            done = parser.feed(data)
+            parser.seconds += time.perf_counter() - started
+            if done:
+                self.__buffer[:0] = parser.rest
+                return
+
+            # no more data will come
+            if self.__eof:
+                raise EOFError("End of stream while reading output")
+
+            # read more data until deadline
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("Timeout while reading output")
+            await self.__read(remaining)
+
+    # read next chunk of data and remove telnet commands from it
+    async def __read(self, timeout: float) -> None:
+        data = await asyncio.wait_for(self.__reader.read(4096), timeout)
+        if not data:
+            self.__eof = True
+            return
+
+        # write session log like pexpect logfile
+        if self.__logfile:
+            self.__logfile.write(data)
+            self.__logfile.flush()
+
+        # separate telnet commands from data byte by byte only if there are any
+        if IAC not in data and not self.__telnet_command:
+            self.__buffer += data
+            return
+        for byte in data:
+            self.__handle_byte(byte)
+        await self.__writer.drain()
+
+    # negotiate options: agree that server echoes and suppresses go ahead, refuse everything else
+    def __handle_byte(self, byte: int) -> None:
+        command = self.__telnet_command
+
+        # plain data
+        if not command:
+            if byte == IAC:
+                command.append(byte)
+            else:
+                self.__buffer.append(byte)
+            return
+
+        command.append(byte)
+
+        # escaped 255 is data
+        if command == bytearray((IAC, IAC)):
+            self.__buffer.append(IAC)
+            command.clear()
+
+        # wait for option byte
+        elif len(command) == 2 and byte in (DO, DONT, WILL, WONT, SB):
+            pass
+
+        # answer option negotiation
+        elif len(command) == 3 and command[1] in (DO, DONT, WILL, WONT):
+            verb, option = command[1], command[2]
+            if verb == DO:
+                self.__writer.write(bytes((IAC, WONT, option)))
+            elif verb == WILL:
+                self.__writer.write(bytes((IAC, DO if option in (ECHO, SGA) else DONT, option)))
+            command.clear()
+
+        # skip subnegotiation until its end
+        elif command[1] == SB:
+            if command[-2:] == bytearray((IAC, SE)):
+                command.clear()
+
+        # other two-byte commands are ignored
+        else:
+            command.clear()
+
+    # check that connection is open
+    def isalive(self) -> bool:
+        return not self.__writer.is_closing() and not self.__eof
+
+    # close connection
+    async def close(self) -> None:
+        if self.__writer.is_closing():
+            return
+        self.__writer.close()
+        try:
+            await self.__writer.wait_closed()
+        except OSError:
+            pass
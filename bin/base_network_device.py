@@ -1,107 +1,120 @@
 #!/usr/bin/python3
 from __future__ import annotations
-import pexpect
 import sys
-from abc import ABC, abstractmethod
-from icmplib import ping
-from typing import TYPE_CHECKING
+import time
+from abc import abstractmethod
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
 # user's modules
-from my_exception import MyException
+from device_logic import NetworkDeviceLogic
+from timings import Timings
+from switch_health import SwitchHealth
 
 # import as type only by Pylance (for VS Code)
 if TYPE_CHECKING:
-    from io import BufferedWriter
+    import pexpect
 
 
 ##### BASE CLASS FOR ALL NETWORK DEVICES #####
 
-class BaseNetworkDevice(ABC):
-    _ipaddress: str
-    __device_type_name: str
-    _output: BufferedWriter | None
-    _session: pexpect.spawn
+class BaseNetworkDevice(NetworkDeviceLogic):
+    _session: pexpect.spawn | None
 
-    # all devices init by ip
+    # all devices init by ip and connect
     def __init__(self, ipaddress: str, device_type_name: str, print_output: bool) -> None:
-        # define ip
-        self._ipaddress = ipaddress
-
-        # device layer and type, also session output buffer for output
-        self.__device_type_name = device_type_name
-        self._output = sys.stdout.buffer if print_output else None
-
-        # connect
+        super().__init__(ipaddress, device_type_name, print_output)
         self.__start_connection()
     
-    # start
+    # start, the whole connection with actions after it is timed, model is known at the end
     def __start_connection(self) -> None:
-        print(f"Connecting to {self.__device_type_name}...")
+        with Timings.span("connect") as span:
+            self.__connect()
+            span.model = self._get_model_label()
+
+    # connect and perform actions after connection
+    def __connect(self) -> None:
+        import pexpect   # errors of session, imported by the first connection
+        self._check_health()
         
-        # try connecting
+        # try connecting within timeout learned for this device
         try:
-            self._connection_attempt()
+            seconds = self.__attempt(SwitchHealth.timeout(self._ipaddress))
         
         # if timeout or another connection error
-        except:
+        except (pexpect.ExceptionPexpect, OSError):
             # close old session
-            print(f"Failed to connect to {self.__device_type_name}")
-            self._session.close()
+            print(f"Failed to connect to {self._device_type_name}")
+            self.__close_session()
 
-            # get packet loss by pinging device address
-            packet_loss = self.__check_ping()
-            
-            # not available if 100% loss
-            if packet_loss == 1:
-                raise MyException(self._get_exception_type("NOT_AVAILABLE"))
+            # fails by packet loss of device or tries connecting again with longer timeout
+            self._failed_attempt(self.__check_ping())
+            try:
+                seconds = self.__attempt(SwitchHealth.timeout(self._ipaddress, retry=True))
             
-            # freezing/lagging if >0% loss
-            elif packet_loss > 0:
-                raise MyException(self._get_exception_type("FREEZES"))
-            
-            # if 0% loss
-            else:
-                # try connecting again
-                try:
-                    print(f"Connecting to {self.__device_type_name}...")
-                    self._connection_attempt()
-                
-                # can't connect if timeout repeatedly
-                except:
-                    print(f"Failed to connect to {self.__device_type_name}")
-                    self._session.close()
-                    raise MyException(self._get_exception_type("CANNOT_CONNECT"))
+            # can't connect if timeout repeatedly
+            except (pexpect.ExceptionPexpect, OSError):
+                print(f"Failed to connect to {self._device_type_name}")
+                self.__close_session()
+                self._fail("CANNOT_CONNECT")
         
         # actions that needed right after connection
-        self._enter_action()
-        
-        print("Success")
+        try:
+            self._enter_action()
+        except pexpect.TIMEOUT:
+            self.__close_session()
+            self._froze_after_connecting()
+        self._connected(seconds)
+
+    # connection attempt, seconds it took
+    def __attempt(self, timeout: float) -> float:
+        started = time.perf_counter()
+        self._connection_attempt(timeout)
+        return time.perf_counter() - started
 
-    # commands to try connecting to device
+    # commands of connected device, timeout is remembered as failure
+    @contextmanager
+    def _commands(self) -> Iterator[None]:
+        import pexpect
+        try:
+            yield
+        except pexpect.TIMEOUT:
+            self._command_timeout()
+            raise
+
+    # close session if it was opened
+    def __close_session(self) -> None:
+        if self._session:
+            self._session.close()
+
+    # commands to try connecting to device within timeout in seconds
     @abstractmethod
-    def _connection_attempt(self):
+    def _connection_attempt(self, timeout: float):
         raise NotImplementedError(f"Method {sys._getframe(0).f_code.co_name} not implemented in child class")
     
     # commands to perform after connecting
     @abstractmethod
     def _enter_action(self):
         raise NotImplementedError(f"Method {sys._getframe(0).f_code.co_name} not implemented in child class")
-    
-    # method to get exception for different device types
-    @abstractmethod
-    def _get_exception_type(self, error):
-        raise NotImplementedError(f"Method {sys._getframe(0).f_code.co_name} not implemented in child class")
-    
-    # check switch availability by 4 icmp packets and return packet loss
+
+    # check switch availability by 4 icmp packets and return packet loss, switches pinged just before connecting aren't pinged again
     def __check_ping(self) -> float:
+        loss = self._known_loss()
+        if loss is not None:
+            return loss
+        from icmplib import ping   # imported by the first failed connection only
         return ping(self._ipaddress, count=4, timeout=1, interval=0.25, privileged=False).packet_loss
 
     # delete, close connection
     def __del__(self) -> None:
+        self.close()
+
+    # close connection with pre-exit actions
+    def close(self) -> None:
         # if session is not active, it's nothing to close
-        if not self._session.isalive():
+        if not self._session or not self._session.isalive():
             return
         
-        print(f"Closing connection to {self.__device_type_name}...")
+        print(f"Closing connection to {self._device_type_name}...")
         
         # perform pre-exit actions
         self._exit_action()
@@ -111,4 +124,4 @@ class BaseNetworkDevice(ABC):
 
     # override if necessary to perform commands before closing connection
     def _exit_action(self):
-        pass
+        pass
\ No newline at end of file
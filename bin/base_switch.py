@@ -1,124 +1,107 @@
 #!/usr/bin/python3
 from __future__ import annotations
-import pexpect
-import re
-import os
+import time
 from typing import override
 # user's modules
 from const import CitySwitch
 from base_network_device import BaseNetworkDevice
-from my_exception import ExceptionType, MyException
+from device_logic import SwitchLogic
+from switch_health import SwitchHealth
 import commands
+import switch_parser
 
 
 ##### BASE CLASS FOR L2-L3 SWITCHES #####
 
-class BaseSwitch(BaseNetworkDevice):
-    __USERNAME: str
-    __PASSWORD: str
-    _model: str
-    __default_gateway: str
-    __turn_clipaging: commands.CommandRegexData
-
-    # init by ip and connect with the same username and password
-    def __init__(self, ipaddress: str, device_type_name: str, print_output: bool) -> None:
-        # get connection's environment
-        self.__USERNAME = os.getenv("NET_USER")
-        self.__PASSWORD = os.getenv("NET_PASSWORD")
-
-        # switch model name and default gateway
-        self._model = ""
-        self.__default_gateway = ""   # for d-link, is used only in base class
-
-        # dict to store commands for clipaging
-        self.__turn_clipaging = {}
-        
-        # run base constructor with device type name
-        super().__init__(ipaddress, device_type_name, print_output)
-    
-    # trying to connect by telnet
+class BaseSwitch(SwitchLogic, BaseNetworkDevice):
+    # trying to connect by telnet, waiting for login prompt within timeout, commands have their own one learned for this switch
     @override
-    def _connection_attempt(self) -> None:
-        self._session = pexpect.spawn(f"telnet {self._ipaddress}", timeout=5, logfile=self._output)
-        self._session.expect("(U|u)ser(N|n)ame:")
+    def _connection_attempt(self, timeout: float) -> None:
+        import pexpect   # imported by the first connection, not by every start of program
+        self._session = pexpect.spawn(f"telnet {self._ipaddress} {CitySwitch.TELNET_PORT}",
+                                      timeout=SwitchHealth.command_timeout(self._ipaddress), logfile=self._output)
+        self._session.expect(self._LOGIN_PROMPT, timeout=timeout)
 
     # perform base actions after connecting
     @override
     def _enter_action(self) -> None:
         # login
-        self._session.sendline(self.__USERNAME)
-        self._session.expect("(P|p)ass(W|w)ord:")
-        self._session.sendline(self.__PASSWORD)
-        self._session.expect("#")
-        
-        # get through two types of cli to get switch model
-        for cli_type in CitySwitch.CLI_TYPES:
-            self.__get_model(cli_type)
-            if self._model:
-               break
+        started = time.perf_counter()
+        for line, prompt in self._login_dialog():
+            self._session.sendline(line)
+            self._session.expect(prompt)
+        logged_in = time.perf_counter()
         
-        # exception if model unknown
-        else:
-            raise MyException(ExceptionType.UNKNOWN_MODEL, self._ipaddress)
+        # model known from previous connections, otherwise get through two types of cli to get switch model and remember it
+        if not self._cached_model():
+            for cli_type in CitySwitch.CLI_TYPES:
+                self.__get_model(cli_type)
+                if self._model:
+                    break
+            self._remember_model(cli_type, logged_in)
 
         # turn off clipaging to see commands' whole results
-        self.__turn_clipaging = commands.clipaging(self._model)
+        self._logged_in(started, logged_in)
         self._turn_off_clipaging()
     
-    # method to generate exceptions for switches
-    @override
-    def _get_exception_type(self, error: str) -> ExceptionType:
-        return getattr(ExceptionType, f"SWITCH_{error}")
-    
     # try to figure out switch model name
     def __get_model(self, cli_type: str) -> None:
         # try to show model info
-        command_regex = commands.show_model(cli_type)
-        self._session.sendline(command_regex["command"])
+        self._session.sendline(commands.model_command(cli_type))
         
-        # expect output's ending or continuation  and try to find device model
-        index = self._session.expect(["CTRL", "#"])
-        match = re.search(command_regex["regex"], self._session.before.decode("utf-8"), re.DOTALL)
+        # read output's lines until ending or continuation and try to find device model
+        parser = switch_parser.ModelParser(cli_type)
+        self._expect_parser(parser)
+        self._take_model(parser)
         
         # quit if needed
-        if index == 0:
+        if parser.end_index == 0:
             self._quit_output()
-        
-        # catch model if found
-        if match:
-            # if model unknown, quit
-            if match.group("model") not in commands.SWITCHES:
-                raise MyException(ExceptionType.UNKNOWN_MODEL, self._ipaddress)
-            
-            # define model otherwise
-            self._model = match.group("model")
-            
-            # for d-link, define default_gateway, so as not to check it later
-            if self._model != commands.CISCO_SWITCH:
-                self.__default_gateway = match.group("default_gateway")
     
     # perform exit actions
     @override
     def _exit_action(self) -> None:
-        # for d-link, restore clipaging on switch
-        if self._model != commands.CISCO_SWITCH:
+        if self._restores_clipaging():
             self._turn_on_clipaging()
     
     # disable clipaging
     def _turn_off_clipaging(self) -> None:
-        self._session.sendline(self.__turn_clipaging["disable"])
-        self._session.expect("#")
+        self._session.sendline(self._profile.clipaging_disable)
+        self._session.expect_list([commands.PROMPT])
 
     # enable clipaging
     def _turn_on_clipaging(self) -> None:
-        self._session.sendline(self.__turn_clipaging["enable"])
-        self._session.expect("#")
+        self._session.sendline(self._profile.clipaging_enable)
+        self._session.expect_list([commands.PROMPT])
     
+    # feed output to incremental parser until output ends, without searching whole buffer again, the rest stays in session's buffer;
+    # too long output without ending is unexpected
+    def _expect_parser(self, parser: switch_parser.StreamParser) -> None:
+        deadline = time.monotonic() + self._session.timeout
+
+        # start from data already read by previous expect
+        data = self._session.buffer
+        self._session.buffer = b""
+        try:
+            while not self.__feed(parser, data):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    import pexpect
+                    raise pexpect.TIMEOUT("Timeout while reading output")
+                data = self._session.read_nonblocking(4096, remaining)
+        except switch_parser.OutputLimitError:
+            raise self._unexpected_output() from None
+        self._session.buffer = parser.rest
+
+    # feed chunk and count parsing time, once per read, not per parsed line
+    @staticmethod
+    def __feed(parser: switch_parser.StreamParser, data: bytes) -> bool:
+        started = time.perf_counter()
+        done = parser.feed(data)
+        parser.seconds += time.perf_counter() - started
+        return done
+
     # quit long output with escape symbol
     def _quit_output(self) -> None:
-        self._session.send("q")
-        self._session.expect("#")
-    
-    # get default gateway variable
-    def get_default_gateway(self) -> str:
-        return self.__default_gateway
\ No newline at end of file
+        self._session.send(commands.QUIT)
+        self._session.expect_list([commands.PROMPT])
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+import re
+import timeit
+from pexpect.spawnbase import SpawnBase
+# user's modules
+import commands
+import switch_parser
+
+
+##### SAMPLE OUTPUTS OF D-LINK SWITCH #####
+
+PACKET_OUTPUT = b"""show packet ports 5
+Command: show packet ports 5
+
+Port Number : 5
+ Frame Size/Type  Frame Counts  Frames/sec  Frame Type  Total        Total/sec
+ ---------------  ------------  ----------  ----------  -----------  ---------
+ 64               1795374       12          RX Bytes    6219384271   1207512
+ 65-127           2201739       35          RX Frames   7219384      1422
+ 128-255          205118        4
+ 256-511          86410         0           TX Bytes    9984013317   4312254
+ 512-1023         107316        1           TX Frames   8312013      3512
+ 1024-1518        4210231       301
+ Unicast RX       0             0
+ Multicast RX     2103          0
+ Broadcast RX     71013         0
+
+DES-3028:admin#"""
+
+MODEL_OUTPUT = b"""show switch
+Command: show switch
+
+Device Type       : DES-3028 Fast Ethernet Switch
+MAC Address       : 00-1C-F0-00-00-01
+IP Address        : 10.90.90.90 (Manual)
+VLAN Name         : default
+Subnet Mask       : 255.0.0.0
+Default Gateway   : 10.0.0.1
+Boot PROM Version : Build 1.00.B06
+Firmware Version  : Build 2.90.B10
+Hardware Version  : A3
+System Name       :
+System Location   :
+System Contact    :
+Spanning Tree     : Disabled
+GVRP              : Disabled
+IGMP Snooping     : Enabled
+TELNET            : Enabled (TCP 23)
+WEB               : Disabled
+RMON              : Disabled
+SSH               : Disabled
+SSL               : Disabled
+Syslog Global State: Disabled
+CTRL+C ESC q Quit SPACE n Next Page ENTER Next Entry a All"""
+
+
+##### REGEXES OF WHOLE OUTPUTS USED BEFORE LINE PARSERS #####
+
+PACKET_REGEX = r"Total/(\d)?sec.*RX Bytes\s+(?P<rx_total>\d+)\s+(?P<rx>\d+).*TX Bytes\s+(?P<tx_total>\d+)\s+(?P<tx>\d+).*#"
+MODEL_REGEX = r"Device Type\s+:\s+(?P<model>\S+)\s+.*Default Gateway\s+:\s+(?P<default_gateway>(\d{1,3}\.){3}\d{1,3})"
+
+
+##### ONE POLL: BUILD COMMAND, GET REGEX READY, PARSE OUTPUT #####
+
+# pexpect compiles string patterns on every expect call
+spawn = SpawnBase(timeout=5)
+
+# output arrives in small chunks on slow links
+CHUNK = 64
+PACKET_CHUNKS = [PACKET_OUTPUT[i:i + CHUNK] for i in range(0, len(PACKET_OUTPUT), CHUNK)]
+
+# command and regex built for every poll, whole buffer is searched again after every chunk like in pexpect
+def poll_before(chunks: list[bytes] = [PACKET_OUTPUT]) -> tuple[int, int]:
+    commands.show_packet("DES-3028", 5)["command"].encode()
+    regex = spawn.compile_pattern_list(PACKET_REGEX)[0]
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        match = regex.search(buffer)
+        if match:
+            return tuple(map(int, match.group("rx", "tx")))
+
+# profile built once at model detection, every line is looked at once
+profile = commands.profile("DES-3028")
+def poll_after(chunks: list[bytes] = [PACKET_OUTPUT]) -> tuple[int, int]:
+    profile.show_packet(5)
+    parser = switch_parser.PacketParser(profile.packet_terminator)
+    for chunk in chunks:
+        if parser.feed(chunk):
+            return parser.result()
+
+# model probe with decoding of the whole output
+def probe_before() -> str:
+    commands.show_model("d-link")["command"].encode()
+    return re.search(MODEL_REGEX, MODEL_OUTPUT.decode("utf-8"), re.DOTALL).group("model")
+
+# model probe by lines of output
+def probe_after() -> str:
+    commands.model_command("d-link")
+    parser = switch_parser.ModelParser("d-link")
+    parser.feed(MODEL_OUTPUT)
+    return parser.result("")[0]
+
+
+##### RUN #####
+
+def main() -> None:
+    number = 20_000
+    cases = (("poll", poll_before, poll_after),
+             (f"poll, {CHUNK}-byte chunks", lambda: poll_before(PACKET_CHUNKS), lambda: poll_after(PACKET_CHUNKS)),
+             ("model probe", probe_before, probe_after))
+    for name, before, after in cases:
+        assert before() == after()
+        before_time = min(timeit.repeat(before, number=number, repeat=5)) / number * 1e6
+        after_time = min(timeit.repeat(after, number=number, repeat=5)) / number * 1e6
+        print(f"{name}: before {before_time:.2f} us, after {after_time:.2f} us, {before_time / after_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
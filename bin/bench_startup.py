@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+##### IMPORT TIME OF MODULES IN FRESH INTERPRETER #####
+
+# entry of every mode: packet.py itself, then modules imported by its modes
+MODULES = ["packet", "packet_scan_handler", "multi_packet_scan_handler", "switch_scan_handler",
+           "scan_daemon", "scan_client", "replay_handler"]
+
+# directory of modules, benchmark runs from anywhere
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# "-X importtime" lines of one import: module name with cumulative and self microseconds
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=DIRECTORY, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(cumulative), int(own))
+    return times
+
+# the best of several runs, so disk cache and noise don't count
+def best_import_time(module: str, runs: int) -> tuple[int, dict[str, tuple[int, int]]]:
+    best, best_times = None, {}
+    for _ in range(runs):
+        times = import_times(module)
+        if best is None or times[module][0] < best:
+            best, best_times = times[module][0], times
+    return best, best_times
+
+# wall time of starting program to show its help, the whole interpreter start included
+def help_time(runs: int) -> float:
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "packet.py", "--help"], cwd=DIRECTORY, capture_output=True, check=True)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+##### RUN #####
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure cold start of packet.py and its modes by -X importtime")
+    parser.add_argument("--runs", type=int, default=5, help="runs of every measurement, the best one is shown")
+    parser.add_argument("--top", type=int, default=10, help="heaviest modules shown for packet.py")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if importing packet.py takes longer, 0 to not check")
+    return parser.parse_args()
+
+def main() -> None:
+    arguments = parse_arguments()
+
+    # every mode's import
+    packet_time = 0
+    for module in MODULES:
+        cumulative, times = best_import_time(module, arguments.runs)
+        print(f"{module:<28} {cumulative / 1e3:8.1f} ms")
+        if module == "packet":
+            packet_time, packet_times = cumulative, times
+
+    # what packet.py itself spends most on, by self time
+    print(f"\nheaviest modules of packet.py by self time:")
+    for name, (cumulative, own) in sorted(packet_times.items(), key=lambda item: -item[1][1])[:arguments.top]:
+        print(f"{name:<28} {own / 1e3:8.1f} ms self, {cumulative / 1e3:8.1f} ms cumulative")
+    print(f"\npacket.py --help: {help_time(arguments.runs) * 1e3:.1f} ms")
+
+    # keep cold start low
+    if arguments.budget_ms and packet_time / 1e3 > arguments.budget_ms:
+        sys.exit(f"Importing packet.py takes {packet_time / 1e3:.1f} ms, budget is {arguments.budget_ms} ms")
+
+if __name__ == "__main__":
+    main()
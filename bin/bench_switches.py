@@ -0,0 +1,209 @@
+#!/usr/bin/python3
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# simulated switches listen on their own port, models are probed and latencies learned on every run, set before constants are read
+os.environ.setdefault("TELNET_PORT", "2323")
+os.environ.setdefault("SNMP_PORT", "1161")
+os.environ.setdefault("MODEL_CACHE", os.path.join(tempfile.mkdtemp(), "models.json"))
+os.environ.setdefault("SWITCH_HEALTH", os.path.join(tempfile.mkdtemp(), "health.json"))
+os.environ.setdefault("NET_USER", "admin")
+os.environ.setdefault("NET_PASSWORD", "admin")
+
+# user's modules
+from switch_simulator import SwitchSimulator, MODELS
+from snmp_agent import SnmpAgent
+from async_base_switch import AsyncBaseSwitch
+from async_L2_switch import AsyncL2Switch
+from base_switch import BaseSwitch
+from L2_switch_session import L2SwitchSession
+from const import CitySwitch
+from timings import Timings
+import commands
+
+
+##### RESULTS OF ONE RUN #####
+
+class BenchResults:
+    connects: list[float]
+    polls: list[float]
+    errors: Counter[str]
+    __lock: threading.Lock
+
+    def __init__(self) -> None:
+        # seconds of every connection and poll, errors by type
+        self.connects = []
+        self.polls = []
+        self.errors = Counter()
+        self.__lock = threading.Lock()
+
+    # add seconds of connection or poll from any thread
+    def add(self, values: list[float], seconds: float) -> None:
+        with self.__lock:
+            values.append(seconds)
+
+    # add error from any thread
+    def error(self, exception: BaseException) -> None:
+        with self.__lock:
+            self.errors[type(exception).__name__] += 1
+
+    # polls per second and percentiles in milliseconds
+    def report(self, switches: int, duration: float) -> str:
+        lines = [f"{switches} switches, {len(self.polls)} polls in {duration:.1f} s: {len(self.polls) / duration:.1f} polls/s"]
+        for name, values in (("poll", self.polls), ("connect", self.connects)):
+            if len(values) >= 2:
+                percentiles = statistics.quantiles(values, n=100, method="inclusive")
+                lines.append(f"{name} latency, ms: p50 {percentiles[49] * 1e3:.1f}, p95 {percentiles[94] * 1e3:.1f}, "
+                             f"p99 {percentiles[98] * 1e3:.1f}, max {max(values) * 1e3:.1f}")
+        if self.errors:
+            lines.append("errors: " + ", ".join(f"{name} {count}" for name, count in self.errors.items()))
+        return "\n".join(lines)
+
+
+##### DRIVERS #####
+
+# ports polled on every switch
+def polled_ports(ports: int) -> list[int]:
+    return list(range(1, ports + 1))
+
+# every switch in the event loop: connect, poll all ports by one command until deadline, close
+async def run_async(switches: dict[str, str], arguments: argparse.Namespace, results: BenchResults) -> None:
+    async def drive(ip: str, model: str) -> None:
+        # L3 switches have no packet commands, they are only connected to probe the model
+        l2 = bool(commands.SWITCHES[model].get("base_switch"))
+        started = time.perf_counter()
+        try:
+            if l2:
+                switch = await AsyncL2Switch.create(ip, timeout=arguments.timeout, snmp=arguments.snmp)
+            else:
+                switch = AsyncBaseSwitch(ip, "L3 switch", False, arguments.timeout)
+                await switch.connect()
+        except Exception as exception:
+            results.error(exception)
+            return
+        results.add(results.connects, time.perf_counter() - started)
+
+        try:
+            while l2 and time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    await switch.get_packets_ports(polled_ports(arguments.ports), arguments.counters)
+                    results.add(results.polls, time.perf_counter() - started)
+                except Exception as exception:
+                    results.error(exception)
+                    break
+                await asyncio.sleep(max(0.0, arguments.interval - (time.perf_counter() - started)))
+        finally:
+            await switch.close()
+
+    simulator = SwitchSimulator(switches, CitySwitch.TELNET_PORT, arguments.latency, arguments.jitter, arguments.loss, seed=1)
+    agent = SnmpAgent(simulator.get_switches(), CitySwitch.SNMP_PORT, CitySwitch.SNMP_COMMUNITY, arguments.latency, arguments.jitter,
+                      arguments.loss, seed=1)
+    await simulator.start()
+    await agent.start()
+    try:
+        deadline = time.perf_counter() + arguments.duration
+        await asyncio.gather(*(drive(ip, model) for ip, model in switches.items()))
+    finally:
+        await agent.close()
+        await simulator.close()
+
+# every switch in its own thread with blocking session through telnet client, simulator runs in background loop
+def run_sync(switches: dict[str, str], arguments: argparse.Namespace, results: BenchResults) -> None:
+    def drive(ip: str, model: str) -> None:
+        l2 = bool(commands.SWITCHES[model].get("base_switch"))
+        started = time.perf_counter()
+        try:
+            switch = L2SwitchSession(ip, snmp=arguments.snmp) if l2 else BaseSwitch(ip, "L3 switch", False)
+        except Exception as exception:
+            results.error(exception)
+            return
+        results.add(results.connects, time.perf_counter() - started)
+
+        try:
+            while l2 and time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    switch.get_packets_ports(polled_ports(arguments.ports), arguments.counters)
+                    results.add(results.polls, time.perf_counter() - started)
+                except Exception as exception:
+                    results.error(exception)
+                    break
+                time.sleep(max(0.0, arguments.interval - (time.perf_counter() - started)))
+        finally:
+            switch.close()
+
+    # simulator in its own event loop, started before clients
+    loop = asyncio.new_event_loop()
+    simulator = SwitchSimulator(switches, CitySwitch.TELNET_PORT, arguments.latency, arguments.jitter, arguments.loss, seed=1)
+    agent = SnmpAgent(simulator.get_switches(), CitySwitch.SNMP_PORT, CitySwitch.SNMP_COMMUNITY, arguments.latency, arguments.jitter,
+                      arguments.loss, seed=1)
+    loop.run_until_complete(simulator.start())
+    loop.run_until_complete(agent.start())
+    server = threading.Thread(target=loop.run_forever, daemon=True)
+    server.start()
+    try:
+        deadline = time.perf_counter() + arguments.duration
+        threads = [threading.Thread(target=drive, args=(ip, model)) for ip, model in switches.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        asyncio.run_coroutine_threadsafe(agent.close(), loop).result()
+        asyncio.run_coroutine_threadsafe(simulator.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        server.join()
+        loop.close()
+
+
+##### RUN #####
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Poll many simulated switches and measure polls per second and latency")
+    parser.add_argument("--switches", type=int, default=200, help="number of simulated switches")
+    parser.add_argument("--models", default="DES-3028,DES-3200-28,DGS-3120-24TC",
+                        help=f"comma separated models given to switches in turn, of {', '.join(MODELS)}")
+    parser.add_argument("--ports", type=int, default=4, help="ports polled on every switch by one command")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of polling")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between polls of one switch, 0 to poll back to back")
+    parser.add_argument("--counters", action="store_true", help="read cumulative counters instead of per second column")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds before every answer of switch")
+    parser.add_argument("--jitter", type=float, default=0.005, help="max random seconds added to latency")
+    parser.add_argument("--loss", type=float, default=0.0, help="part of answers delayed by resent segment")
+    parser.add_argument("--timeout", type=float, default=5.0, help="timeout of one operation")
+    parser.add_argument("--snmp", action="store_true", help="read counters by snmp on models that support it, cli for the rest")
+    parser.add_argument("--timings", action="store_true", help="also print average time of every phase by model")
+    parser.add_argument("--sync", action="store_true", help="blocking sessions through telnet client in threads instead of event loop")
+    return parser.parse_args()
+
+def main() -> None:
+    arguments = parse_arguments()
+    if arguments.sync and not shutil.which("telnet"):
+        raise SystemExit("Blocking sessions need telnet client")
+    switches = SwitchSimulator.addresses(arguments.switches, arguments.models.split(","))
+    results = BenchResults()
+
+    # connection messages of hundreds of switches are hidden
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if arguments.sync:
+            run_sync(switches, arguments, results)
+        else:
+            asyncio.run(run_async(switches, arguments, results))
+    print(results.report(len(switches), arguments.duration))
+    print(f"total {time.perf_counter() - started:.1f} s")
+    if arguments.timings:
+        print(Timings.summary())
+
+if __name__ == "__main__":
+    main()
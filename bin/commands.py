@@ -1,31 +1,30 @@
 #!/usr/bin/python3
-from typing import TypeAlias, TypedDict
+import re
+from functools import cache
+from typing import TypeAlias
 
-# alias for most of returned dictionaries
-CommandRegexData: TypeAlias = dict[str, str]
-
-# typeddist alias for show ports regex result
-class ShowPortsCommandRegex(TypedDict):
-    command: str
-    regex: list[str]
+# alias for most of returned dictionaries, output is parsed by switch_parser
+CommandData: TypeAlias = dict[str, str]
 
 
 ##### SWITCH MODELS #####
 
+# "snmp": bytes counters are read by snmp instead of cli, port number is interface index
+
 # base_switches = {"DES-3028", "DES-3200-28", "DES-3526", "DGS-3000-24TC", "DGS-3200-24", "DGS-1210-28/ME", "DGS-3120-24TC"}
 
 SWITCHES = {# L2
             "DES-3028": {"base_switch": "DES-3028", "ports": 28},
             "DES-3052": {"base_switch": "DES-3028", "ports": 52},
-            "DES-3200-28": {"base_switch": "DES-3200-28", "ports": 28},
+            "DES-3200-28": {"base_switch": "DES-3200-28", "ports": 28, "snmp": True},
             "DES-3526": {"base_switch": "DES-3526", "ports": 26},
-            "DGS-3000-24TC": {"base_switch": "DGS-3000-24TC", "ports": 24},
-            "DGS-3000-26TC": {"base_switch": "DGS-3000-24TC", "ports": 24},
+            "DGS-3000-24TC": {"base_switch": "DGS-3000-24TC", "ports": 24, "snmp": True},
+            "DGS-3000-26TC": {"base_switch": "DGS-3000-24TC", "ports": 24, "snmp": True},
             "DGS-3200-24": {"base_switch": "DGS-3200-24", "ports": 24},
-            "DGS-1210-28/ME": {"base_switch": "DGS-1210-28/ME", "ports": 28},
-            "DGS-1210-52/ME": {"base_switch": "DGS-1210-28/ME", "ports": 52},
+            "DGS-1210-28/ME": {"base_switch": "DGS-1210-28/ME", "ports": 28, "snmp": True},
+            "DGS-1210-52/ME": {"base_switch": "DGS-1210-28/ME", "ports": 52, "snmp": True},
             # L2+
-            "DGS-3120-24TC": {"base_switch": "DGS-3120-24TC", "ports": 24},
+            "DGS-3120-24TC": {"base_switch": "DGS-3120-24TC", "ports": 24, "snmp": True},
             # L3
             "DGS-3120-24SC": {},
             "DGS-3620-28TC": {},
@@ -37,16 +36,14 @@ CISCO_SWITCH = "DGS-3630-28SC"
 
 ##### BASE COMMANDS #####
 
-def show_model(cli_type: str) -> CommandRegexData:
+def show_model(cli_type: str) -> CommandData:
     match cli_type:
         case "d-link":
-            return {"command": "show switch",
-                    "regex": r"Device Type\s+:\s+(?P<model>\S+)\s+.*Default Gateway\s+:\s+(?P<default_gateway>(\d{1,3}\.){3}\d{1,3})"}
+            return {"command": "show switch"}
         case "cisco":
-            return {"command": "show version",
-                    "regex": r"-+\s+1\s+(?P<model>\S+)\s+"}
+            return {"command": "show version"}
 
-def clipaging(model: str) -> CommandRegexData:
+def clipaging(model: str) -> CommandData:
     match model:
         case x if x == CISCO_SWITCH:
             return {"disable": "terminal length 0",
@@ -58,11 +55,101 @@ def clipaging(model: str) -> CommandRegexData:
 
 ##### COMMANDS FOR L2 SWITCH #####
 
-def show_packet(model: str, user_port: int) -> CommandRegexData:
+def show_packet(model: str, user_port: int) -> CommandData:
+    match model:
+        case "DES-3028" | "DGS-1210-28/ME" | "DGS-3000-24TC" | "DES-3526" | "DGS-3120-24TC" | "DGS-3200-24" | "DES-3200-28":
+            return {"command": f"show packet ports {user_port}"}
+
+# compact ports into d-link port list, e.g. [1, 2, 3, 5] into "1-3,5"
+def port_list(user_ports: list[int]) -> str:
+    ranges: list[list[int]] = []
+    for port in sorted(set(user_ports)):
+        # continue current range or start new one
+        if ranges and port == ranges[-1][1] + 1:
+            ranges[-1][1] = port
+        else:
+            ranges.append([port, port])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+# output ends with prompt, or with continuation of self-refreshing page
+def show_packet_ports(model: str, user_ports: list[int]) -> CommandData:
     match model:
         case "DES-3028" | "DGS-1210-28/ME" | "DGS-3000-24TC" | "DES-3526" | "DGS-3120-24TC":
-            return {"command": f"show packet ports {user_port}",
-                    "regex": r"Total/(\d)?sec.*RX Bytes\s+\d+\s+(\d+).*TX Bytes\s+\d+\s+(\d+).*#"}
+            return {"command": f"show packet ports {port_list(user_ports)}",
+                    "end": "#"}
         case "DGS-3200-24" | "DES-3200-28":
-            return {"command": f"show packet ports {user_port}",
-                    "regex": r"Total/(\d)?sec.*RX Bytes\s+\d+\s+(\d+).*TX Bytes\s+\d+\s+(\d+).*CTRL"}
+            return {"command": f"show packet ports {port_list(user_ports)}",
+                    "end": "CTRL"}
+
+
+##### SNMP COUNTERS FOR L2 SWITCH #####
+
+# 64-bit rx and tx bytes columns of IF-MIB ifXTable, interface index is appended
+IF_HC_IN_OCTETS = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6)
+IF_HC_OUT_OCTETS = (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 10)
+
+
+##### PRE-BUILT COMMANDS AND COMPILED REGEXES #####
+
+# prompt after every command, continuation of long output, and both with continuation's index 0
+PROMPT = re.compile(b"#")
+MORE = re.compile(b"CTRL")
+OUTPUT_END = [MORE, PROMPT]
+
+# symbol to quit long output
+QUIT = b"q"
+
+# encoded model info command for cli type
+@cache
+def model_command(cli_type: str) -> bytes:
+    return show_model(cli_type)["command"].encode()
+
+# commands of one model, built once at model detection
+class CommandProfile:
+    model: str
+    clipaging_disable: bytes
+    clipaging_enable: bytes
+    live_page: bool
+    packet_terminator: bytes
+    __base_model: str | None
+    __packet_commands: dict[int, bytes]
+    __ports_commands: dict[tuple[int, ...], bytes]
+
+    # init by full model name
+    def __init__(self, model: str) -> None:
+        self.model = model
+
+        # clipaging commands
+        turn_clipaging = clipaging(model)
+        self.clipaging_disable = turn_clipaging["disable"].encode()
+        self.clipaging_enable = turn_clipaging["enable"].encode()
+
+        # packet commands exist for L2 models only, port 0 is a placeholder to get output's ending
+        self.__base_model = SWITCHES[model].get("base_switch")
+        ports = show_packet_ports(self.__base_model, [0]) if self.__base_model else None
+        self.live_page = bool(ports) and ports["end"] == "CTRL"   # dynamic page must be quit after reading
+        self.packet_terminator = MORE.pattern if self.live_page else PROMPT.pattern
+
+        # encoded packet commands by port and by ports
+        self.__packet_commands = {}
+        self.__ports_commands = {}
+
+    # encoded packet command for port, built once
+    def show_packet(self, user_port: int) -> bytes:
+        command = self.__packet_commands.get(user_port)
+        if command is None:
+            command = self.__packet_commands[user_port] = show_packet(self.__base_model, user_port)["command"].encode()
+        return command
+
+    # encoded packet command for several ports, built once for the same ports
+    def show_packet_ports(self, user_ports: list[int]) -> bytes:
+        key = tuple(user_ports)
+        command = self.__ports_commands.get(key)
+        if command is None:
+            command = self.__ports_commands[key] = show_packet_ports(self.__base_model, user_ports)["command"].encode()
+        return command
+
+# one profile for every model
+@cache
+def profile(model: str) -> CommandProfile:
+    return CommandProfile(model)
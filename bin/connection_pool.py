@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+
+##### CLASS TO SHARE A BOUNDED NUMBER OF DATABASE CONNECTIONS #####
+
+class ConnectionPool:
+    __connect: Callable[[], Any]
+    __max_size: int
+    __check_after: float
+    __timeout: float
+    __idle: list[tuple[Any, float]]
+    __size: int
+    __closed: bool
+    __condition: threading.Condition
+
+    # init by function making new connection, max number of open connections, seconds of idleness before health check, seconds to wait for free connection
+    def __init__(self, connect: Callable[[], Any], max_size: int, check_after: float, timeout: float) -> None:
+        self.__connect = connect
+        self.__max_size = max_size
+        self.__check_after = check_after
+        self.__timeout = timeout
+
+        # free connections with monotonic time of release, number of all open connections
+        self.__idle = []
+        self.__size = 0
+        self.__closed = False
+        self.__condition = threading.Condition()
+
+    # take free connection, or open new one if limit allows, or wait for released one
+    def acquire(self) -> Any:
+        deadline = time.monotonic() + self.__timeout
+        while True:
+            with self.__condition:
+                while not self.__idle and self.__size >= self.__max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self.__closed:
+                        raise TimeoutError("No free database connection")
+                    self.__condition.wait(remaining)
+
+                # the most recently used connection is the most likely alive
+                if self.__idle:
+                    connection, released = self.__idle.pop()
+                else:
+                    connection, released = None, 0.0
+                    self.__size += 1
+
+            # open new connection out of lock, give the place back if failed
+            if connection is None:
+                try:
+                    return self.__connect()
+                except BaseException:
+                    self.__discard(None)
+                    raise
+
+            # connection idle for long time may be closed by server, ping it and take another one if dead
+            if time.monotonic() - released < self.__check_after:
+                return connection
+            try:
+                connection.ping(reconnect=False)
+                return connection
+            except Exception:
+                self.__discard(connection)
+
+    # return connection to pool, closed or broken connection is dropped
+    def release(self, connection: Any) -> None:
+        if not connection.open or self.__closed:
+            self.__discard(connection)
+            return
+
+        with self.__condition:
+            self.__idle.append((connection, time.monotonic()))
+            self.__condition.notify()
+
+    # close free connections, busy ones are closed when released
+    def close(self) -> None:
+        with self.__condition:
+            self.__closed = True
+            idle, self.__idle = self.__idle, []
+            self.__condition.notify_all()
+        for connection, _ in idle:
+            self.__discard(connection)
+
+    # close connection and free its place
+    def __discard(self, connection: Any | None) -> None:
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        with self.__condition:
+            self.__size -= 1
+            self.__condition.notify()
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import threading
+from typing import TYPE_CHECKING
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+
+##### CLASS TO SEND SAMPLES OF WORKER PROCESS TO SUPERVISOR #####
+
+class ConnectionWriter:
+    __connection: Connection
+    __lock: threading.Lock
+    __written: int
+
+    # init by sending end of pipe to supervisor, which writes samples of all workers into one named pipe
+    def __init__(self, connection: Connection) -> None:
+        self.__connection = connection
+
+        # switches' threads send at the same time, connection isn't thread-safe
+        self.__lock = threading.Lock()
+        self.__written = 0
+
+    # send chunk like pipe writer does, supervisor reads all the time, so it only waits while supervisor takes previous chunks;
+    # supervisor gone is end of output
+    def put(self, chunk: bytes) -> None:
+        with self.__lock:
+            try:
+                self.__connection.send_bytes(chunk)
+            except OSError:
+                raise EOFError("Supervisor closed connection") from None
+            self.__written += 1
+
+    # close connection, supervisor sees its end
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    # counters like pipe writer's, nothing is dropped here
+    def get_stats(self) -> dict[str, int]:
+        with self.__lock:
+            return {"written": self.__written, "dropped": 0, "attached": 1}
+
+    # drops are reported by supervisor's pipe writer
+    def report(self) -> None:
+        pass
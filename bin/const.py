@@ -1,9 +1,31 @@
 #!/usr/bin/python3
 from typing import Final
-from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv())   # find .env file
 import os
 
+# plain KEY=VALUE lines and comments are read here, dotenv is imported only for file with quotes, expansions or export;
+# variables already set in environment are kept like dotenv does
+def _load_env_file(path: str) -> None:
+    variables = {}
+    with open(path) as file:
+        for line in map(str.strip, file):
+            if not line or line.startswith("#"):
+                continue
+            key, separator, value = map(str.strip, line.partition("="))
+            if not separator or not key.isidentifier() or any(symbol in value for symbol in "\"'`$\\#"):
+                from dotenv import load_dotenv
+                load_dotenv(path)
+                return
+            variables[key] = value
+    for key, value in variables.items():
+        os.environ.setdefault(key, value)
+
+# .env file from ENV_FILE, next to modules or in project's root, without walking directories
+for env_file in (os.getenv("ENV_FILE", ""), os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"),
+                 os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")):
+    if env_file and os.path.isfile(env_file):
+        _load_env_file(env_file)
+        break
+
 
 ##### DATABASE FIELDS AND CONSTANTS #####
 
@@ -25,6 +47,20 @@ class Database:
     # usernum field name
     USERNUM: Final[str] = "Number"
 
+    # max open connections of process, seconds of idleness before connection is pinged, seconds to wait for free connection
+    POOL_SIZE: Final[int] = int(os.getenv("DB_POOL_SIZE", "4"))
+    POOL_CHECK_AFTER: Final[float] = 30.0
+    POOL_TIMEOUT: Final[float] = 10.0
+
+    # seconds to wait for connecting and every answer, so slow database doesn't hold scan
+    TIMEOUT: Final[float] = float(os.getenv("DB_TIMEOUT", "5"))
+
+    # users' switches and ports kept in memory: max users and seconds before asking database again,
+    # optional sqlite file to keep them between runs
+    TOPOLOGY_SIZE: Final[int] = 10000
+    TOPOLOGY_TTL: Final[float] = 60 * 60
+    TOPOLOGY_SNAPSHOT: Final[str] = os.getenv("TOPOLOGY_SNAPSHOT", "")
+
 
 ##### CONSTANTS FOR CITY SWITCH DIAGNOSTICS #####
 
@@ -32,6 +68,47 @@ class CitySwitch:
     # types of cli to identify model
     CLI_TYPES: Final[list[str]] = ["d-link", "cisco"]
 
+    # file of known switch models by ip and seconds before model is probed again
+    MODEL_CACHE: Final[str] = os.getenv("MODEL_CACHE", os.path.expanduser("~/.cache/packet_scan/models.json"))
+    MODEL_CACHE_TTL: Final[float] = 7 * 24 * 60 * 60
+
+    # switches pinged at once before connecting, seconds while ping result is used instead of pinging again,
+    # seconds to wait for answer to single packet of quick check before connecting
+    PING_TASKS: Final[int] = 256
+    PING_TTL: Final[float] = 30.0
+    PING_QUICK_TIMEOUT: Final[float] = 0.5
+
+    # lines of one command's output without its ending before output is unexpected, so endless output doesn't grow until timeout
+    MAX_OUTPUT_LINES: Final[int] = 2000
+
+    # telnet port of switches, another one for simulated switches
+    TELNET_PORT: Final[int] = int(os.getenv("TELNET_PORT", "23"))
+
+    # counters are read by snmp v2c on models that support it only if turned on, as agents may be filtered or have other community;
+    # agent of switches, seconds to wait for response and resends, seconds while switch with failed snmp is read by cli only
+    SNMP: Final[bool] = os.getenv("SNMP", "0") == "1"
+    SNMP_PORT: Final[int] = int(os.getenv("SNMP_PORT", "161"))
+    SNMP_COMMUNITY: Final[str] = os.getenv("SNMP_COMMUNITY", "public")
+    SNMP_TIMEOUT: Final[float] = 1.0
+    SNMP_RETRIES: Final[int] = 1
+    SNMP_RETRY: Final[float] = 24 * 60 * 60
+
+    # file of connection health by ip, seconds between writes of it while switches are healthy
+    HEALTH_FILE: Final[str] = os.getenv("SWITCH_HEALTH", os.path.expanduser("~/.cache/packet_scan/health.json"))
+    HEALTH_SAVE: Final[float] = 60.0
+
+    # seconds of connection attempt to unknown switch and bounds of timeout learned from its latencies,
+    # min seconds of learned timeout of commands, as command's output takes longer than login prompt
+    CONNECT_TIMEOUT: Final[float] = 5.0
+    CONNECT_TIMEOUT_MIN: Final[float] = 1.0
+    CONNECT_TIMEOUT_MAX: Final[float] = 10.0
+    COMMAND_TIMEOUT_MIN: Final[float] = 2.0
+
+    # failed connections in a row before switch fails fast, seconds before next try, doubled by every failure up to max
+    BREAKER_FAILURES: Final[int] = 3
+    BREAKER_COOLDOWN: Final[float] = 60.0
+    BREAKER_MAX_COOLDOWN: Final[float] = 15 * 60.0
+
 
 
 ##### PACKET SCANNING CONSTANTS #####
@@ -39,3 +116,41 @@ class CitySwitch:
 class PacketScan:
     # pipe for packet scanning path
     PIPE: Final[str] = os.getenv("PIPE")
+
+    # max samples waiting for slow or absent pipe reader, the oldest are dropped
+    PIPE_BUFFER: Final[int] = 256
+
+    # seconds to write samples still waiting for reader when scan is over, the rest is dropped
+    PIPE_FLUSH_TIMEOUT: Final[float] = 1.0
+
+    # seconds before crashed worker process is started again, doubled by every crash up to max,
+    # seconds of work after which worker isn't crashing anymore, seconds for workers to close connections on exit before kill
+    WORKER_RESTART: Final[float] = 1.0
+    WORKER_MAX_RESTART: Final[float] = 30.0
+    WORKER_STABLE: Final[float] = 60.0
+    WORKER_CLOSE_TIMEOUT: Final[float] = 10.0
+
+    # unix socket of resident scan daemon
+    SOCKET: Final[str] = os.getenv("SCAN_SOCKET", "/tmp/packet_scan.sock")
+
+    # seconds daemon keeps switch session after its last client left, so returning clients don't log in again
+    SESSION_IDLE: Final[float] = 5 * 60.0
+
+    # local http port for timings in prometheus format, 0 to turn off
+    METRICS_PORT: Final[int] = int(os.getenv("METRICS_PORT", "0"))
+
+    # default polling interval and max interval when switch answers slowly, seconds
+    INTERVAL: Final[float] = 1.0
+    MAX_INTERVAL: Final[float] = 10.0
+
+    # samples kept for every port and default window of statistics in seconds
+    HISTORY_SIZE: Final[int] = 3600
+    STATS_WINDOW: Final[float] = 60.0
+
+    # samples in block of record file, max size of record file before rotation, seconds between syncs to disk
+    RECORD_BLOCK: Final[int] = 256
+    RECORD_MAX_BYTES: Final[int] = 64 * 1024 * 1024
+    RECORD_FSYNC: Final[float] = 10.0
+
+    # bytes per second of 10G port, faster change of counters is reset, not wrap
+    MAX_PORT_RATE: Final[float] = 10 * 1000 ** 3 / 8
@@ -1,28 +1,46 @@
 #!/usr/bin/python3
-from typing import TypedDict
-import pymysql.cursors
+from __future__ import annotations
+from typing import TypedDict, TYPE_CHECKING
+import threading
+from functools import partial
 import os
+# user's modules
+from connection_pool import ConnectionPool
+from const import Database
+
+# import as type only, driver is imported by the first connection
+if TYPE_CHECKING:
+    import pymysql
 
 # typed dict class for result of switch-port query
 class SwitchPortData(TypedDict):
     switchP: str
     PortP: int
 
+# typed dict class for result of switch-port query for several users
+class UserSwitchPortData(SwitchPortData):
+    Number: int
+
 
 ##### MAIN QUERIES #####
 
 class Queries:
     GET_SWITCH_PORT = "SELECT switchP, PortP FROM users WHERE Number = %s"
+    GET_SWITCH_PORTS = "SELECT Number, switchP, PortP FROM users WHERE Number IN ({})"
+    GET_ALL_SWITCH_PORTS = "SELECT Number, switchP, PortP FROM users"
+    GET_SWITCH_USERS = "SELECT Number, switchP, PortP FROM users WHERE switchP = %s"
 
 ##### CLASS TO GET DATA FROM THE DATABASE #####
 
 class DatabaseManager:
+    __pool: ConnectionPool | None = None
+    __pool_lock: threading.Lock = threading.Lock()
     __SERVER: str
     __DATABASE: str
     __USER: str
     __PASSWORD: str
     __CHARSET: str
-    __connection: pymysql.Connection
+    __connection: pymysql.Connection | None
     
     # init data and connect to database
     def __init__(self) -> None:
@@ -35,25 +53,85 @@ class DatabaseManager:
         # start session
         self.__start_connection()
     
-    # start
+    # start with connection from pool shared by all managers of process
     def __start_connection(self) -> None:
         print("Connecting to database...")
-        self.__connection = pymysql.connect(host=self.__SERVER,
-                                            user=self.__USER,
-                                            password=self.__PASSWORD,
-                                            database=self.__DATABASE,
-                                            charset=self.__CHARSET,
-                                            cursorclass=pymysql.cursors.DictCursor)
+        self.__connection = None
+        with DatabaseManager.__pool_lock:
+            if DatabaseManager.__pool is None:
+                import pymysql.cursors
+                connect = partial(pymysql.connect,
+                                  host=self.__SERVER,
+                                  user=self.__USER,
+                                  password=self.__PASSWORD,
+                                  database=self.__DATABASE,
+                                  charset=self.__CHARSET,
+                                  cursorclass=pymysql.cursors.DictCursor,
+                                  connect_timeout=Database.TIMEOUT,
+                                  read_timeout=Database.TIMEOUT,
+                                  autocommit=True)   # connection kept in pool sees fresh data on every query
+                DatabaseManager.__pool = ConnectionPool(connect, Database.POOL_SIZE, Database.POOL_CHECK_AFTER, Database.POOL_TIMEOUT)
+        self.__connection = DatabaseManager.__pool.acquire()
         print("Success")
-    
-    # delete, close connection
+
+    # delete, give connection back
     def __del__(self) -> None:
+        self.close()
+
+    # give connection back to pool, broken one is closed by pool
+    def close(self) -> None:
+        # if connection is not taken, it's nothing to close
+        if getattr(self, "_DatabaseManager__connection", None) is None:
+            return
+
         print("Closing connection to database...")
-        #self.__connection.close()
+        DatabaseManager.__pool.release(self.__connection)
+        self.__connection = None
         print("Success")
+
+    # close all connections of process, e.g. on exit of daemon
+    @staticmethod
+    def close_pool() -> None:
+        with DatabaseManager.__pool_lock:
+            if DatabaseManager.__pool is not None:
+                DatabaseManager.__pool.close()
+                DatabaseManager.__pool = None
     
     # get switch and port for user
     def get_switch_port(self, usernum: int) -> SwitchPortData:
         with self.__connection.cursor() as cursor:
             cursor.execute(Queries.GET_SWITCH_PORT, (usernum,))
-            return cursor.fetchone()
\ No newline at end of file
+            return cursor.fetchone()
+    
+    # get switches and ports for several users in one query, users not found are absent in result
+    def get_switch_ports(self, usernums: list[int]) -> dict[int, SwitchPortData]:
+        # nothing to query
+        if not usernums:
+            return {}
+        
+        # one placeholder for every usernum
+        query = Queries.GET_SWITCH_PORTS.format(", ".join(["%s"] * len(usernums)))
+        with self.__connection.cursor() as cursor:
+            cursor.execute(query, tuple(usernums))
+            rows: list[UserSwitchPortData] = cursor.fetchall()
+        
+        # usernum as key, switch and port as value
+        return {row.pop("Number"): row for row in rows}
+    
+    # get switches and ports of all users for bulk refresh of cache
+    def get_all_switch_ports(self) -> dict[int, SwitchPortData]:
+        with self.__connection.cursor() as cursor:
+            cursor.execute(Queries.GET_ALL_SWITCH_PORTS)
+            rows: list[UserSwitchPortData] = cursor.fetchall()
+        
+        # usernum as key, switch and port as value
+        return {row.pop("Number"): row for row in rows}
+    
+    # get ports and usernums of all users on switch
+    def get_switch_users(self, switch: str) -> dict[int, SwitchPortData]:
+        with self.__connection.cursor() as cursor:
+            cursor.execute(Queries.GET_SWITCH_USERS, (switch,))
+            rows: list[UserSwitchPortData] = cursor.fetchall()
+        
+        # usernum as key, switch and port as value
+        return {row.pop("Number"): row for row in rows}
@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import sys
+import time
+import os
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, NoReturn, override
+# user's modules
+from my_exception import ExceptionType, MyException
+from model_cache import ModelCache
+from reachability import Reachability
+from snmp_counters import SnmpCounters
+from switch_health import SwitchHealth
+from timings import Timings
+import commands
+import switch_parser
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from io import BufferedWriter
+
+
+##### LOGIC OF NETWORK DEVICES SHARED BY BLOCKING AND EVENT LOOP CLASSES, THEY ONLY SEND AND READ #####
+
+class NetworkDeviceLogic(ABC):
+    _ipaddress: str
+    _device_type_name: str
+    _output: BufferedWriter | None
+    _session: object | None
+
+    # all devices init by ip
+    def __init__(self, ipaddress: str, device_type_name: str, print_output: bool) -> None:
+        # define ip
+        self._ipaddress = ipaddress
+
+        # device layer and type, also session output buffer for output
+        self._device_type_name = device_type_name
+        self._output = sys.stdout.buffer if print_output else None
+        self._session = None
+
+    # device failed several times in a row fails fast with the same error until cooldown ends
+    def _check_health(self) -> None:
+        print(f"Connecting to {self._device_type_name}...")
+        error = SwitchHealth.check(self._ipaddress)
+        if error:
+            print(f"{self._device_type_name} failed recently, not connecting")
+            raise MyException(self._get_exception_type(error))
+
+    # packet loss of device pinged just before connecting, so it isn't pinged again
+    def _known_loss(self) -> float | None:
+        return Reachability.get(self._ipaddress)
+
+    # connection failed: not available if 100% loss, freezing/lagging if >0% loss, otherwise it's tried again
+    def _failed_attempt(self, packet_loss: float) -> None:
+        if packet_loss == 1:
+            self._fail("NOT_AVAILABLE")
+        elif packet_loss > 0:
+            self._fail("FREEZES")
+        print(f"Connecting to {self._device_type_name}...")
+
+    # device hanging after login fails like device not connecting
+    def _froze_after_connecting(self) -> NoReturn:
+        print(f"{self._device_type_name} stopped answering after connecting")
+        self._fail("FREEZES")
+
+    # connection's time is remembered for timeouts of next ones only when device works after it
+    def _connected(self, seconds: float) -> None:
+        SwitchHealth.observe(self._ipaddress, seconds)
+        print("Success")
+
+    # device not answering a command in time is a failure like failed connection, so it fails fast when it repeats
+    def _command_timeout(self) -> None:
+        SwitchHealth.failure(self._ipaddress, "FREEZES")
+
+    # remember failed connection and raise exception of device type
+    def _fail(self, error: str) -> NoReturn:
+        SwitchHealth.failure(self._ipaddress, error)
+        raise MyException(self._get_exception_type(error))
+
+    # method to get exception for different device types
+    @abstractmethod
+    def _get_exception_type(self, error):
+        raise NotImplementedError(f"Method {sys._getframe(0).f_code.co_name} not implemented in child class")
+
+    # model of device for timings, override if device knows it
+    def _get_model_label(self) -> str:
+        return ""
+
+
+##### LOGIC OF L2-L3 SWITCHES: PROMPTS, COMMANDS AND PARSERS #####
+
+class SwitchLogic(NetworkDeviceLogic):
+    _LOGIN_PROMPT: str = "(U|u)ser(N|n)ame:"
+    __USERNAME: str
+    __PASSWORD: str
+    _model: str
+    __default_gateway: str
+    _profile: commands.CommandProfile
+
+    # init by ip with the same username and password
+    def __init__(self, ipaddress: str, device_type_name: str, print_output: bool) -> None:
+        # get connection's environment
+        self.__USERNAME = os.getenv("NET_USER")
+        self.__PASSWORD = os.getenv("NET_PASSWORD")
+
+        # switch model name and default gateway
+        self._model = ""
+        self.__default_gateway = ""   # for d-link, is used only in base class
+
+        # pre-built commands and regexes of model, known after connecting
+        self._profile = None
+
+        # run base constructor with device type name
+        super().__init__(ipaddress, device_type_name, print_output)
+
+    # lines to send at login, each with prompt that answers it
+    def _login_dialog(self) -> list[tuple[str, str]]:
+        return [(self.__USERNAME, "(P|p)ass(W|w)ord:"), (self.__PASSWORD, "#")]
+
+    # model known from previous connections, if it's still in the list of models
+    def _cached_model(self) -> bool:
+        cached = ModelCache.get(self._ipaddress)
+        if cached and cached["model"] in commands.SWITCHES:
+            self._model, self.__default_gateway = cached["model"], cached["default_gateway"]
+            return True
+        return False
+
+    # define model and default gateway if they are found in model info
+    def _take_model(self, parser: switch_parser.ModelParser) -> None:
+        found = parser.result(self._ipaddress)
+        if found:
+            self._model, self.__default_gateway = found
+
+    # remember probed model, exception if model unknown; model is timed only when it's probed
+    def _remember_model(self, cli_type: str, logged_in: float) -> None:
+        if not self._model:
+            raise MyException(ExceptionType.UNKNOWN_MODEL, self._ipaddress)
+        ModelCache.put(self._ipaddress, self._model, commands.SWITCHES[self._model].get("base_switch", ""),
+                       self.__default_gateway, cli_type)
+        Timings.observe("probe", self._model, time.perf_counter() - logged_in)
+
+    # login is timed when model is known, commands and regexes of model are built once
+    def _logged_in(self, started: float, logged_in: float) -> None:
+        Timings.observe("login", self._model, logged_in - started)
+        self._profile = commands.profile(self._model)
+
+    # for d-link, clipaging is restored on switch before exit
+    def _restores_clipaging(self) -> bool:
+        return self._model != commands.CISCO_SWITCH
+
+    # method to generate exceptions for switches
+    @override
+    def _get_exception_type(self, error: str) -> ExceptionType:
+        return getattr(ExceptionType, f"SWITCH_{error}")
+
+    # output of model's command is not as expected, so cached model may be wrong and is probed on next connection
+    def _unexpected_output(self) -> MyException:
+        ModelCache.invalidate(self._ipaddress)
+        return MyException(ExceptionType.SWITCH_UNEXPECTED_OUTPUT, self._ipaddress)
+
+    # base model for timings, the same label before and after L2 switch replaces model by base one
+    @override
+    def _get_model_label(self) -> str:
+        return commands.SWITCHES.get(self._model, {}).get("base_switch") or self._model
+
+    # get model variable
+    def get_model(self) -> str:
+        return self._model
+
+    # get default gateway variable
+    def get_default_gateway(self) -> str:
+        return self.__default_gateway
+
+
+##### LOGIC OF L2 SWITCHES: PACKET PARSERS AND SNMP FALLBACK #####
+
+class L2SwitchLogic(SwitchLogic):
+    _snmp: SnmpCounters | None = None   # counters are read by cli until snmp is started
+
+    # bytes are read by snmp if it's turned on, model supports it and it didn't fail on this switch recently, cli session stays
+    # for other commands and as fallback when snmp fails; base model is saved for further diagnosing
+    def _start_snmp(self, snmp: bool) -> None:
+        if snmp and commands.SWITCHES[self._model].get("snmp") and not SwitchHealth.snmp_failed(self._ipaddress):
+            self._snmp = SnmpCounters(self._ipaddress)
+        self._model = commands.SWITCHES[self._model]["base_switch"]
+
+    # failed snmp leaves counters to cli until session ends and isn't tried on this switch for a while
+    def _snmp_failed(self, error: Exception) -> dict[int, tuple[int]]:
+        print(f"Failed to get counters by SNMP, reading them by CLI: {error}")
+        SwitchHealth.snmp_failure(self._ipaddress)
+        self._close_snmp()
+        return {}
+
+    # close snmp socket if it's open
+    def _close_snmp(self) -> None:
+        if self._snmp:
+            self._snmp.close()
+            self._snmp = None
+
+    # bytes are read by snmp
+    def uses_snmp(self) -> bool:
+        return self._snmp is not None
+
+    # parser of one port's output, redraws of self-refreshing page have terminal control sequences
+    def _packet_parser(self, counters: bool) -> switch_parser.PacketParser:
+        if self._profile.live_page:
+            return switch_parser.LivePacketParser(self._profile.packet_terminator, counters)
+        return switch_parser.PacketParser(self._profile.packet_terminator, counters)
+
+    # parser of several ports' output
+    def _ports_parser(self, user_ports: list[int], counters: bool) -> switch_parser.PortsPacketParser:
+        return switch_parser.PortsPacketParser(self._profile.packet_terminator, user_ports, counters)
+
+    # rx and tx bytes as integers, output without them is unexpected; parsing is timed apart from waiting for output
+    def _packets(self, parser: switch_parser.PacketParser) -> tuple[int]:
+        Timings.observe("parse", self._model, parser.seconds)
+        if not parser.found:
+            raise self._unexpected_output()
+        return parser.result()
+
+    # packet output is self-refreshing page, so it can be streamed
+    def has_live_page(self) -> bool:
+        return self._profile.live_page
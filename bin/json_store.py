@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+import fcntl
+import json
+import os
+from typing import Any
+
+
+##### JSON FILE OF ENTRIES BY KEY SHARED BY PROCESSES #####
+
+# entries from file, missing or broken file is no entries
+def load(path: str) -> dict[str, Any]:
+    try:
+        with open(path) as file:
+            entries = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+# write changed keys of entries into file and return entries of file with them: file is read again under lock, so entries learned
+# by other processes since it was read are kept, keys missing in entries are removed; whole file is written through temporary one,
+# so readers never get half of it, file is optional and None is returned if it's not writable
+def merge_save(path: str, entries: dict[str, Any], changed: set[str]) -> dict[str, Any] | None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        # lock is released when its file is closed, also by dying process
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = load(path)
+            for key in changed:
+                if key in entries:
+                    merged[key] = entries[key]
+                else:
+                    merged.pop(key, None)
+            with open(temp_path, "w") as file:
+                json.dump(merged, file)
+            os.replace(temp_path, path)
+        return merged
+    except OSError:
+        return None
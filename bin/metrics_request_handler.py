@@ -0,0 +1,21 @@
+#!/usr/bin/python3
+from http.server import BaseHTTPRequestHandler
+# user's modules
+from timings import Timings
+
+
+##### HTTP HANDLER FOR PROMETHEUS SCRAPES #####
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    # timings on any path
+    def do_GET(self) -> None:
+        body = Timings.export().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # scrapes are not logged to console
+    def log_message(self, format: str, *args) -> None:
+        pass
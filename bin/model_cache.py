@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+import threading
+import time
+from typing import TypedDict
+# user's modules
+from const import CitySwitch
+import json_store
+
+
+# typeddict for model of switch known by ip
+class ModelCacheEntry(TypedDict):
+    model: str
+    base_switch: str
+    default_gateway: str
+    cli_type: str
+    verified: float
+
+
+##### CLASS TO REMEMBER SWITCH MODELS BETWEEN RUNS #####
+
+class ModelCache:
+    __path: str = CitySwitch.MODEL_CACHE
+    __ttl: float = CitySwitch.MODEL_CACHE_TTL
+    __entries: dict[str, ModelCacheEntry] | None = None
+    __changed: set[str] = set()
+    __lock: threading.Lock = threading.Lock()
+
+    # model of switch if it was verified not long ago
+    @classmethod
+    def get(cls, ipaddress: str) -> ModelCacheEntry | None:
+        with ModelCache.__lock:
+            entry = ModelCache.__load().get(ipaddress)
+
+        # expired entry is probed again
+        if entry is None or time.time() - entry["verified"] > ModelCache.__ttl:
+            return None
+        return entry
+
+    # remember model found by probe
+    @classmethod
+    def put(cls, ipaddress: str, model: str, base_switch: str, default_gateway: str, cli_type: str) -> None:
+        with ModelCache.__lock:
+            ModelCache.__load()[ipaddress] = ModelCacheEntry(model=model, base_switch=base_switch, default_gateway=default_gateway,
+                                                             cli_type=cli_type, verified=time.time())
+            ModelCache.__changed.add(ipaddress)
+            ModelCache.__save()
+
+    # forget model, e.g. switch answered not as its model does
+    @classmethod
+    def invalidate(cls, ipaddress: str) -> None:
+        with ModelCache.__lock:
+            if ModelCache.__load().pop(ipaddress, None) is not None:
+                ModelCache.__changed.add(ipaddress)
+                ModelCache.__save()
+
+    # read file once per process, missing or broken file is empty cache
+    @staticmethod
+    def __load() -> dict[str, ModelCacheEntry]:
+        if ModelCache.__entries is None:
+            ModelCache.__entries = json_store.load(ModelCache.__path)
+        return ModelCache.__entries
+
+    # merge changed models into file, so models learned by other processes aren't overwritten and are known here too,
+    # changes are kept for next time if file isn't writable
+    @staticmethod
+    def __save() -> None:
+        merged = json_store.merge_save(ModelCache.__path, ModelCache.__entries, ModelCache.__changed)
+        if merged is not None:
+            ModelCache.__entries = merged
+            ModelCache.__changed.clear()
@@ -0,0 +1,245 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import traceback
+import threading
+import signal
+import time
+import sys
+from typing import TYPE_CHECKING, Any
+# user's modules
+from database_manager import DatabaseManager, SwitchPortData
+from topology_cache import TopologyCache
+from L2_switch_session import L2SwitchSession
+from port_monitor import PortMonitor
+from port_history import PortStatistics
+from poll_scheduler import PollScheduler
+from sample_encoder import SampleEncoder, get_encoder
+from pipe_writer import PipeWriter
+from timings import Timings
+from reachability import Reachability
+from my_exception import ExceptionType, MyException
+from sample_recorder import SampleRecorder
+from const import Database, PacketScan
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from connection_writer import ConnectionWriter
+
+
+##### CLASS FOR PACKET SCANNING OF SEVERAL USERS #####
+
+class MultiPacketScanHandler:
+    _usernums: list[int]
+    __interval: float
+    __counters: bool
+    __window_ns: int
+    __encoder: SampleEncoder
+    __record_dir: str | None
+    __output: ConnectionWriter | None
+    _db_manager: DatabaseManager
+    _records: dict[int, dict[str, Any]]
+    __switches: dict[str, list[PortMonitor]]
+    __stop: threading.Event
+
+    # init by usernums, polling interval in seconds, rates source: switch's per second column or cumulative counters averaged in window,
+    # format of samples in pipe, directory to record samples into files and output instead of named pipe, e.g. to supervisor
+    def __init__(self, usernums: list[int], interval: float = PacketScan.INTERVAL, counters: bool = False, window: float = 0,
+                 output_format: str = "text", record_dir: str | None = None, output: ConnectionWriter | None = None) -> None:
+        # init by usernums without duplicates, order is kept
+        self._usernums = list(dict.fromkeys(usernums))
+
+        # pause between polls of every switch
+        self.__interval = interval
+
+        # calculate rates from counters by ourselves and window for averaging them
+        self.__counters = counters
+        self.__window_ns = round(window * 1e9)
+
+        # text lines with usernum by default
+        self.__encoder = get_encoder(output_format, with_usernum=True)
+
+        # samples aren't recorded by default
+        self.__record_dir = record_dir
+
+        # samples go to named pipe by default
+        self.__output = output
+
+        # handle signal with "kill" command and CTRL+C key for safe exiting
+        signal.signal(signal.SIGTERM, self.__handle_exit)
+        signal.signal(signal.SIGINT, self.__handle_exit)
+
+        # records by usernum, user's monitors grouped by switch
+        self._records = {}
+        self.__switches = {}
+
+        # event to stop all switch threads
+        self.__stop = threading.Event()
+
+    # handler for safe exiting, gets signal number and stack frame and exits successfully
+    def __handle_exit(self, sig, frame) -> None:
+        sys.exit(0)
+
+    # main function
+    def check_packet(self) -> None:
+        # get data from database for all switch connections
+        try:
+            self.__get_switch_ports()
+        except Exception:   # exception while checking records
+            print("Exception while working with the database records:")
+            traceback.print_exc()
+            return
+
+        # scan packet on all switches and provide data for bash script by pipe
+        try:
+            self.__scan_packet()
+        # exceptions while working with pipe, show traceback
+        except Exception:
+            print("Exception while working with equipment:")
+            traceback.print_exc()
+
+    # print fields of all found users
+    def print_records(self) -> None:
+        for usernum, record in self._records.items():
+            print("-" * 20)
+            print(f"{Database.USERNUM}:{' '*(12-len(Database.USERNUM))}{usernum}")
+            for key, val in record.items():
+                print(f"{key}:{' '*(12-len(key))}{val}")
+        print("-" * 20)
+
+    # working with topology cache, users not known yet are asked from database in one query
+    def __get_switch_ports(self) -> None:
+        rows = TopologyCache.get_switch_ports(self._usernums, self.__query_switch_ports)
+
+        # convert fields and group users by switch, report not found ones
+        for usernum in self._usernums:
+            if usernum not in rows:
+                print(f"User {usernum} not found in the database")
+                continue
+
+            record = {Database.KEY_FIELD[key]: value for key, value in rows[usernum].items()}
+            self._records[usernum] = record
+            self.__switches.setdefault(record["switch"], []).append(PortMonitor(usernum, record["port"], self.__window_ns))
+
+    # working with database, all users in one query
+    def __query_switch_ports(self, usernums: list[int]) -> dict[int, SwitchPortData]:
+        try:
+            # connect and get users' switches and ports from database
+            self._db_manager = DatabaseManager()
+            return self._db_manager.get_switch_ports(usernums)
+
+        finally:   # always close connection and delete database manager
+            del self._db_manager
+
+    # run thread for every switch and wait for them
+    def __scan_packet(self) -> None:
+        # pipe is written by separate thread, so slow or absent bash script never delays polling
+        pipe = self.__output or PipeWriter(PacketScan.PIPE)
+
+        # all switches are pinged at once by one packet, switches that answer or can't be pinged start at once,
+        # the rest are checked by full ping in their own threads, so they don't delay others
+        losses = Reachability.check(list(self.__switches), quick=True)
+        threads = []
+        for ipaddress, monitors in self.__switches.items():
+            target = self.__check_switch if losses.get(ipaddress, 0) > 0 else self.__scan_switch
+            threads.append(threading.Thread(target=target, args=(ipaddress, monitors, pipe), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        # wait for threads in short steps so signal can interrupt waiting
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(0.5)
+
+        # catch exit from bash or by signal
+        except SystemExit:
+            pass
+
+        # stop all threads and let them close switch connections, then stop writing
+        finally:
+            self.__stop.set()
+            for thread in threads:
+                thread.join()
+            pipe.close()
+            pipe.report()
+
+            # traffic of every user
+            for monitors in self.__switches.values():
+                for monitor in monitors:
+                    if len(monitor.history):
+                        print(f"User {monitor.usernum}, port {monitor.port}:\n{monitor.format_statistics()}", end="")
+
+    # statistics of user's traffic within last seconds or of whole kept history, None if user isn't scanned or before the first sample
+    def get_statistics(self, usernum: int, window: float | None = None) -> PortStatistics | None:
+        for monitors in self.__switches.values():
+            for monitor in monitors:
+                if monitor.usernum == usernum:
+                    return monitor.statistics(window)
+        return None
+
+    # switch didn't answer quick ping: check it by full ping, unavailable one is reported instead of failed connection and not scanned
+    def __check_switch(self, ipaddress: str, monitors: list[PortMonitor], pipe: PipeWriter) -> None:
+        error = Reachability.get_error(Reachability.check([ipaddress]).get(ipaddress))
+        if error:
+            print(f"Equipment {ipaddress}: {MyException(getattr(ExceptionType, f'SWITCH_{error}'))}")
+            if error == "NOT_AVAILABLE":
+                return
+        self.__scan_switch(ipaddress, monitors, pipe)
+
+    # scan all user's ports on one switch over one session until stopped
+    def __scan_switch(self, ipaddress: str, monitors: list[PortMonitor], pipe: PipeWriter) -> None:
+        session: L2SwitchSession | None = None
+        watched: list[int] = []
+
+        # samples of every user are also recorded to disk if asked
+        recorders = {monitor.usernum: SampleRecorder(self.__record_dir, monitor.usernum, monitor.port)
+                     for monitor in monitors} if self.__record_dir else {}
+        try:
+            # connect to switch once and watch every user's port
+            for monitor in monitors:
+                session = L2SwitchSession.acquire(ipaddress, monitor.port)
+                watched.append(monitor.port)
+
+            # poll at fixed interval, switches are shifted from each other, until stopped
+            scheduler = PollScheduler(self.__interval, PacketScan.MAX_INTERVAL)
+            while scheduler.wait(self.__stop):
+                # get bytes on all ports by one command, switch's response time slows polling if needed
+                started = time.monotonic_ns()
+                packets = session.get_packets_ports(watched, self.__counters)
+                finished = time.monotonic_ns()
+                scheduler.done((finished - started) / 1e9)
+                ready: list[PortMonitor] = []
+                for monitor in monitors:
+                    # calculate megabit with max, from counters there is no rate after first sample
+                    if not self.__counters:
+                        monitor.update(*packets[monitor.port], finished)
+                    elif not monitor.update_counters(*packets[monitor.port], finished):
+                        continue
+                    ready.append(monitor)
+                    if recorders:
+                        recorders[monitor.usernum].append(monitor)
+
+                # write samples of all users of switch at once, by default usernum before rx, rx_max, tx, tx_max to distinguish users
+                if ready:
+                    with Timings.span("encode", session.get_model()):
+                        pipe.put(self.__encoder.encode_batch(ready))
+
+        # eof ending, others switches keep working
+        except EOFError:
+            pass
+
+        # exceptions while working with this switch, show traceback
+        except Exception:
+            print(f"Exception while working with equipment {ipaddress}:")
+            traceback.print_exc()
+
+            # users may have been moved to another switch or port, ask database next time
+            for monitor in monitors:
+                TopologyCache.invalidate(monitor.usernum)
+
+        # always stop watching ports, connection closes with the last one
+        finally:
+            for port in watched:
+                session.remove_port(port)
+            for recorder in recorders.values():
+                recorder.close()
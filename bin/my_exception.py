@@ -13,6 +13,11 @@ class ExceptionType(str, Enum):
     SWITCH_CANNOT_CONNECT: str = "L2: не удаётся подключиться к свитчу, свитч пингуется"
 
     UNKNOWN_MODEL: str = "L2: неизвестная модель свитча с IP "
+    SWITCH_UNEXPECTED_OUTPUT: str = "L2: неожиданный ответ свитча с IP "
+
+    DAEMON_RUNNING: str = "daemon: сокет уже занят работающим демоном "
+    RECORD_UNREADABLE: str = "record: файл записи пуст или не отображается в память "
+    PIPE_NOT_SET: str = "pipe: не задан путь именованного канала в переменной PIPE"
 
 
 ##### CLASS FOR USER'S EXCEPTION AND ERRORS' CODES #####
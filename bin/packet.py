@@ -1,22 +1,155 @@
 #!/usr/bin/python3
-import sys
-# user's modules
-from packet_scan_handler import PacketScanHandler
+import argparse
+import signal
+# user's modules, handlers are imported by their modes only, so every mode starts without others' dependencies
+from poll_scheduler import parse_interval
+from sample_encoder import FORMATS
+from timings import Timings
+from const import PacketScan
+
+
+##### ARGUMENTS PARSING #####
+
+# convert comma separated usernums into list
+def usernum_list(value: str) -> list[int]:
+    return [int(usernum) for usernum in value.split(",") if usernum.strip()]
+
+# convert number of worker processes, 0 means one per cpu
+def worker_count(value: str) -> int:
+    workers = int(value)
+    if workers < 0:
+        raise ValueError(f"Negative number of workers: {value}")
+    return workers
+
+# read usernums from file, one per line, empty lines and comments are skipped
+def read_users_file(path: str) -> list[int]:
+    with open(path) as file:
+        return [int(line) for line in map(str.strip, file) if line and not line.startswith("#")]
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scan packets on users' switch ports")
+    parser.add_argument("usernum", nargs="?", type=int, help="single usernum to scan")
+    parser.add_argument("--users", type=usernum_list, default=[], help="comma separated usernums to scan together")
+    parser.add_argument("--users-file", help="file with usernums to scan together, one per line")
+    parser.add_argument("--switch", help="scan all users on switch with this ip")
+    parser.add_argument("--port", type=int, help="with --switch, scan users on this port only")
+    parser.add_argument("--sort", choices=["total", "rx", "tx"], default="total", help="with --switch, rank ports by this traffic")
+    parser.add_argument("--interval", type=parse_interval, default=PacketScan.INTERVAL,
+                        help="pause between polls of switch, e.g. 1s or 500ms")
+    parser.add_argument("--counters", action="store_true",
+                        help="calculate rates from cumulative bytes counters instead of switch's per second column")
+    parser.add_argument("--window", type=parse_interval, default=0,
+                        help="window to average rates from counters, e.g. 5s, default is between two polls")
+    parser.add_argument("--format", choices=FORMATS, default="text",
+                        help="samples in pipe: text lines for packet.sh, struct records or ndjson")
+    parser.add_argument("--no-stream", dest="stream", action="store_false",
+                        help="poll switches with self-refreshing packet page by command instead of reading its redraws")
+    parser.add_argument("--workers", type=worker_count, default=1,
+                        help="with --users, scan switches in this many processes, 0 for one per cpu")
+    parser.add_argument("--record", metavar="DIR", help="also record samples of every user into files in this directory")
+    parser.add_argument("--replay", metavar="FILE", help="write samples from record file into pipe instead of scanning")
+    parser.add_argument("--speed", type=float, default=1.0, help="with --replay, speed relative to recording, 0 for no pauses")
+    parser.add_argument("--daemon", action="store_true", help="run resident daemon serving clients on socket")
+    parser.add_argument("--attach", action="store_true", help="get users' lines from running daemon instead of scanning")
+    parser.add_argument("--socket", default=PacketScan.SOCKET, help="unix socket of daemon")
+    parser.add_argument("--metrics-port", type=int, default=PacketScan.METRICS_PORT,
+                        help="serve phase timings in prometheus format on this local port, 0 to turn off")
+    parser.add_argument("--refresh-topology", action="store_true", help="reload switches and ports of all users from database into cache")
+    return parser.parse_args()
+
+
+##### ATTACHING TO DAEMON #####
+
+# get users' lines from running daemon, False if nobody listens on socket, e.g. it's left by dead daemon, so users are scanned here
+def attach(socket_path: str, usernums: list[int]) -> bool:
+    from scan_client import ScanClient
+    try:
+        client = ScanClient(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        print(f"No scan daemon on {socket_path}, scanning directly")
+        return False
+    client.forward_to_pipe(usernums)
+    return True
 
 
 ##### START SCANNING #####
 
 def main() -> None:
-    # get usernum from argument string, first element of argv is file's name
-    if len(sys.argv) >= 2:
-        usernum = int(sys.argv[1])
+    arguments = parse_arguments()
+
+    # timings of connect, login, probe, poll and write phases: on http port if asked and on "kill -USR1" to stderr
+    signal.signal(signal.SIGUSR1, Timings.dump)
+    if arguments.metrics_port:
+        Timings.serve(arguments.metrics_port)
+
+    # bulk refresh of users' switches and ports
+    if arguments.refresh_topology:
+        from database_manager import DatabaseManager
+        from topology_cache import TopologyCache
+        db_manager = DatabaseManager()
+        try:
+            print(f"{TopologyCache.refresh(db_manager.get_all_switch_ports())} users in topology cache")
+        finally:
+            db_manager.close()
+        return
+
+    # recorded samples go to pipe as if they were scanned now
+    if arguments.replay:
+        from replay_handler import ReplayHandler
+        ReplayHandler(arguments.replay, arguments.speed, arguments.format).replay()
+        return
+
+    # resident daemon keeps database and switch connections for all clients
+    if arguments.daemon:
+        from scan_daemon import ScanDaemon
+        ScanDaemon(arguments.socket, arguments.interval, arguments.counters, arguments.window).serve()
+        return
+
+    # all users on switch ranked by traffic, for outage triage
+    if arguments.switch:
+        from switch_scan_handler import SwitchScanHandler
+        handler = SwitchScanHandler(arguments.switch, arguments.port, arguments.interval, arguments.counters, arguments.window, arguments.sort)
+        handler.check_packet()
+        return
+
+    # several users from argument string and/or file
+    usernums = arguments.users + (read_users_file(arguments.users_file) if arguments.users_file else [])
+    if usernums:
+        # daemon scans users for this client
+        if arguments.attach and attach(arguments.socket, usernums):
+            return
+
+        # switches are split between worker processes, their samples go to one pipe
+        if arguments.workers != 1:
+            from shard_supervisor import ShardSupervisor
+            supervisor = ShardSupervisor(usernums, arguments.workers, arguments.interval, arguments.counters, arguments.window,
+                                         arguments.format, arguments.record)
+            supervisor.check_packet()
+            return
+
+        # create handler object for all users and run diagnostics
+        from multi_packet_scan_handler import MultiPacketScanHandler
+        handler = MultiPacketScanHandler(usernums, arguments.interval, arguments.counters, arguments.window, arguments.format,
+                                         arguments.record)
+        handler.check_packet()
+        return
+
+    # get usernum from argument string
+    if arguments.usernum is not None:
+        usernum = arguments.usernum
     # or from input
     else:
         usernum = int(input("Usernum: "))
-    
+
+    # daemon scans user for this client
+    if arguments.attach and attach(arguments.socket, [usernum]):
+        return
+
     # create handler object and run diagnostics
-    handler = PacketScanHandler(usernum)
+    from packet_scan_handler import PacketScanHandler
+    handler = PacketScanHandler(usernum, arguments.interval, arguments.counters, arguments.window, arguments.format, arguments.record,
+                                arguments.stream)
     handler.check_packet()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -33,8 +33,13 @@ trap cleanup EXIT INT TERM
 # turn off echo, get symbols directly without Enter, allow special symbols as CTRL+C
 stty -echo -icanon isig
 
-# run python script in the background and catch its process id
-python3 "$PYTHON_SCRIPT" "$USERNUM" &
+# run python script in the background and catch its process id, get lines from resident daemon if it's running,
+# socket left by dead daemon is refused and python script scans directly then
+if [ -S "${SCAN_SOCKET:-/tmp/packet_scan.sock}" ]; then
+    python3 "$PYTHON_SCRIPT" --attach "$USERNUM" &
+else
+    python3 "$PYTHON_SCRIPT" "$USERNUM" &
+fi
 PY_PID=$!
 
 # start values
@@ -1,31 +1,62 @@
 #!/usr/bin/python3
 import traceback
 import signal
+import time
 import sys
 import os
-from typing import Any
+from typing import Any, Iterator
 # user's modules
 from base_handler import BaseHandler
-from database_manager import DatabaseManager
+from database_manager import DatabaseManager, SwitchPortData
+from topology_cache import TopologyCache
 from L2_switch import L2Switch
+from port_monitor import PortMonitor
+from port_history import PortStatistics
+from poll_scheduler import PollScheduler
+from sample_encoder import SampleEncoder, get_encoder
+from pipe_writer import PipeWriter
+from timings import Timings
+from sample_recorder import SampleRecorder
 from const import Database, PacketScan
 
 
 ##### CLASS FOR PACKET SCANNING #####
 
 class PacketScanHandler(BaseHandler):
-    __rx_megabit: int
-    __max_rx_megabit: int
-    __tx_megabit: int
-    __max_tx_megabit: int
+    __monitor: PortMonitor
+    __interval: float
+    __counters: bool
+    __window_ns: int
+    __encoder: SampleEncoder
+    __record_dir: str | None
+    __stream: bool
     _db_manager: DatabaseManager
     _record_data: dict[str, Any]
     _L2_manager: L2Switch
 
-    def __init__(self, usernum: int) -> None:
+    # init by usernum, polling interval in seconds, rates source: switch's per second column or cumulative counters averaged in window,
+    # format of samples in pipe, directory to record samples into files and reading redraws of self-refreshing page instead of polling
+    def __init__(self, usernum: int, interval: float = PacketScan.INTERVAL, counters: bool = False, window: float = 0,
+                 output_format: str = "text", record_dir: str | None = None, stream: bool = True) -> None:
         # init with base constructor
         super().__init__(usernum)
 
+        # pause between polls of switch
+        self.__interval = interval
+
+        # calculate rates from counters by ourselves and window for averaging them
+        self.__counters = counters
+        self.__window_ns = round(window * 1e9)
+
+        # text line for bash script by default
+        self.__encoder = get_encoder(output_format)
+
+        # samples aren't recorded by default
+        self.__record_dir = record_dir
+
+        # switches with self-refreshing page are streamed at their own refresh rate by default
+        self.__stream = stream
+
         # handle signal with "kill" command and CTRL+C key for safe exiting
         signal.signal(signal.SIGTERM, self.__handle_exit)
         signal.signal(signal.SIGINT, self.__handle_exit)
@@ -34,12 +65,6 @@ class PacketScanHandler(BaseHandler):
         #if not os.path.exists(PacketScan.PIPE):
         #    os.mkfifo(PacketScan.PIPE)
 
-        # variables
-        self.__rx_megabit = 0
-        self.__max_rx_megabit = 0
-        self.__tx_megabit = 0
-        self.__max_tx_megabit = 0
-
     # handler for safe exiting, gets signal number and stack frame and exits successfully
     def __handle_exit(self, sig, frame) -> None:
         sys.exit(0)
@@ -61,57 +86,101 @@ class PacketScanHandler(BaseHandler):
             print("Exception while working with equipment:")
             traceback.print_exc()
 
-    # working with database
+            # user may have been moved to another switch or port, ask database next time
+            TopologyCache.invalidate(self._usernum)
+
+    # working with topology cache, database is asked only if user is not known yet
     def __get_switch_port(self) -> None:
+        dict_data = TopologyCache.get_switch_ports([self._usernum], self.__query_switch_ports).get(self._usernum)
+        if dict_data is None:
+            raise LookupError(f"User {self._usernum} not found in the database")
+        self._record_data = {Database.KEY_FIELD[key]: value for key, value in dict_data.items()}
+
+    # working with database
+    def __query_switch_ports(self, usernums: list[int]) -> dict[int, SwitchPortData]:
         try:
             # connect and get user's switch and port from database
             self._db_manager = DatabaseManager()
-            dict_data = self._db_manager.get_switch_port(self._usernum)
-            self._record_data = {Database.KEY_FIELD[key]: value for key, value in dict_data.items()}
+            return self._db_manager.get_switch_ports(usernums)
         
         finally:   # always close connection and delete database manager
             del self._db_manager
     
     # get packet statstics at this moment
-    def __get_packet_port(self) -> None:
+    def __get_packet_port(self) -> tuple[int]:
+        if self.__counters:
+            return self._L2_manager.get_packets_port(counters=True)
         return self._L2_manager.get_packets_port()
+
+    # samples of switch: redraws of self-refreshing page at switch's rate, or polls at fixed interval until interrupted,
+    # switches read by snmp are polled as it needs no page
+    def __get_samples(self) -> Iterator[tuple[int]]:
+        if self.__stream and self._L2_manager.has_live_page() and not self._L2_manager.uses_snmp():
+            yield from self._L2_manager.stream_packets_port(counters=self.__counters)
+            return
+
+        # poll at fixed interval, the first sample at once, as one switch has no load to spread
+        scheduler = PollScheduler(self.__interval, PacketScan.MAX_INTERVAL, jitter=False)
+        while True:
+            scheduler.wait()
+
+            # get bytes, switch's response time slows polling if needed
+            started = time.monotonic_ns()
+            packets = self.__get_packet_port()
+            scheduler.done((time.monotonic_ns() - started) / 1e9)
+            yield packets
     
     # check and write packet to named pipe
     def __scan_packet(self) -> None:
-        # calculate megabit and max megabit
-        def calculate_current_and_max(rx_bytes: int, tx_bytes: int) -> None:
-            self.__rx_megabit = BaseHandler._byte_to_megabit(rx_bytes)
-            self.__tx_megabit = BaseHandler._byte_to_megabit(tx_bytes)
-            self.__max_rx_megabit = max(self.__max_rx_megabit, self.__rx_megabit)
-            self.__max_tx_megabit = max(self.__max_tx_megabit, self.__tx_megabit)
+        # current and max megabit on user's port
+        self.__monitor = PortMonitor(self._usernum, self._record_data["port"], self.__window_ns)
+
+        # pipe is written by separate thread, so slow or absent bash script never delays polling
+        pipe = PipeWriter(PacketScan.PIPE)
 
+        # samples are also recorded to disk if asked
+        recorder = SampleRecorder(self.__record_dir, self._usernum, self._record_data["port"]) if self.__record_dir else None
+        samples = None
         try:
             # connect to switch
             self._L2_manager = L2Switch(self._record_data["switch"], self._record_data["port"])
+            model = self._L2_manager.get_model()
             
-            # open pipe with buffering by every line, not to collect lines in python script's buffer
-            with open(PacketScan.PIPE, "w", buffering=1) as pipe:
-                # run until interrupted
-                while True:
-                    # get bytes and calculate megabit with max
-                    calculate_current_and_max(*self.__get_packet_port())
-
-                    # try block needed because bash script always reads data from pipe and closes promtply
-                    try:
-                        # write rx, rx_max, tx, tx_max with spaces in one string into pipe
-                        pipe.write(f"{self.__rx_megabit} {self.__max_rx_megabit} {self.__tx_megabit} {self.__max_tx_megabit}\n")
-
-                        # forcely write data from buffer into pipe
-                        pipe.flush()
-                    
-                    # ignore broken pipe error when bash is not reading
-                    except BrokenPipeError:
-                        pass
+            # every sample until interrupted
+            samples = self.__get_samples()
+            for packets in samples:
+                finished = time.monotonic_ns()
+
+                # calculate megabit with max, from counters there is no rate after first sample
+                if not self.__counters:
+                    self.__monitor.update(*packets, finished)
+                elif not self.__monitor.update_counters(*packets, finished):
+                    continue
+
+                # keep sample on disk
+                if recorder:
+                    recorder.append(self.__monitor)
+
+                # encoded sample, by default rx, rx_max, tx, tx_max with spaces in one string
+                with Timings.span("encode", model):
+                    pipe.put(self.__encoder.encode(self.__monitor))
         
-        # catch error for correct exiting: eof ending, broken pipe by bash, exit from bash
-        except (EOFError, BrokenPipeError, SystemExit):
+        # catch error for correct exiting: eof ending, exit from bash
+        except (EOFError, SystemExit):
             pass
             
-        # always close connection and delete L2 and L3 managers
+        # always stop writing, report traffic, close connection and delete L2 and L3 managers
         finally:
+            # quit self-refreshing page before closing connection
+            if samples:
+                samples.close()
+            pipe.close()
+            pipe.report()
+            if recorder:
+                recorder.close()
+            print(self.__monitor.format_statistics(), end="")
             del self._L2_manager
+
+    # statistics of user's traffic within last seconds or of whole kept history, None before the first sample
+    def get_statistics(self, window: float | None = None) -> PortStatistics | None:
+        return self.__monitor.statistics(window)
@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+import os
+import select
+import threading
+import time
+from collections import deque
+# user's modules
+from my_exception import ExceptionType, MyException
+from const import PacketScan
+from timings import Timings
+
+
+##### CLASS TO WRITE INTO PIPE WITHOUT STOPPING POLLING #####
+
+class PipeWriter:
+    # seconds between attempts to open pipe without reader, and to wait for free space in pipe
+    __RETRY: float = 0.05
+
+    __path: str
+    __capacity: int
+    __buffer: deque[bytes]
+    __condition: threading.Condition
+    __closing: bool
+    __deadline: float
+    __fd: int | None
+    __writing: bool
+    __thread: threading.Thread
+    __written: int
+    __dropped: int
+    __attached: int
+
+    # init by pipe path and max chunks waiting for reader, start writing thread; without path nothing could ever be written
+    def __init__(self, path: str | None, capacity: int = PacketScan.PIPE_BUFFER) -> None:
+        if not path:
+            raise MyException(ExceptionType.PIPE_NOT_SET)
+        self.__path = path
+        self.__capacity = capacity
+
+        # chunks not written yet, the oldest are dropped when reader is slow or absent
+        self.__buffer = deque()
+        self.__condition = threading.Condition()
+        self.__closing = False
+        self.__deadline = 0.0
+
+        # pipe is opened when reader appears, chunk taken from buffer is being written
+        self.__fd = None
+        self.__writing = False
+
+        # written and dropped chunks, times of opening pipe
+        self.__written = 0
+        self.__dropped = 0
+        self.__attached = 0
+
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    # add chunk from polling thread, never blocks; waiting caller like replay blocks instead of dropping until reader takes chunks
+    def put(self, chunk: bytes, wait: bool = False) -> None:
+        with self.__condition:
+            if wait:
+                self.__condition.wait_for(lambda: self.__closing or len(self.__buffer) + self.__writing < self.__capacity)
+            if len(self.__buffer) >= self.__capacity:
+                self.__buffer.popleft()
+                self.__dropped += 1
+            self.__buffer.append(chunk)
+            self.__condition.notify_all()
+
+    # wait until reader took all chunks, without reader it waits for one to appear
+    def flush(self) -> None:
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__closing or not self.__buffer and not self.__writing)
+
+    # stop writing thread and close pipe, chunks are still written while reader takes them within timeout, the rest is dropped
+    def close(self, timeout: float = PacketScan.PIPE_FLUSH_TIMEOUT) -> None:
+        with self.__condition:
+            self.__closing = True
+            self.__deadline = time.monotonic() + timeout
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    # counters of written and dropped chunks and reader's attachments
+    def get_stats(self) -> dict[str, int]:
+        with self.__condition:
+            return {"written": self.__written, "dropped": self.__dropped, "attached": self.__attached}
+
+    # print dropped chunks, if any, when scan is over
+    def report(self) -> None:
+        stats = self.get_stats()
+        if stats["dropped"]:
+            print(f"Pipe reader was slow or absent: {stats['dropped']} of {stats['written'] + stats['dropped']} samples dropped")
+
+    # write chunks while there are any, reopen pipe every time reader comes back
+    def __run(self) -> None:
+        pending = b""   # rest of chunk written partially, must be finished so reader sees whole chunk
+        while True:
+            with self.__condition:
+                while not self.__closing and not pending and not self.__buffer:
+                    self.__condition.wait()
+                if self.__closing and (not pending and not self.__buffer or time.monotonic() >= self.__deadline):
+                    break
+
+            # no reader, chunks wait in buffer, on close nobody would take them
+            if self.__fd is None and not self.__attach():
+                with self.__condition:
+                    if self.__closing:
+                        break
+                    self.__condition.wait_for(lambda: self.__closing, self.__RETRY)
+                continue
+
+            # next chunk unless previous one is not finished
+            whole = not pending
+            if whole:
+                with self.__condition:
+                    data = self.__buffer.popleft()
+                    self.__writing = True
+            else:
+                data = pending
+
+            # chunk up to pipe's buffer size is written whole or not at all
+            try:
+                with Timings.span("write"):
+                    count = os.write(self.__fd, data)
+
+            # pipe is full, reader is slow
+            except BlockingIOError:
+                count = 0
+                select.select([], [self.__fd], [], self.__RETRY)
+
+            # reader left, the rest of chunk is useless for next reader
+            except BrokenPipeError:
+                self.__detach()
+                if not whole:
+                    with self.__condition:
+                        self.__dropped += 1
+                        self.__writing = False
+                        self.__condition.notify_all()
+                    pending = b""
+                    continue
+                count = 0
+
+            # chunk not started is put back to be the first, unless buffer is already full
+            if whole and count == 0:
+                with self.__condition:
+                    if len(self.__buffer) < self.__capacity:
+                        self.__buffer.appendleft(data)
+                    else:
+                        self.__dropped += 1
+                    self.__writing = False
+                    self.__condition.notify_all()
+                continue
+
+            pending = data[count:]
+            if not pending:
+                with self.__condition:
+                    self.__written += 1
+                    self.__writing = False
+                    self.__condition.notify_all()
+
+        # chunks left on close are dropped like ones dropped for slow reader
+        with self.__condition:
+            self.__dropped += len(self.__buffer) + bool(pending)
+            self.__buffer.clear()
+            self.__writing = False
+            self.__condition.notify_all()
+        self.__detach()
+
+    # open pipe without waiting for reader, False if there is no reader or pipe
+    def __attach(self) -> bool:
+        try:
+            self.__fd = os.open(self.__path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            return False
+        with self.__condition:
+            self.__attached += 1
+        return True
+
+    # close pipe after reader left
+    def __detach(self) -> None:
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import random
+import re
+import time
+from typing import TYPE_CHECKING
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from threading import Event
+
+
+##### CLASS TO PACE POLLING OF ONE TARGET #####
+
+class PollScheduler:
+    # smoothing factor for response time, part of interval the switch may be busy with our commands
+    __SMOOTHING: float = 0.3
+    __DUTY: float = 0.5
+
+    __interval: float
+    __max_interval: float
+    __current_interval: float
+    __next_poll: float
+    __response_time: float
+
+    # init by base interval and max interval for back-off in seconds, first poll is shifted randomly within interval
+    def __init__(self, interval: float, max_interval: float, jitter: bool = True) -> None:
+        self.__interval = interval
+        self.__max_interval = max(interval, max_interval)
+        self.__current_interval = interval
+
+        # random phase, so polls of many targets don't synchronize
+        self.__next_poll = time.monotonic() + (random.uniform(0, interval) if jitter else 0)
+
+        # smoothed response time of target
+        self.__response_time = 0.0
+
+    # seconds left until next poll, zero if it's already late
+    def delay(self) -> float:
+        return max(0.0, self.__next_poll - time.monotonic())
+
+    # sleep until next poll, return False if stopped by event while sleeping
+    def wait(self, stop: Event | None = None) -> bool:
+        delay = self.delay()
+        if stop is not None:
+            return not stop.wait(delay)
+        time.sleep(delay)
+        return True
+
+    # register poll's response time and plan next poll
+    def done(self, response_time: float) -> None:
+        # smoothed response time and interval stretched, so switch is busy no more than duty part of time
+        self.__response_time += self.__SMOOTHING * (response_time - self.__response_time)
+        self.__current_interval = min(self.__max_interval, max(self.__interval, self.__response_time / self.__DUTY))
+
+        # next poll on grid from previous one so there is no drift, skip polls already missed
+        self.__next_poll += self.__current_interval
+        now = time.monotonic()
+        if self.__next_poll < now:
+            missed = (now - self.__next_poll) // self.__current_interval + 1
+            self.__next_poll += missed * self.__current_interval
+
+    # current interval with back-off
+    def get_interval(self) -> float:
+        return self.__current_interval
+
+
+##### INTERVAL PARSING #####
+
+# convert "1s", "500ms", "2m" or plain seconds "1.5" to seconds, zero interval would poll without pause
+def parse_interval(value: str) -> float:
+    match = re.fullmatch(r"\s*(\d+(\.\d*)?|\.\d+)\s*(ms|s|m)?\s*", value)
+    if not match:
+        raise ValueError(f"Invalid interval: {value}")
+    seconds = float(match.group(1)) * {"ms": 0.001, "s": 1, "m": 60, None: 1}[match.group(3)]
+    if seconds <= 0:
+        raise ValueError(f"Interval must be positive: {value}")
+    return seconds
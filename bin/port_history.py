@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+import math
+from array import array
+from bisect import bisect_left
+from typing import TypedDict
+# user's modules
+from base_handler import BaseHandler
+
+
+# typeddict for statistics of port's traffic in megabit within window
+class PortStatistics(TypedDict):
+    samples: int
+    seconds: float
+    rx_avg: int
+    rx_p95: int
+    rx_min: int
+    rx_max: int
+    tx_avg: int
+    tx_p95: int
+    tx_min: int
+    tx_max: int
+
+
+##### CLASS TO KEEP LAST SAMPLES OF PORT IN FIXED MEMORY #####
+
+class PortHistory:
+    __capacity: int
+    __timestamps: array
+    __rx: array
+    __tx: array
+    __start: int
+    __count: int
+
+    # init by max number of samples, memory is taken once
+    def __init__(self, capacity: int) -> None:
+        self.__capacity = capacity
+
+        # monotonic timestamps in nanoseconds, rx and tx bytes per second, in ring order
+        self.__timestamps = array("Q", bytes(8 * capacity))
+        self.__rx = array("Q", bytes(8 * capacity))
+        self.__tx = array("Q", bytes(8 * capacity))
+
+        # index of the oldest sample and number of samples
+        self.__start = 0
+        self.__count = 0
+
+    # add sample, the oldest one is overwritten when history is full
+    def append(self, timestamp_ns: int, rx_bytes: int, tx_bytes: int) -> None:
+        index = (self.__start + self.__count) % self.__capacity
+        self.__timestamps[index] = timestamp_ns
+        self.__rx[index] = rx_bytes
+        self.__tx[index] = tx_bytes
+        if self.__count < self.__capacity:
+            self.__count += 1
+        else:
+            self.__start = (self.__start + 1) % self.__capacity
+
+    # number of samples kept
+    def __len__(self) -> int:
+        return self.__count
+
+    # statistics of samples within last seconds, or of all kept samples, None if there are no samples
+    def statistics(self, window: float | None = None) -> PortStatistics | None:
+        if not self.__count:
+            return None
+
+        # first sample within window, timestamps grow in ring order
+        first = 0
+        last_timestamp = self.__timestamps[(self.__start + self.__count - 1) % self.__capacity]
+        if window is not None:
+            first = bisect_left(range(self.__count), last_timestamp - round(window * 1e9),
+                                key=lambda position: self.__timestamps[(self.__start + position) % self.__capacity])
+
+        # samples of window sorted once for min, max and percentile
+        rx = sorted(self.__slice(self.__rx, first))
+        tx = sorted(self.__slice(self.__tx, first))
+        first_timestamp = self.__timestamps[(self.__start + first) % self.__capacity]
+        return PortStatistics(samples=len(rx), seconds=(last_timestamp - first_timestamp) / 1e9,
+                              rx_avg=BaseHandler._byte_to_megabit(sum(rx) / len(rx)), rx_p95=self.__p95(rx),
+                              rx_min=BaseHandler._byte_to_megabit(rx[0]), rx_max=BaseHandler._byte_to_megabit(rx[-1]),
+                              tx_avg=BaseHandler._byte_to_megabit(sum(tx) / len(tx)), tx_p95=self.__p95(tx),
+                              tx_min=BaseHandler._byte_to_megabit(tx[0]), tx_max=BaseHandler._byte_to_megabit(tx[-1]))
+
+    # samples from position in ring order to the newest, by two slices of array at most
+    def __slice(self, values: array, first: int) -> array:
+        begin = (self.__start + first) % self.__capacity
+        end = begin + self.__count - first
+        if end <= self.__capacity:
+            return values[begin:end]
+        return values[begin:] + values[:end - self.__capacity]
+
+    # 95th percentile by nearest rank in megabit
+    @staticmethod
+    def __p95(values: list[int]) -> int:
+        return BaseHandler._byte_to_megabit(values[math.ceil(0.95 * len(values)) - 1])
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+import time
+# user's modules
+from base_handler import BaseHandler
+from rate_meter import CounterRate
+from port_history import PortHistory, PortStatistics
+from const import PacketScan
+
+
+##### CLASS TO TRACK TRAFFIC ON USER'S PORT #####
+
+class PortMonitor:
+    usernum: int
+    port: int
+    timestamp_ns: int
+    rx_bytes: int
+    tx_bytes: int
+    rx_total: int
+    tx_total: int
+    rx_megabit: int
+    max_rx_megabit: int
+    tx_megabit: int
+    max_tx_megabit: int
+    __rx_rate: CounterRate
+    __tx_rate: CounterRate
+    history: PortHistory
+
+    # init by usernum and user's port, no traffic yet, window in nanoseconds to average rates from counters
+    def __init__(self, usernum: int, port: int, window_ns: int = 0) -> None:
+        self.usernum = usernum
+        self.port = port
+
+        # monotonic time of last sample, bytes per second and cumulative bytes if read
+        self.timestamp_ns = 0
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+        self.rx_total = 0
+        self.tx_total = 0
+
+        # current and max megabit
+        self.rx_megabit = 0
+        self.max_rx_megabit = 0
+        self.tx_megabit = 0
+        self.max_tx_megabit = 0
+
+        # rates from cumulative counters
+        self.__rx_rate = CounterRate(PacketScan.MAX_PORT_RATE, window_ns)
+        self.__tx_rate = CounterRate(PacketScan.MAX_PORT_RATE, window_ns)
+
+        # last samples for statistics, memory doesn't grow with run length
+        self.history = PortHistory(PacketScan.HISTORY_SIZE)
+
+    # calculate megabit and max megabit from bytes per second
+    def update(self, rx_bytes: int, tx_bytes: int, timestamp_ns: int | None = None) -> None:
+        self.timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.rx_bytes = rx_bytes
+        self.tx_bytes = tx_bytes
+        self.rx_megabit = BaseHandler._byte_to_megabit(rx_bytes)
+        self.tx_megabit = BaseHandler._byte_to_megabit(tx_bytes)
+        self.max_rx_megabit = max(self.max_rx_megabit, self.rx_megabit)
+        self.max_tx_megabit = max(self.max_tx_megabit, self.tx_megabit)
+        self.history.append(self.timestamp_ns, rx_bytes, tx_bytes)
+
+    # calculate rates from cumulative bytes counters taken at monotonic time, False if there's no rate yet
+    def update_counters(self, rx_total: int, tx_total: int, timestamp_ns: int) -> bool:
+        self.rx_total = rx_total
+        self.tx_total = tx_total
+        rx_rate = self.__rx_rate.update(rx_total, timestamp_ns)
+        tx_rate = self.__tx_rate.update(tx_total, timestamp_ns)
+        if rx_rate is None or tx_rate is None:
+            return False
+
+        self.update(round(rx_rate), round(tx_rate), timestamp_ns)
+        return True
+
+    # rx, rx_max, tx, tx_max with spaces in one string, as bash script reads it
+    def format_line(self) -> str:
+        return f"{self.rx_megabit} {self.max_rx_megabit} {self.tx_megabit} {self.max_tx_megabit}\n"
+
+    # statistics of last seconds or of whole kept history
+    def statistics(self, window: float | None = None) -> PortStatistics | None:
+        return self.history.statistics(window)
+
+    # statistics as text lines for report after scan, empty if there were no samples
+    def format_statistics(self, window: float | None = None) -> str:
+        stats = self.statistics(window)
+        if stats is None:
+            return ""
+        return (f"Last {stats['seconds']:.0f} s, {stats['samples']} samples, Mbit avg/p95/min/max:\n"
+                f"RX: {stats['rx_avg']}/{stats['rx_p95']}/{stats['rx_min']}/{stats['rx_max']}\n"
+                f"TX: {stats['tx_avg']}/{stats['tx_p95']}/{stats['tx_min']}/{stats['tx_max']}\n")
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+from collections import deque
+
+
+##### CLASS TO DERIVE RATE FROM CUMULATIVE COUNTER #####
+
+class CounterRate:
+    # counters on switches are 32 or 64 bit
+    __WRAP_32: int = 2 ** 32
+
+    __max_rate: float
+    __window_ns: int
+    __previous: int | None
+    __total: int
+    __samples: deque[tuple[int, int]]
+
+    # init by max plausible rate in units per second and averaging window in nanoseconds, zero for rate between two samples
+    def __init__(self, max_rate: float, window_ns: int = 0) -> None:
+        self.__max_rate = max_rate
+        self.__window_ns = window_ns
+
+        # last raw counter, total without wraps and resets, timestamps with totals inside window
+        self.__previous = None
+        self.__total = 0
+        self.__samples = deque()
+
+    # add counter taken at monotonic timestamp, return rate per second or None if it can't be calculated yet
+    def update(self, counter: int, timestamp_ns: int) -> float | None:
+        # first sample is only a base for next ones
+        if self.__previous is None:
+            self.__restart(counter, timestamp_ns)
+            return None
+
+        # time didn't go, nothing to divide by
+        elapsed_ns = timestamp_ns - self.__samples[-1][0]
+        if elapsed_ns <= 0:
+            return None
+
+        # counter went back: wrap of 32 bit counter if the rate is plausible, reset (e.g. cleared counters) otherwise
+        delta = counter - self.__previous
+        if delta < 0:
+            wrapped = delta + self.__WRAP_32
+            if self.__previous < self.__WRAP_32 and wrapped * 1e9 / elapsed_ns <= self.__max_rate:
+                delta = wrapped
+            else:
+                self.__restart(counter, timestamp_ns)
+                return None
+
+        # implausible jump is reset too, e.g. switch rebooted and counted from zero to more than before
+        if delta * 1e9 / elapsed_ns > self.__max_rate:
+            self.__restart(counter, timestamp_ns)
+            return None
+
+        self.__previous = counter
+        self.__total += delta
+        self.__samples.append((timestamp_ns, self.__total))
+
+        # keep the last sample taken at or before window start as base
+        while len(self.__samples) > 2 and self.__samples[1][0] <= timestamp_ns - self.__window_ns:
+            self.__samples.popleft()
+
+        # rate between base sample and current one
+        base_timestamp_ns, base_total = self.__samples[0]
+        return (self.__total - base_total) * 1e9 / (timestamp_ns - base_timestamp_ns)
+
+    # forget history and start counting from this sample
+    def __restart(self, counter: int, timestamp_ns: int) -> None:
+        self.__previous = counter
+        self.__samples.clear()
+        self.__samples.append((timestamp_ns, self.__total))
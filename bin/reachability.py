@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import threading
+import time
+# user's modules
+from const import CitySwitch
+
+
+##### CLASS TO PING MANY SWITCHES AT ONCE BEFORE CONNECTING #####
+
+class Reachability:
+    __losses: dict[str, tuple[float, float]] = {}
+    __lock: threading.Lock = threading.Lock()
+
+    # ping all switches at once in new event loop, packet loss by ip, switches that can't be pinged are missing;
+    # quick check sends one packet with short timeout, so it costs one round trip when switches are up
+    @classmethod
+    def check(cls, ipaddresses: list[str], quick: bool = False) -> dict[str, float]:
+        if not ipaddresses:
+            return {}
+        import asyncio   # event loop and icmp are imported by the first check only
+        return asyncio.run(cls.async_check(ipaddresses, quick))
+
+    # ping all switches at once in running event loop, the same 4 packets as after failed connection or one packet if quick
+    @classmethod
+    async def async_check(cls, ipaddresses: list[str], quick: bool = False) -> dict[str, float]:
+        import asyncio
+        from icmplib import async_ping
+        semaphore = asyncio.Semaphore(CitySwitch.PING_TASKS)
+        count, timeout = (1, CitySwitch.PING_QUICK_TIMEOUT) if quick else (4, 1)
+
+        async def ping_one(ipaddress: str) -> float:
+            async with semaphore:
+                return (await async_ping(ipaddress, count=count, timeout=timeout, interval=0.25, privileged=False)).packet_loss
+
+        # errors like no permission for icmp sockets leave switch unknown, it's checked after failed connection as before
+        results = await asyncio.gather(*map(ping_one, ipaddresses), return_exceptions=True)
+        losses = {ipaddress: loss for ipaddress, loss in zip(ipaddresses, results) if not isinstance(loss, BaseException)}
+
+        # remember results for connections started soon, one lost packet of quick check doesn't mean switch is down
+        now = time.monotonic()
+        with cls.__lock:
+            for ipaddress, loss in losses.items():
+                if not quick or loss == 0:
+                    cls.__losses[ipaddress] = (loss, now)
+        return losses
+
+    # recent packet loss of switch, None if it wasn't pinged recently
+    @classmethod
+    def get(cls, ipaddress: str) -> float | None:
+        with cls.__lock:
+            loss, checked = cls.__losses.get(ipaddress, (None, 0.0))
+        if loss is None or time.monotonic() - checked > CitySwitch.PING_TTL:
+            return None
+        return loss
+
+    # error name by packet loss, like after failed connection: all packets lost or some, None if switch answers or unknown
+    @staticmethod
+    def get_error(loss: float | None) -> str | None:
+        if loss is None or loss == 0:
+            return None
+        return "NOT_AVAILABLE" if loss == 1 else "FREEZES"
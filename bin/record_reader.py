@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+import mmap
+from array import array
+import sys
+from collections.abc import Iterator
+from typing import BinaryIO
+# user's modules
+from sample_recorder import SampleRecorder
+from my_exception import ExceptionType, MyException
+
+
+##### CLASS TO READ RECORDED SAMPLES BY MEMORY MAPPING #####
+
+class RecordReader:
+    usernum: int
+    port: int
+    __block_samples: int
+    __block_size: int
+    __file: BinaryIO
+    __map: mmap.mmap
+
+    # init by path of record file, file may be still written by recorder
+    def __init__(self, path: str) -> None:
+        self.__file = open(path, "rb")
+
+        # empty or truncated file can't be mapped, file isn't left open
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.__file.close()
+            raise MyException(ExceptionType.RECORD_UNREADABLE, path) from None
+
+        # check and read header
+        if len(self.__map) < SampleRecorder.HEADER.size:
+            self.close()
+            raise ValueError(f"Not a record file: {path}")
+        magic, self.usernum, self.port, self.__block_samples = SampleRecorder.HEADER.unpack_from(self.__map)
+        if magic != SampleRecorder.MAGIC:
+            self.close()
+            raise ValueError(f"Not a record file: {path}")
+        self.__block_size = SampleRecorder.BLOCK_HEADER.size + SampleRecorder.COLUMNS * 8 * self.__block_samples
+
+    # samples as tuples of timestamp ns, rx and tx total bytes, rx and tx bytes per second, incomplete last block is skipped
+    def __iter__(self) -> Iterator[tuple[int, int, int, int, int]]:
+        offset = SampleRecorder.HEADER.size
+        while offset + self.__block_size <= len(self.__map):
+            count = SampleRecorder.BLOCK_HEADER.unpack_from(self.__map, offset)[0]
+
+            # block's columns by one copy from map, so map can be closed any time, file is little-endian
+            columns = array("Q", self.__map[offset + SampleRecorder.BLOCK_HEADER.size:offset + self.__block_size])
+            if sys.byteorder != "little":
+                columns.byteswap()
+            yield from zip(*(columns[column * self.__block_samples:column * self.__block_samples + count]
+                             for column in range(SampleRecorder.COLUMNS)))
+            offset += self.__block_size
+
+    # close memory map and file
+    def close(self) -> None:
+        self.__map.close()
+        self.__file.close()
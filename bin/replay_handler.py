@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+import traceback
+import signal
+import time
+import sys
+# user's modules
+from record_reader import RecordReader
+from port_monitor import PortMonitor
+from sample_encoder import SampleEncoder, get_encoder
+from pipe_writer import PipeWriter
+from my_exception import MyException
+from const import PacketScan
+
+
+##### CLASS TO REPLAY RECORDED SAMPLES INTO PIPE #####
+
+class ReplayHandler:
+    __path: str
+    __speed: float
+    __encoder: SampleEncoder
+
+    # init by record file, speed relative to original (0 for no pauses), format of samples in pipe
+    def __init__(self, path: str, speed: float = 1.0, output_format: str = "text") -> None:
+        self.__path = path
+        self.__speed = speed
+        self.__encoder = get_encoder(output_format)
+
+        # handle signal with "kill" command and CTRL+C key for safe exiting
+        signal.signal(signal.SIGTERM, self.__handle_exit)
+        signal.signal(signal.SIGINT, self.__handle_exit)
+
+    # handler for safe exiting, gets signal number and stack frame and exits successfully
+    def __handle_exit(self, sig, frame) -> None:
+        sys.exit(0)
+
+    # main function
+    def replay(self) -> None:
+        try:
+            reader = RecordReader(self.__path)
+        except (OSError, ValueError, MyException):
+            print("Exception while opening the record:")
+            traceback.print_exc()
+            return
+
+        # samples go the same way as while scanning: monitor, encoder, pipe
+        try:
+            pipe = PipeWriter(PacketScan.PIPE)
+        except MyException:
+            print("Exception while opening the pipe:")
+            traceback.print_exc()
+            reader.close()
+            return
+        monitor = PortMonitor(reader.usernum, reader.port)
+        samples = 0
+        started = time.monotonic()
+        try:
+            first_timestamp_ns = None
+            for timestamp_ns, rx_total, tx_total, rx_bytes, tx_bytes in reader:
+                # keep intervals between samples, scaled by speed
+                if first_timestamp_ns is None:
+                    first_timestamp_ns = timestamp_ns
+                if self.__speed > 0:
+                    delay = started + (timestamp_ns - first_timestamp_ns) / 1e9 / self.__speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                # recorded time is wall clock, samples in pipe have monotonic time of replay like scanned ones
+                monitor.rx_total, monitor.tx_total = rx_total, tx_total
+                monitor.update(rx_bytes, tx_bytes, time.monotonic_ns())
+                # replay waits for reader instead of dropping samples, so every recorded sample reaches it
+                pipe.put(self.__encoder.encode(monitor), wait=True)
+                samples += 1
+
+            # reader takes the last samples before pipe is closed
+            pipe.flush()
+
+        # catch exit from bash or by signal
+        except SystemExit:
+            pass
+
+        # always stop writing and report replayed traffic
+        finally:
+            pipe.close()
+            pipe.report()
+            reader.close()
+            print(f"Replayed {samples} samples of user {monitor.usernum}, port {monitor.port} in {time.monotonic() - started:.3f} s")
+            print(monitor.format_statistics(), end="")
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import json
+import struct
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+# user's modules
+from const import PacketScan
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from port_monitor import PortMonitor
+
+
+##### BASE CLASS FOR SAMPLE ENCODERS #####
+
+class SampleEncoder(ABC):
+    # encode one port's sample
+    @abstractmethod
+    def encode(self, monitor: PortMonitor) -> bytes:
+        raise NotImplementedError("Method encode not implemented in child class")
+
+    # encode samples of one poll into one chunk, so they are written into pipe by one call
+    def encode_batch(self, monitors: list[PortMonitor]) -> bytes:
+        return b"".join(map(self.encode, monitors))
+
+
+##### ENCODERS #####
+
+# "rx rx_max tx tx_max" megabit line as bash script reads it, usernum before it to distinguish several users
+class TextEncoder(SampleEncoder):
+    __with_usernum: bool
+
+    def __init__(self, with_usernum: bool = False) -> None:
+        self.__with_usernum = with_usernum
+
+    def encode(self, monitor: PortMonitor) -> bytes:
+        line = monitor.format_line()
+        return (f"{monitor.usernum} {line}" if self.__with_usernum else line).encode()
+
+# fixed size little-endian record: monotonic timestamp ns, usernum, port, cumulative rx and tx bytes (zero if not read), rx and tx bytes per second
+class StructEncoder(SampleEncoder):
+    RECORD: struct.Struct = struct.Struct("<QIH2xQQQQ")
+
+    def encode(self, monitor: PortMonitor) -> bytes:
+        return self.RECORD.pack(monitor.timestamp_ns, monitor.usernum, monitor.port,
+                                monitor.rx_total, monitor.tx_total, monitor.rx_bytes, monitor.tx_bytes)
+
+# one json object per line with all fields of sample and statistics of last window
+class NdjsonEncoder(SampleEncoder):
+    def encode(self, monitor: PortMonitor) -> bytes:
+        return (json.dumps({"timestamp_ns": monitor.timestamp_ns, "usernum": monitor.usernum, "port": monitor.port,
+                            "rx_total": monitor.rx_total, "tx_total": monitor.tx_total,
+                            "rx_bytes": monitor.rx_bytes, "tx_bytes": monitor.tx_bytes,
+                            "rx_megabit": monitor.rx_megabit, "max_rx_megabit": monitor.max_rx_megabit,
+                            "tx_megabit": monitor.tx_megabit, "max_tx_megabit": monitor.max_tx_megabit,
+                            "window": monitor.statistics(PacketScan.STATS_WINDOW)},
+                           separators=(",", ":")) + "\n").encode()
+
+
+##### ENCODER BY NAME #####
+
+FORMATS = ("text", "struct", "ndjson")
+
+# get encoder by format name, text lines of several users have usernum
+def get_encoder(output_format: str, with_usernum: bool = False) -> SampleEncoder:
+    if output_format == "struct":
+        return StructEncoder()
+    if output_format == "ndjson":
+        return NdjsonEncoder()
+    return TextEncoder(with_usernum)
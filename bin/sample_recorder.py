@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import os
+import struct
+import time
+from array import array
+from typing import TYPE_CHECKING
+# user's modules
+from const import PacketScan
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from port_monitor import PortMonitor
+
+
+##### CLASS TO RECORD SAMPLES OF ONE PORT INTO COLUMNAR FILE #####
+
+# file is little-endian: header, then blocks of fixed size, every block is sample count and columns of block size each:
+# wall clock timestamp ns, cumulative rx and tx bytes (zero if not read), rx and tx bytes per second
+class SampleRecorder:
+    MAGIC: bytes = b"PKTREC1\0"
+    HEADER: struct.Struct = struct.Struct("<8sIHxxI12x")
+    BLOCK_HEADER: struct.Struct = struct.Struct("<I4x")
+    COLUMNS: int = 5
+    SUFFIX: str = ".pktrec"
+
+    __directory: str
+    __usernum: int
+    __port: int
+    __block_samples: int
+    __block_size: int
+    __max_bytes: int
+    __fsync_interval: float
+    __wall_offset_ns: int
+    __fd: int | None
+    __block_index: int
+    __file_index: int
+    __count: int
+    __columns: list[array]
+    __last_sync: float
+
+    # init by directory, user and port, samples in block, max file size before rotation, seconds between syncs to disk
+    def __init__(self, directory: str, usernum: int, port: int, block_samples: int = PacketScan.RECORD_BLOCK,
+                 max_bytes: int = PacketScan.RECORD_MAX_BYTES, fsync_interval: float = PacketScan.RECORD_FSYNC) -> None:
+        self.__directory = directory
+        self.__usernum = usernum
+        self.__port = port
+        self.__block_samples = block_samples
+        self.__block_size = self.BLOCK_HEADER.size + self.COLUMNS * 8 * block_samples
+        self.__max_bytes = max_bytes
+        self.__fsync_interval = fsync_interval
+
+        # samples have monotonic time, file keeps wall clock time to find incidents
+        self.__wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+        # current block is kept in memory and written in place until it's full
+        self.__columns = [array("Q", bytes(8 * block_samples)) for _ in range(self.COLUMNS)]
+        self.__count = 0
+        self.__fd = None
+        self.__file_index = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.__open()
+
+    # add last sample of monitor, full block is written, file is synced periodically and rotated when it's big
+    def append(self, monitor: PortMonitor) -> None:
+        index = self.__count
+        self.__columns[0][index] = monitor.timestamp_ns + self.__wall_offset_ns
+        self.__columns[1][index] = monitor.rx_total
+        self.__columns[2][index] = monitor.tx_total
+        self.__columns[3][index] = monitor.rx_bytes
+        self.__columns[4][index] = monitor.tx_bytes
+        self.__count += 1
+
+        # block is full, start next one or next file
+        if self.__count == self.__block_samples:
+            self.__write_block()
+            self.__block_index += 1
+            self.__count = 0
+            if self.HEADER.size + (self.__block_index + 1) * self.__block_size > self.__max_bytes:
+                self.__close_file()
+                self.__open()
+
+        if time.monotonic() - self.__last_sync >= self.__fsync_interval:
+            self.sync()
+
+    # write current block and flush file to disk
+    def sync(self) -> None:
+        if self.__count:
+            self.__write_block()
+        os.fsync(self.__fd)
+        self.__last_sync = time.monotonic()
+
+    # write everything and close file
+    def close(self) -> None:
+        if self.__fd is not None:
+            self.__close_file()
+
+    # new file named by user, port, start time and number of file, so names are sorted in recording order
+    def __open(self) -> None:
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() // 10 ** 6 % 1000:03d}-{self.__file_index:04d}"
+        self.__file_index += 1
+        path = os.path.join(self.__directory, f"{self.__usernum}_{self.__port}_{stamp}{self.SUFFIX}")
+        self.__fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.write(self.__fd, self.HEADER.pack(self.MAGIC, self.__usernum, self.__port, self.__block_samples))
+        self.__block_index = 0
+        self.__last_sync = time.monotonic()
+
+    # sync and close current file
+    def __close_file(self) -> None:
+        self.sync()
+        os.close(self.__fd)
+        self.__fd = None
+
+    # write current block at its place, samples after count are ignored by reader
+    def __write_block(self) -> None:
+        data = self.BLOCK_HEADER.pack(self.__count) + b"".join(column.tobytes() for column in self.__columns)
+        os.pwrite(self.__fd, data, self.HEADER.size + self.__block_index * self.__block_size)
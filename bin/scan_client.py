@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+import socket
+import signal
+import sys
+from collections.abc import Iterator
+from typing import TextIO
+# user's modules
+from pipe_writer import PipeWriter
+from my_exception import MyException
+from const import PacketScan
+
+
+##### CLASS TO GET PACKET LINES FROM RESIDENT SCAN DAEMON #####
+
+class ScanClient:
+    __socket: socket.socket
+    __file: TextIO
+
+    # init by daemon's socket path and connect
+    def __init__(self, socket_path: str = PacketScan.SOCKET) -> None:
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.__socket.connect(socket_path)
+        except OSError:
+            self.__socket.close()
+            raise
+        self.__file = self.__socket.makefile("r", encoding="utf-8")
+
+        # handle signal with "kill" command and CTRL+C key for safe exiting
+        signal.signal(signal.SIGTERM, self.__handle_exit)
+        signal.signal(signal.SIGINT, self.__handle_exit)
+
+    # handler for safe exiting, gets signal number and stack frame and exits successfully
+    def __handle_exit(self, sig, frame) -> None:
+        sys.exit(0)
+
+    # ask daemon to scan users
+    def subscribe(self, usernums: list[int]) -> None:
+        self.__socket.sendall(f"subscribe {','.join(map(str, usernums))}\n".encode("utf-8"))
+
+    # ask daemon to stop scanning users for this client
+    def unsubscribe(self, usernums: list[int]) -> None:
+        self.__socket.sendall(f"unsubscribe {','.join(map(str, usernums))}\n".encode("utf-8"))
+
+    # lines from daemon until it closes connection
+    def lines(self) -> Iterator[str]:
+        yield from self.__file
+
+    # subscribe users and write their lines into pipe for bash script, single user's line is without usernum as bash script reads it
+    def forward_to_pipe(self, usernums: list[int]) -> None:
+        active = set(usernums)
+        single = len(active) == 1
+
+        # pipe is written by separate thread, so slow or absent bash script never delays reading from daemon,
+        # it's created before subscribing, so daemon doesn't scan users for client without pipe
+        try:
+            pipe = PipeWriter(PacketScan.PIPE)
+        except MyException:
+            self.close()
+            raise
+        self.subscribe(usernums)
+        try:
+            for line in self.lines():
+                kind, _, rest = line.partition(" ")
+
+                # answers to subscribing, stop when no user is scanned
+                if kind == "ok":
+                    continue
+                if kind == "error":
+                    print(f"User {rest}", end="")
+                    active.discard(int(rest.split(" ", 1)[0]))
+                    if not active:
+                        return
+                    continue
+
+                pipe.put((rest if single else line).encode("utf-8"))
+
+        # catch exit from bash or by signal
+        except SystemExit:
+            pass
+
+        # daemon stops scanning when client leaves
+        finally:
+            pipe.close()
+            pipe.report()
+            self.close()
+
+    # close connection, socket is closed only with its file
+    def close(self) -> None:
+        self.__file.close()
+        self.__socket.close()
@@ -0,0 +1,362 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import socketserver
+import socket
+import traceback
+import threading
+import signal
+import queue
+import time
+import sys
+import os
+from collections import Counter
+from typing import Any
+# user's modules
+from database_manager import DatabaseManager, SwitchPortData
+from topology_cache import TopologyCache
+from L2_switch_session import L2SwitchSession
+from port_monitor import PortMonitor
+from poll_scheduler import PollScheduler
+from reachability import Reachability
+from my_exception import ExceptionType, MyException
+from const import Database, PacketScan
+
+
+##### CLASS FOR ONE CLIENT OF DAEMON #####
+
+# client sends "subscribe 1,2" and "unsubscribe 1" lines, gets "usernum rx rx_max tx tx_max" lines,
+# also "ok usernum switch port" and "error usernum message" as answers to subscribing
+class ScanRequestHandler(socketserver.StreamRequestHandler):
+    # lines waiting for slow client, the oldest ones are more useful than nothing, newer are dropped
+    __QUEUE_SIZE: int = 1000
+
+    __daemon: ScanDaemon
+    __queue: queue.Queue[str | None]
+
+    # init by daemon, other arguments are passed by server
+    def __init__(self, daemon: ScanDaemon, *args) -> None:
+        self.__daemon = daemon
+        self.__queue = queue.Queue(self.__QUEUE_SIZE)
+        super().__init__(*args)
+
+    # read commands until client disconnects, lines are written by separate thread so slow client doesn't stop scanning
+    def handle(self) -> None:
+        writer = threading.Thread(target=self.__write_lines, daemon=True)
+        writer.start()
+        try:
+            for raw_line in self.rfile:
+                command, _, argument = raw_line.decode("utf-8", "replace").strip().partition(" ")
+                try:
+                    usernums = [int(usernum) for usernum in argument.split(",") if usernum.strip()]
+                except ValueError:
+                    self.send(f"error 0 invalid usernums: {argument}\n")
+                    continue
+
+                if command == "subscribe":
+                    self.__daemon.subscribe(usernums, self)
+                elif command == "unsubscribe":
+                    for usernum in usernums:
+                        self.__daemon.unsubscribe(usernum, self)
+                else:
+                    self.send(f"error 0 unknown command: {command}\n")
+
+        # client's socket is broken, the same as disconnecting
+        except OSError:
+            pass
+
+        # client left, stop scanning its users and writing
+        finally:
+            self.__daemon.unsubscribe_all(self)
+            self.__queue.put(None)
+            writer.join()
+
+    # put line to client's queue from any thread, drop it if client doesn't read
+    def send(self, line: str) -> None:
+        try:
+            self.__queue.put_nowait(line)
+        except queue.Full:
+            pass
+
+    # write lines from queue until client leaves
+    def __write_lines(self) -> None:
+        while (line := self.__queue.get()) is not None:
+            try:
+                self.wfile.write(line.encode("utf-8"))
+            except OSError:
+                break
+
+
+##### RESIDENT DAEMON TO SCAN PACKETS FOR MANY CLIENTS #####
+
+class ScanDaemon:
+    __socket_path: str
+    __interval: float
+    __counters: bool
+    __window_ns: int
+    __server: socketserver.ThreadingUnixStreamServer
+    __records: dict[int, dict[str, Any]]
+    __monitors: dict[int, PortMonitor]
+    __subscribers: dict[int, set[ScanRequestHandler]]
+    __switches: dict[str, list[PortMonitor]]
+    __threads: dict[str, threading.Thread]
+    __lock: threading.Lock
+    __stop: threading.Event
+
+    # init by socket path, polling interval in seconds, and rates source as in handlers
+    def __init__(self, socket_path: str = PacketScan.SOCKET, interval: float = PacketScan.INTERVAL,
+                 counters: bool = False, window: float = 0) -> None:
+        self.__socket_path = socket_path
+        self.__interval = interval
+        self.__counters = counters
+        self.__window_ns = round(window * 1e9)
+
+        # records and monitors by usernum, clients of every usernum, monitors and threads by switch
+        self.__records = {}
+        self.__monitors = {}
+        self.__subscribers = {}
+        self.__switches = {}
+        self.__threads = {}
+
+        # lock for all dicts above, event to stop all switch threads
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+
+        # handle signal with "kill" command and CTRL+C key for safe exiting
+        signal.signal(signal.SIGTERM, self.__handle_exit)
+        signal.signal(signal.SIGINT, self.__handle_exit)
+
+        # listen right away, so clients can connect as soon as daemon exists, socket of dead daemon is removed
+        self.__remove_dead_socket()
+        self.__server = socketserver.ThreadingUnixStreamServer(self.__socket_path, lambda *args: ScanRequestHandler(self, *args))
+        self.__server.daemon_threads = True
+
+    # handler for safe exiting, gets signal number and stack frame and exits successfully
+    def __handle_exit(self, sig, frame) -> None:
+        sys.exit(0)
+
+    # remove socket left by dead daemon, socket of running daemon isn't taken over
+    def __remove_dead_socket(self) -> None:
+        if not os.path.exists(self.__socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.__socket_path)
+            except ConnectionRefusedError:   # nobody listens
+                os.unlink(self.__socket_path)
+                return
+            except FileNotFoundError:   # removed meanwhile
+                return
+        raise MyException(ExceptionType.DAEMON_RUNNING, self.__socket_path)
+
+    # main function, serve clients until signal or shutdown
+    def serve(self) -> None:
+        print(f"Listening on {self.__socket_path}")
+        try:
+            self.__server.serve_forever(poll_interval=0.5)
+
+        # catch exit by signal
+        except SystemExit:
+            pass
+
+        # stop all switch threads and let them close switch connections
+        finally:
+            self.__server.server_close()
+            self.__stop.set()
+            with self.__lock:
+                threads = list(self.__threads.values())
+            for thread in threads:
+                thread.join()
+            if os.path.exists(self.__socket_path):
+                os.unlink(self.__socket_path)
+            DatabaseManager.close_pool()
+
+    # stop serving from another thread
+    def shutdown(self) -> None:
+        self.__server.shutdown()
+
+    # start sending users' lines to client, scanning starts with the first client of user
+    def subscribe(self, usernums: list[int], client: ScanRequestHandler) -> None:
+        # users already scanned for another client
+        with self.__lock:
+            new_usernums = []
+            for usernum in usernums:
+                if usernum in self.__subscribers:
+                    self.__subscribers[usernum].add(client)
+                    client.send(self.__ok_line(usernum))
+                else:
+                    new_usernums.append(usernum)
+        if not new_usernums:
+            return
+
+        # find new users' switches and ports by one query with pooled connection
+        try:
+            records = self.__get_records(new_usernums)
+        except Exception as error:
+            for usernum in new_usernums:
+                client.send(f"error {usernum} {error}\n")
+            return
+
+        # switches not scanned yet are pinged at once by one packet, only ones not answering are checked by full ping,
+        # users of unavailable ones get error without connection attempt
+        with self.__lock:
+            new_switches = list({record["switch"] for record in records.values() if record["switch"] not in self.__switches})
+        losses = Reachability.check(new_switches, quick=True)
+        losses.update(Reachability.check([ipaddress for ipaddress, loss in losses.items() if loss > 0]))
+
+        for usernum in new_usernums:
+            if usernum not in records:
+                client.send(f"error {usernum} user not found in the database\n")
+            elif Reachability.get_error(losses.get(records[usernum]["switch"])) == "NOT_AVAILABLE":
+                client.send(f"error {usernum} {MyException(ExceptionType.SWITCH_NOT_AVAILABLE)}\n")
+            else:
+                self.__add_user(usernum, records[usernum], client)
+
+    # start scanning user if it's not scanned yet and send its lines to client
+    def __add_user(self, usernum: int, record: dict[str, Any], client: ScanRequestHandler) -> None:
+        with self.__lock:
+            # user may be subscribed by another client meanwhile
+            if usernum not in self.__subscribers:
+                monitor = PortMonitor(usernum, record["port"], self.__window_ns)
+                self.__records[usernum] = record
+                self.__monitors[usernum] = monitor
+                self.__subscribers[usernum] = set()
+
+                # the first user of switch starts its thread
+                if record["switch"] in self.__switches:
+                    self.__switches[record["switch"]].append(monitor)
+                else:
+                    self.__switches[record["switch"]] = [monitor]
+                    thread = threading.Thread(target=self.__scan_switch, args=(record["switch"],), daemon=True)
+                    self.__threads[record["switch"]] = thread
+                    thread.start()
+
+            self.__subscribers[usernum].add(client)
+            client.send(self.__ok_line(usernum))
+
+    # stop sending user's lines to client, scanning stops with the last client of user
+    def unsubscribe(self, usernum: int, client: ScanRequestHandler) -> None:
+        with self.__lock:
+            clients = self.__subscribers.get(usernum)
+            if not clients or client not in clients:
+                return
+
+            clients.discard(client)
+            if not clients:
+                self.__forget_user(usernum)
+
+    # client left
+    def unsubscribe_all(self, client: ScanRequestHandler) -> None:
+        with self.__lock:
+            usernums = [usernum for usernum, clients in self.__subscribers.items() if client in clients]
+        for usernum in usernums:
+            self.unsubscribe(usernum, client)
+
+    # answer about successful subscribing, call under lock
+    def __ok_line(self, usernum: int) -> str:
+        record = self.__records[usernum]
+        return f"ok {usernum} {record['switch']} {record['port']}\n"
+
+    # remove user's records and monitor, switch thread sees it on next poll, call under lock
+    def __forget_user(self, usernum: int) -> None:
+        del self.__subscribers[usernum]
+        record = self.__records.pop(usernum)
+        monitor = self.__monitors.pop(usernum)
+        self.__switches[record["switch"]].remove(monitor)
+
+    # get users' switches and ports from topology cache or database
+    def __get_records(self, usernums: list[int]) -> dict[int, dict[str, Any]]:
+        rows = TopologyCache.get_switch_ports(usernums, self.__query_switch_ports)
+
+        # convert fields, usernum as key
+        return {usernum: {Database.KEY_FIELD[key]: value for key, value in row.items()} for usernum, row in rows.items()}
+
+    # get users' switches and ports from database, connection is taken from pool and given back
+    def __query_switch_ports(self, usernums: list[int]) -> dict[int, SwitchPortData]:
+        db_manager = DatabaseManager()
+        try:
+            return db_manager.get_switch_ports(usernums)
+        finally:
+            db_manager.close()
+
+    # send line to all clients of user
+    def __publish(self, usernum: int, line: str) -> None:
+        with self.__lock:
+            clients = list(self.__subscribers.get(usernum, ()))
+        for client in clients:
+            client.send(line)
+
+    # scan all subscribed ports on one switch over one shared session until no one watches for idle time or stopped
+    def __scan_switch(self, ipaddress: str) -> None:
+        session: L2SwitchSession | None = None
+        watched: Counter[int] = Counter()
+        idle_since: float | None = None
+        try:
+            # poll at fixed interval, switches are shifted from each other
+            scheduler = PollScheduler(self.__interval, PacketScan.MAX_INTERVAL)
+            while scheduler.wait(self.__stop):
+                # current users of switch, session stays warm with its ports for returning clients, thread ends after idle time
+                with self.__lock:
+                    monitors = list(self.__switches[ipaddress])
+                    if not monitors and idle_since is not None and time.monotonic() - idle_since >= PacketScan.SESSION_IDLE:
+                        del self.__switches[ipaddress]
+                        del self.__threads[ipaddress]
+                        return
+
+                # nothing to poll while idle, ports stay watched so session isn't closed
+                if not monitors:
+                    if idle_since is None:
+                        idle_since = time.monotonic()
+                    scheduler.done(0.0)
+                    continue
+                idle_since = None
+
+                # switch may close idle connection, its ports are left and watched again by new connection
+                if session is not None and not session.isalive():
+                    for port in watched.elements():
+                        session.remove_port(port)
+                    watched.clear()
+
+                # watch ports of new users and leave ports of gone ones, connection is made once by the first port
+                ports = Counter(monitor.port for monitor in monitors)
+                for port in (ports - watched).elements():
+                    session = L2SwitchSession.acquire(ipaddress, port)
+                    watched[port] += 1
+                for port in (watched - ports).elements():
+                    session.remove_port(port)
+                    watched[port] -= 1
+                watched = +watched
+
+                # get bytes on all ports by one command, switch's response time slows polling if needed
+                started = time.monotonic_ns()
+                packets = session.get_packets_ports(list(watched), self.__counters)
+                finished = time.monotonic_ns()
+                scheduler.done((finished - started) / 1e9)
+                for monitor in monitors:
+                    # calculate megabit with max, from counters there is no rate after first sample
+                    if not self.__counters:
+                        monitor.update(*packets[monitor.port], finished)
+                    elif not monitor.update_counters(*packets[monitor.port], finished):
+                        continue
+
+                    # write usernum before rx, rx_max, tx, tx_max to distinguish users
+                    self.__publish(monitor.usernum, f"{monitor.usernum} {monitor.format_line()}")
+
+        # exceptions while working with this switch, its users are unsubscribed with error, others keep working
+        except Exception as error:
+            print(f"Exception while working with equipment {ipaddress}:")
+            traceback.print_exc()
+            with self.__lock:
+                for monitor in self.__switches.pop(ipaddress, []):
+                    for client in self.__subscribers.pop(monitor.usernum, ()):
+                        client.send(f"error {monitor.usernum} {error}\n")
+                    self.__records.pop(monitor.usernum, None)
+                    self.__monitors.pop(monitor.usernum, None)
+
+                    # user may have been moved to another switch or port
+                    TopologyCache.invalidate(monitor.usernum)
+                self.__threads.pop(ipaddress, None)
+
+        # always stop watching ports, connection closes with the last one
+        finally:
+            for port in watched.elements():
+                session.remove_port(port)
@@ -0,0 +1,257 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import TYPE_CHECKING, Any
+# user's modules
+from database_manager import DatabaseManager, SwitchPortData
+from topology_cache import TopologyCache
+from multi_packet_scan_handler import MultiPacketScanHandler
+from connection_writer import ConnectionWriter
+from pipe_writer import PipeWriter
+from const import PacketScan
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.context import SpawnContext, SpawnProcess
+
+
+##### ENTRY OF WORKER PROCESS #####
+
+# scan users of shard's switches and send samples to supervisor, users are already found by supervisor
+def run_shard(rows: dict[int, SwitchPortData], connection: Connection, interval: float, counters: bool, window: float,
+              output_format: str, record_dir: str | None) -> None:
+    TopologyCache.get_switch_ports(list(rows), lambda usernums: {usernum: rows[usernum] for usernum in usernums})
+    handler = MultiPacketScanHandler(list(rows), interval, counters, window, output_format, record_dir, ConnectionWriter(connection))
+    handler.check_packet()
+
+
+##### ONE WORKER PROCESS WITH ITS SHARD OF SWITCHES #####
+
+class ShardWorker:
+    __rows: dict[int, SwitchPortData]
+    __arguments: tuple[Any, ...]
+    __started: float
+    __delay: float
+    process: SpawnProcess | None
+    connection: Connection | None
+    restart_at: float | None
+
+    # init by users of shard's switches and arguments of multi packet scan handler
+    def __init__(self, rows: dict[int, SwitchPortData], arguments: tuple[Any, ...]) -> None:
+        self.__rows = rows
+        self.__arguments = arguments
+        self.__started = 0.0
+        self.__delay = PacketScan.WORKER_RESTART
+        self.process = None
+        self.connection = None
+        self.restart_at = None
+
+    # users of shard
+    def get_usernums(self) -> list[int]:
+        return list(self.__rows)
+
+    # start new process with its own switch sessions, only it writes into its pipe
+    def start(self, context: SpawnContext) -> None:
+        reader, writer = context.Pipe(duplex=False)
+        self.process = context.Process(target=run_shard, args=(self.__rows, writer, *self.__arguments), daemon=True)
+        self.process.start()
+
+        # worker's end is closed here, so its exit is seen as end of pipe
+        writer.close()
+        self.connection = reader
+        self.__started = time.monotonic()
+        self.restart_at = None
+
+    # pipe is read to the end and process is gone
+    def exited(self) -> bool:
+        return self.process is not None and self.connection is None and not self.process.is_alive()
+
+    # plan restart after crash, worker crashing again waits longer, worker working long enough starts from short pause again
+    def schedule_restart(self) -> float:
+        now = time.monotonic()
+        if now - self.__started >= PacketScan.WORKER_STABLE:
+            self.__delay = PacketScan.WORKER_RESTART
+        delay = self.__delay
+        self.__delay = min(self.__delay * 2, PacketScan.WORKER_MAX_RESTART)
+        self.restart_at = now + delay
+        self.process.close()
+        self.process = None
+        return delay
+
+
+##### CLASS TO SCAN USERS OF MANY SWITCHES IN SEVERAL PROCESSES #####
+
+class ShardSupervisor:
+    __usernums: list[int]
+    __workers: int
+    __arguments: tuple[Any, ...]
+    __context: SpawnContext
+    __shards: list[ShardWorker]
+    __stop: threading.Event
+    _db_manager: DatabaseManager
+
+    # init by usernums, number of worker processes (0 for one per cpu) and arguments of multi packet scan handler of every worker
+    def __init__(self, usernums: list[int], workers: int = 0, interval: float = PacketScan.INTERVAL, counters: bool = False,
+                 window: float = 0, output_format: str = "text", record_dir: str | None = None) -> None:
+        # init by usernums without duplicates, order is kept
+        self.__usernums = list(dict.fromkeys(usernums))
+
+        # one worker per cpu by default, negative number is an error of caller
+        if workers < 0:
+            raise ValueError(f"Negative number of workers: {workers}")
+        self.__workers = workers or os.cpu_count() or 1
+        self.__arguments = (interval, counters, window, output_format, record_dir)
+
+        # workers are started clean, without threads and sockets of supervisor
+        self.__context = multiprocessing.get_context("spawn")
+        self.__shards = []
+
+        # handle signal with "kill" command and CTRL+C key for safe exiting
+        signal.signal(signal.SIGTERM, self.__handle_exit)
+        signal.signal(signal.SIGINT, self.__handle_exit)
+
+        # event to stop supervising
+        self.__stop = threading.Event()
+
+    # handler for safe exiting, gets signal number and stack frame and exits successfully
+    def __handle_exit(self, sig, frame) -> None:
+        sys.exit(0)
+
+    # main function
+    def check_packet(self) -> None:
+        # get data from database once for all workers
+        try:
+            self.__split_shards()
+        except Exception:   # exception while checking records
+            print("Exception while working with the database records:")
+            traceback.print_exc()
+            return
+
+        # run workers and provide their samples for bash script by pipe
+        try:
+            self.__supervise()
+        # exceptions while working with pipe, show traceback
+        except Exception:
+            print("Exception while supervising workers:")
+            traceback.print_exc()
+
+    # stop supervising and workers, e.g. from another thread
+    def stop(self) -> None:
+        self.__stop.set()
+
+    # pid of every running worker by shard index
+    def get_workers(self) -> dict[int, int]:
+        return {index: shard.process.pid for index, shard in enumerate(self.__shards)
+                if shard.process is not None and shard.process.pid is not None}
+
+    # users of every shard by its index
+    def get_shards(self) -> list[list[int]]:
+        return [shard.get_usernums() for shard in self.__shards]
+
+    # find users and split their switches between workers: every switch belongs to one worker, so only it keeps switch's session,
+    # switches are dealt in turn, so workers get equal number of them
+    def __split_shards(self) -> None:
+        rows = TopologyCache.get_switch_ports(self.__usernums, self.__query_switch_ports)
+        switches: dict[str, dict[int, SwitchPortData]] = {}
+        for usernum in self.__usernums:
+            if usernum not in rows:
+                print(f"User {usernum} not found in the database")
+                continue
+            switches.setdefault(rows[usernum]["switchP"], {})[usernum] = rows[usernum]
+
+        shards: list[dict[int, SwitchPortData]] = [{} for _ in range(min(self.__workers, len(switches)))]
+        for position, switch in enumerate(sorted(switches)):
+            shards[position % len(shards)].update(switches[switch])
+        self.__shards = [ShardWorker(shard, self.__arguments) for shard in shards]
+
+    # working with database, all users in one query
+    def __query_switch_ports(self, usernums: list[int]) -> dict[int, SwitchPortData]:
+        try:
+            # connect and get users' switches and ports from database
+            self._db_manager = DatabaseManager()
+            return self._db_manager.get_switch_ports(usernums)
+
+        finally:   # always close connection and delete database manager
+            del self._db_manager
+
+    # start workers, forward their samples into one pipe and restart crashed ones, until all workers finish or stop
+    def __supervise(self) -> None:
+        # samples of all workers go through one pipe writer, so slow or absent bash script never delays workers
+        pipe = PipeWriter(PacketScan.PIPE)
+        try:
+            for shard in self.__shards:
+                shard.start(self.__context)
+
+            while not self.__stop.is_set():
+                # wait in short steps so signal can interrupt waiting, but not longer than the nearest restart
+                restarts = [shard.restart_at for shard in self.__shards if shard.restart_at is not None]
+                self.__forward(pipe, max(0.0, min([0.5] + [restart - time.monotonic() for restart in restarts])))
+
+                # crashed workers are started again, others keep working, finished ones are left
+                for index, shard in enumerate(self.__shards):
+                    if shard.exited():
+                        if shard.process.exitcode == 0:
+                            shard.process.close()
+                            shard.process = None
+                            continue
+                        print(f"Worker {index} exited with code {shard.process.exitcode}, restarting in "
+                              f"{shard.schedule_restart():g} seconds")
+                    elif shard.restart_at is not None and shard.restart_at <= time.monotonic():
+                        shard.start(self.__context)
+                if all(shard.process is None and shard.restart_at is None for shard in self.__shards):
+                    break
+
+        # catch exit by signal
+        except SystemExit:
+            pass
+
+        # stop workers and let them close switch connections, their last samples are still forwarded, then stop writing
+        finally:
+            self.__stop_workers(pipe)
+            pipe.close()
+            pipe.report()
+
+    # forward samples of workers that are ready within timeout, closed pipe of worker means its end
+    def __forward(self, pipe: PipeWriter, timeout: float) -> None:
+        connections = {shard.connection: shard for shard in self.__shards if shard.connection is not None}
+        sentinels = [shard.process.sentinel for shard in self.__shards if shard.process is not None and shard.connection is None]
+        for ready in wait(list(connections) + sentinels, timeout):
+            shard = connections.get(ready)
+            if shard is None:
+                continue
+            try:
+                pipe.put(ready.recv_bytes())
+            except EOFError:
+                ready.close()
+                shard.connection = None
+
+    # workers exit by signal like single process does, ones not exiting in time are killed
+    def __stop_workers(self, pipe: PipeWriter) -> None:
+        for shard in self.__shards:
+            shard.restart_at = None
+            if shard.process is not None and shard.process.is_alive():
+                shard.process.terminate()
+
+        deadline = time.monotonic() + PacketScan.WORKER_CLOSE_TIMEOUT
+        while time.monotonic() < deadline and any(shard.connection is not None or (shard.process is not None and shard.process.is_alive())
+                                                  for shard in self.__shards):
+            self.__forward(pipe, 0.1)
+
+        for shard in self.__shards:
+            if shard.connection is not None:
+                shard.connection.close()
+                shard.connection = None
+            if shard.process is not None:
+                if shard.process.is_alive():
+                    shard.process.kill()
+                shard.process.join()
+                shard.process.close()
+                shard.process = None
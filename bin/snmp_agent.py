@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import asyncio
+import random
+from bisect import bisect_right
+from typing import TYPE_CHECKING
+# user's modules
+from const import CitySwitch
+import commands
+import snmp_ber
+from snmp_ber import OID, Message, VarBind
+
+# import as type only by Pylance (for VS Code)
+if TYPE_CHECKING:
+    from switch_simulator import SimulatedSwitch
+
+
+##### DATAGRAMS OF ONE SIMULATED SWITCH #####
+
+class SnmpAgentProtocol(asyncio.DatagramProtocol):
+    __agent: SnmpAgent
+    __switch: SimulatedSwitch
+    __transport: asyncio.DatagramTransport | None
+
+    # init by agent answering requests and switch whose address got them
+    def __init__(self, agent: SnmpAgent, switch: SimulatedSwitch) -> None:
+        self.__agent = agent
+        self.__switch = switch
+        self.__transport = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.__transport = transport
+
+    # answer after switch's latency, lost request is not answered at all
+    def datagram_received(self, data: bytes, address: tuple[str, int]) -> None:
+        response = self.__agent.respond(self.__switch, data)
+        delay = self.__agent.get_delay()
+        if response is None or delay is None:
+            return
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self.__send, response, address)
+        else:
+            self.__send(response, address)
+
+    # send if socket isn't closed while waiting
+    def __send(self, response: bytes, address: tuple[str, int]) -> None:
+        if not self.__transport.is_closing():
+            self.__transport.sendto(response, address)
+
+
+##### SNMP V2C AGENT OF MANY SIMULATED SWITCHES #####
+
+class SnmpAgent:
+    __switches: dict[str, SimulatedSwitch]
+    __port: int
+    __community: bytes
+    __latency: float
+    __jitter: float
+    __loss: float
+    __max_varbinds: int
+    __rng: random.Random
+    __transports: list[asyncio.DatagramTransport]
+    requests: int
+
+    # init by simulated switches by ip, udp port, community, seconds before every answer with random addition, part of requests lost,
+    # max values in one response like size limit of real agents
+    def __init__(self, switches: dict[str, SimulatedSwitch], port: int = CitySwitch.SNMP_PORT, community: str = "public",
+                 latency: float = 0.0, jitter: float = 0.0, loss: float = 0.0, max_varbinds: int = 48, seed: int | None = None) -> None:
+        self.__switches = switches
+        self.__port = port
+        self.__community = community.encode()
+        self.__latency = latency
+        self.__jitter = jitter
+        self.__loss = loss
+        self.__max_varbinds = max_varbinds
+        self.__rng = random.Random(seed)
+        self.__transports = []
+
+        # answered requests
+        self.requests = 0
+
+    # listen on every switch's address
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        for ip, switch in self.__switches.items():
+            transport, _ = await loop.create_datagram_endpoint(lambda switch=switch: SnmpAgentProtocol(self, switch),
+                                                               local_addr=(ip, self.__port))
+            self.__transports.append(transport)
+
+    # stop listening
+    async def close(self) -> None:
+        for transport in self.__transports:
+            transport.close()
+        self.__transports.clear()
+
+    # seconds before answer, None if request is lost
+    def get_delay(self) -> float | None:
+        if self.__loss and self.__rng.random() < self.__loss:
+            return None
+        return self.__latency + self.__rng.uniform(0, self.__jitter)
+
+    # response to get, getnext and getbulk over bytes counters of switch's ports, None for wrong community or broken request
+    def respond(self, switch: SimulatedSwitch, data: bytes) -> bytes | None:
+        try:
+            request = snmp_ber.decode_message(data)
+        except ValueError:
+            return None
+        if request.community != self.__community:
+            return None
+        self.requests += 1
+
+        # interface counters as sorted names, every port is read once per request
+        ports = switch.get_ports()
+        names = [column + (index,) for column in (commands.IF_HC_IN_OCTETS, commands.IF_HC_OUT_OCTETS) for index in range(1, ports + 1)]
+        counters: dict[int, tuple[int, int]] = {}
+
+        # value of existing name, counters are read when asked
+        def value(oid: OID) -> VarBind:
+            if oid[:-1] == commands.IF_HC_IN_OCTETS or oid[:-1] == commands.IF_HC_OUT_OCTETS:
+                index = oid[-1]
+                if 1 <= index <= ports:
+                    if index not in counters:
+                        counters[index] = switch.counters(index)
+                    return VarBind(oid, snmp_ber.COUNTER64, counters[index][oid[:-1] == commands.IF_HC_OUT_OCTETS])
+            return VarBind(oid, snmp_ber.NO_SUCH_INSTANCE, None)
+
+        # next name after oid in lexicographic order
+        def next_value(oid: OID) -> VarBind:
+            position = bisect_right(names, oid)
+            return value(names[position]) if position < len(names) else VarBind(oid, snmp_ber.END_OF_MIB_VIEW, None)
+
+        oids = [varbind.oid for varbind in request.varbinds]
+        if request.pdu_type == snmp_ber.GET_REQUEST:
+            varbinds = [value(oid) for oid in oids]
+        elif request.pdu_type == snmp_ber.GET_NEXT_REQUEST:
+            varbinds = [next_value(oid) for oid in oids]
+        elif request.pdu_type == snmp_ber.GET_BULK_REQUEST:
+            # non-repeaters once, then repetitions of the rest row by row, up to size limit
+            non_repeaters, max_repetitions = max(request.error_status, 0), max(request.error_index, 0)
+            varbinds = [next_value(oid) for oid in oids[:non_repeaters]]
+            last = oids[non_repeaters:]
+            for _ in range(max_repetitions):
+                if not last or len(varbinds) + len(last) > self.__max_varbinds:
+                    break
+                row = [next_value(oid) for oid in last]
+                varbinds.extend(row)
+                last = [varbind.oid for varbind in row]
+        else:
+            return None
+        return snmp_ber.encode_message(Message(self.__community, snmp_ber.RESPONSE, request.request_id, 0, 0, varbinds))
@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+from typing import NamedTuple
+
+
+##### BER TAGS OF SNMP V2C #####
+
+# universal types
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+SEQUENCE = 0x30
+
+# application types of values, all of them are unsigned integers
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIMETICKS = 0x43
+COUNTER64 = 0x46
+UNSIGNED_TYPES = {COUNTER32, GAUGE32, TIMETICKS, COUNTER64}
+
+# exceptions instead of values
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+# protocol data units
+GET_REQUEST = 0xA0
+GET_NEXT_REQUEST = 0xA1
+RESPONSE = 0xA2
+GET_BULK_REQUEST = 0xA5
+
+# version field of v2c message
+VERSION_2C = 1
+
+# object identifier as tuple of numbers, e.g. (1, 3, 6, 1, 2, 1, 31, 1, 1, 1, 6, 1)
+OID = tuple[int, ...]
+
+
+# one name with value of message, value is None for exceptions and null, tag tells which one
+class VarBind(NamedTuple):
+    oid: OID
+    tag: int
+    value: int | bytes | OID | None
+
+# message fields used by client and agent, for requests error fields are non-repeaters and max-repetitions of getbulk
+class Message(NamedTuple):
+    community: bytes
+    pdu_type: int
+    request_id: int
+    error_status: int
+    error_index: int
+    varbinds: list[VarBind]
+
+
+##### ENCODING #####
+
+# definite length, short form below 128
+def encode_length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes((length,))
+    size = (length.bit_length() + 7) // 8
+    return bytes((0x80 | size,)) + length.to_bytes(size, "big")
+
+def encode_tlv(tag: int, value: bytes) -> bytes:
+    return bytes((tag,)) + encode_length(len(value)) + value
+
+# integer in the shortest two's complement form, unsigned types get a leading zero byte when the highest bit is set
+def encode_integer(value: int, tag: int = INTEGER) -> bytes:
+    size = (value.bit_length() + 8) // 8 if value >= 0 else ((-value - 1).bit_length() + 8) // 8
+    return encode_tlv(tag, value.to_bytes(size, "big", signed=value < 0))
+
+# first two numbers share one byte, others are base 128 with continuation bit
+def encode_oid(oid: OID) -> bytes:
+    body = bytearray((40 * oid[0] + oid[1],))
+    for number in oid[2:]:
+        chunk = [number & 0x7F]
+        number >>= 7
+        while number:
+            chunk.append(0x80 | (number & 0x7F))
+            number >>= 7
+        body += bytes(reversed(chunk))
+    return encode_tlv(OBJECT_IDENTIFIER, bytes(body))
+
+# value of varbind by its tag
+def encode_value(tag: int, value: int | bytes | OID | None) -> bytes:
+    if tag == INTEGER or tag in UNSIGNED_TYPES:
+        return encode_integer(value, tag)
+    if tag == OBJECT_IDENTIFIER:
+        return encode_oid(value)
+    if tag == OCTET_STRING:
+        return encode_tlv(tag, value)
+    return encode_tlv(tag, b"")
+
+# whole v2c message
+def encode_message(message: Message) -> bytes:
+    varbinds = b"".join(encode_tlv(SEQUENCE, encode_oid(varbind.oid) + encode_value(varbind.tag, varbind.value))
+                        for varbind in message.varbinds)
+    pdu = encode_tlv(message.pdu_type, encode_integer(message.request_id) + encode_integer(message.error_status)
+                     + encode_integer(message.error_index) + encode_tlv(SEQUENCE, varbinds))
+    return encode_tlv(SEQUENCE, encode_integer(VERSION_2C) + encode_tlv(OCTET_STRING, message.community) + pdu)
+
+
+##### DECODING #####
+
+# tag, start and end of value at offset, end is checked against data
+def decode_tlv(data: bytes, offset: int) -> tuple[int, int, int]:
+    tag = data[offset]
+    length = data[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        size = length & 0x7F
+        length = int.from_bytes(data[start:start + size], "big")
+        start += size
+    end = start + length
+    if end > len(data):
+        raise ValueError("BER value is longer than message")
+    return tag, start, end
+
+def decode_oid(value: bytes) -> OID:
+    oid = [value[0] // 40, value[0] % 40]
+    number = 0
+    for byte in value[1:]:
+        number = (number << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            oid.append(number)
+            number = 0
+    return tuple(oid)
+
+# value of varbind by its tag, counters are unsigned
+def decode_value(tag: int, value: bytes) -> int | bytes | OID | None:
+    if tag == INTEGER:
+        return int.from_bytes(value, "big", signed=True)
+    if tag in UNSIGNED_TYPES:
+        return int.from_bytes(value, "big")
+    if tag == OBJECT_IDENTIFIER:
+        return decode_oid(value)
+    if tag == OCTET_STRING:
+        return value
+    return None
+
+# whole v2c message, anything else is ValueError
+def decode_message(data: bytes) -> Message:
+    try:
+        tag, start, end = decode_tlv(data, 0)
+        if tag != SEQUENCE:
+            raise ValueError("Not a SNMP message")
+
+        # version and community
+        tag, start, offset = decode_tlv(data, start)
+        if tag != INTEGER or int.from_bytes(data[start:offset], "big") != VERSION_2C:
+            raise ValueError("Not a SNMP v2c message")
+        tag, start, offset = decode_tlv(data, offset)
+        community = data[start:offset]
+
+        # pdu with request id, error status and index
+        pdu_type, offset, _ = decode_tlv(data, offset)
+        fields = []
+        for _ in range(3):
+            tag, start, offset = decode_tlv(data, offset)
+            fields.append(int.from_bytes(data[start:offset], "big", signed=True))
+
+        # sequence of names with values
+        tag, offset, end = decode_tlv(data, offset)
+        varbinds = []
+        while offset < end:
+            _, start, offset = decode_tlv(data, offset)
+            _, oid_start, oid_end = decode_tlv(data, start)
+            tag, value_start, value_end = decode_tlv(data, oid_end)
+            varbinds.append(VarBind(decode_oid(data[oid_start:oid_end]), tag, decode_value(tag, data[value_start:value_end])))
+        return Message(community, pdu_type, *fields, varbinds)
+    except IndexError:
+        raise ValueError("Truncated SNMP message") from None
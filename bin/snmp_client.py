@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+import asyncio
+import random
+import socket
+import time
+# user's modules
+from const import CitySwitch
+import snmp_ber
+from snmp_ber import OID, Message, VarBind
+
+
+##### CLASS TO ASK SNMP V2C AGENT OF ONE DEVICE #####
+
+class SnmpClient:
+    __socket: socket.socket
+    __community: bytes
+    __timeout: float
+    __retries: int
+    __request_id: int
+
+    # init by ip of device, udp port, community, seconds to wait for response and number of resends
+    def __init__(self, ipaddress: str, port: int = CitySwitch.SNMP_PORT, community: str = CitySwitch.SNMP_COMMUNITY,
+                 timeout: float = CitySwitch.SNMP_TIMEOUT, retries: int = CitySwitch.SNMP_RETRIES) -> None:
+        # connected socket gets only device's datagrams and errors like closed port
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.__socket.connect((ipaddress, port))
+        self.__community = community.encode()
+        self.__timeout = timeout
+        self.__retries = retries
+
+        # responses are matched to requests by id, so late answers to resent requests are skipped
+        self.__request_id = random.randrange(1, 2 ** 30)
+
+    # next names with values after every oid, several times for every one of them
+    def get_bulk(self, oids: list[OID], max_repetitions: int) -> list[VarBind]:
+        return self.__request(snmp_ber.GET_BULK_REQUEST, oids, 0, max_repetitions)
+
+    # the same in the event loop
+    async def async_get_bulk(self, oids: list[OID], max_repetitions: int) -> list[VarBind]:
+        return await self.__async_request(snmp_ber.GET_BULK_REQUEST, oids, 0, max_repetitions)
+
+    # values of table's columns at indexes from first to last by as few getbulk requests as agent allows, column as key
+    def get_columns(self, columns: list[OID], first: int, last: int) -> dict[OID, dict[int, int]]:
+        values: dict[OID, dict[int, int]] = {column: {} for column in columns}
+        start = first - 1
+        while start < last:
+            progress = self.__merge_columns(values, self.get_bulk([column + (start,) for column in columns], last - start), start, last)
+            if progress == start:
+                break
+            start = progress
+        return values
+
+    # the same in the event loop
+    async def async_get_columns(self, columns: list[OID], first: int, last: int) -> dict[OID, dict[int, int]]:
+        values: dict[OID, dict[int, int]] = {column: {} for column in columns}
+        start = first - 1
+        while start < last:
+            varbinds = await self.async_get_bulk([column + (start,) for column in columns], last - start)
+            progress = self.__merge_columns(values, varbinds, start, last)
+            if progress == start:
+                break
+            start = progress
+        return values
+
+    # add values of rows after start up to last, return the last complete row: agent may send less rows than asked,
+    # e.g. response size is limited, so the rest is asked from it, no progress means columns ended
+    @staticmethod
+    def __merge_columns(values: dict[OID, dict[int, int]], varbinds: list[VarBind], start: int, last: int) -> int:
+        reached = {column: start for column in values}
+        for varbind in varbinds:
+            column, index = varbind.oid[:-1], varbind.oid[-1]
+            if column in values and start < index <= last and varbind.value is not None:
+                values[column][index] = varbind.value
+                reached[column] = max(reached[column], index)
+        return min(reached.values())
+
+    # close socket
+    def close(self) -> None:
+        self.__socket.close()
+
+    # send request and wait for its response, resend on timeout
+    def __request(self, pdu_type: int, oids: list[OID], error_status: int, error_index: int) -> list[VarBind]:
+        request = self.__encode(pdu_type, oids, error_status, error_index)
+        for _ in range(self.__retries + 1):
+            self.__socket.send(request)
+            response = self.__receive(time.monotonic() + self.__timeout)
+            if response is not None:
+                return self.__varbinds(response)
+        raise TimeoutError("No SNMP response")
+
+    # the same in the event loop, socket doesn't block it
+    async def __async_request(self, pdu_type: int, oids: list[OID], error_status: int, error_index: int) -> list[VarBind]:
+        loop = asyncio.get_running_loop()
+        self.__socket.setblocking(False)
+        request = self.__encode(pdu_type, oids, error_status, error_index)
+        for _ in range(self.__retries + 1):
+            await loop.sock_sendall(self.__socket, request)
+            try:
+                return self.__varbinds(await asyncio.wait_for(self.__async_receive(loop), self.__timeout))
+            except TimeoutError:
+                continue
+        raise TimeoutError("No SNMP response")
+
+    # request with next id
+    def __encode(self, pdu_type: int, oids: list[OID], error_status: int, error_index: int) -> bytes:
+        self.__request_id = self.__request_id % (2 ** 31 - 1) + 1
+        return snmp_ber.encode_message(Message(self.__community, pdu_type, self.__request_id, error_status, error_index,
+                                               [VarBind(oid, snmp_ber.NULL, None) for oid in oids]))
+
+    # values of response, error status is raised
+    @staticmethod
+    def __varbinds(response: Message) -> list[VarBind]:
+        if response.error_status:
+            raise ValueError(f"SNMP error status {response.error_status} at {response.error_index}")
+        return response.varbinds
+
+    # response to current request until deadline, None on timeout, other datagrams are skipped
+    def __receive(self, deadline: float) -> Message | None:
+        while (remaining := deadline - time.monotonic()) > 0:
+            self.__socket.settimeout(remaining)
+            try:
+                data = self.__socket.recv(65535)
+            except socket.timeout:
+                return None
+            if (message := self.__match(data)) is not None:
+                return message
+        return None
+
+    # the same in the event loop, it's cancelled on timeout
+    async def __async_receive(self, loop: asyncio.AbstractEventLoop) -> Message:
+        while True:
+            if (message := self.__match(await loop.sock_recv(self.__socket, 65535))) is not None:
+                return message
+
+    # response to current request, None for broken datagram or late answer to previous one
+    def __match(self, data: bytes) -> Message | None:
+        try:
+            message = snmp_ber.decode_message(data)
+        except ValueError:
+            return None
+        if message.pdu_type == snmp_ber.RESPONSE and message.request_id == self.__request_id:
+            return message
+        return None
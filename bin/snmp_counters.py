@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+import time
+# user's modules
+from const import CitySwitch, PacketScan
+from rate_meter import CounterRate
+from snmp_client import SnmpClient
+from snmp_ber import OID
+import commands
+
+
+##### CLASS TO READ PORTS' BYTES OF L2 SWITCH BY SNMP #####
+
+class SnmpCounters:
+    __client: SnmpClient
+    __rates: dict[int, tuple[CounterRate, CounterRate]]
+
+    # init by ip of switch, agent's port and community are read at connection time
+    def __init__(self, ipaddress: str) -> None:
+        self.__client = SnmpClient(ipaddress, CitySwitch.SNMP_PORT, CitySwitch.SNMP_COMMUNITY, CitySwitch.SNMP_TIMEOUT,
+                                   CitySwitch.SNMP_RETRIES)
+
+        # rx and tx rates from counters of every asked port
+        self.__rates = {}
+
+    # rx and tx bytes of ports by one getbulk, port as key: cumulative counters or bytes per second since previous call,
+    # ports without previous counters have no rate yet and are missing
+    def get_packets_ports(self, user_ports: list[int], counters: bool = False) -> dict[int, tuple[int, int]]:
+        values = self.__client.get_columns([commands.IF_HC_IN_OCTETS, commands.IF_HC_OUT_OCTETS], min(user_ports), max(user_ports))
+        return self.__packets(values, user_ports, counters)
+
+    # the same in the event loop
+    async def async_get_packets_ports(self, user_ports: list[int], counters: bool = False) -> dict[int, tuple[int, int]]:
+        values = await self.__client.async_get_columns([commands.IF_HC_IN_OCTETS, commands.IF_HC_OUT_OCTETS],
+                                                       min(user_ports), max(user_ports))
+        return self.__packets(values, user_ports, counters)
+
+    # counters or rates of asked ports from columns' values
+    def __packets(self, values: dict[OID, dict[int, int]], user_ports: list[int], counters: bool) -> dict[int, tuple[int, int]]:
+        timestamp = time.monotonic_ns()
+        rx_values, tx_values = values[commands.IF_HC_IN_OCTETS], values[commands.IF_HC_OUT_OCTETS]
+
+        packets = {}
+        for user_port in user_ports:
+            if user_port not in rx_values or user_port not in tx_values:
+                continue
+            if counters:
+                packets[user_port] = (rx_values[user_port], tx_values[user_port])
+                continue
+
+            # rate of every direction, both are needed
+            rx_rate, tx_rate = self.__rates.setdefault(user_port, (CounterRate(PacketScan.MAX_PORT_RATE),
+                                                                   CounterRate(PacketScan.MAX_PORT_RATE)))
+            rx, tx = rx_rate.update(rx_values[user_port], timestamp), tx_rate.update(tx_values[user_port], timestamp)
+            if rx is not None and tx is not None:
+                packets[user_port] = (round(rx), round(tx))
+        return packets
+
+    # close socket
+    def close(self) -> None:
+        self.__client.close()
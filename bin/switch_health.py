@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+import threading
+import time
+from typing import NotRequired, TypedDict
+# user's modules
+from const import CitySwitch
+import json_store
+
+
+# typeddict for health of switch known by ip
+class HealthEntry(TypedDict):
+    latency: float
+    deviation: float
+    failures: int
+    error: str
+    opened: float
+    updated: float
+    snmp_failed: NotRequired[float]
+
+
+##### CLASS TO REMEMBER CONNECTION HEALTH OF SWITCHES BETWEEN RUNS #####
+
+class SwitchHealth:
+    __path: str = CitySwitch.HEALTH_FILE
+    __entries: dict[str, HealthEntry] | None = None
+    __changed: set[str] = set()
+    __saved: float = 0.0
+    __lock: threading.Lock = threading.Lock()
+
+    # timeout of connection attempt learned from switch's latencies like tcp retransmission timeout, the full one for unknown switch
+    # and for retry after failed attempt, as the switch answers ping then
+    @classmethod
+    def timeout(cls, ipaddress: str, retry: bool = False) -> float:
+        with SwitchHealth.__lock:
+            entry = SwitchHealth.__load().get(ipaddress)
+        if entry is None or not entry["latency"]:
+            return CitySwitch.CONNECT_TIMEOUT
+        learned = min(max(entry["latency"] + 4 * entry["deviation"], CitySwitch.CONNECT_TIMEOUT_MIN), CitySwitch.CONNECT_TIMEOUT_MAX)
+        return max(2 * learned, CitySwitch.CONNECT_TIMEOUT) if retry else learned
+
+    # timeout of commands in session learned the same way, but not too short for output of command
+    @classmethod
+    def command_timeout(cls, ipaddress: str) -> float:
+        return max(cls.timeout(ipaddress), CitySwitch.COMMAND_TIMEOUT_MIN)
+
+    # error name of switch failing repeatedly while breaker is open, None if connection may be tried;
+    # after cooldown one connection is tried, others fail fast until it ends
+    @classmethod
+    def check(cls, ipaddress: str) -> str | None:
+        with SwitchHealth.__lock:
+            entry = SwitchHealth.__load().get(ipaddress)
+            if entry is None or not entry["opened"]:
+                return None
+
+            # cooldown is doubled by every failure after breaker is opened
+            cooldown = min(CitySwitch.BREAKER_COOLDOWN * 2 ** (entry["failures"] - CitySwitch.BREAKER_FAILURES),
+                           CitySwitch.BREAKER_MAX_COOLDOWN)
+            now = time.time()
+            if now - entry["opened"] < cooldown:
+                return entry["error"]
+            entry["opened"] = now
+            SwitchHealth.__changed.add(ipaddress)
+            return None
+
+    # remember seconds of successful connection attempt, close breaker
+    @classmethod
+    def observe(cls, ipaddress: str, seconds: float) -> None:
+        with SwitchHealth.__lock:
+            entries = SwitchHealth.__load()
+            entry = entries.get(ipaddress)
+
+            # exponentially weighted latency and its deviation, first one is taken as is
+            if entry is None or not entry["latency"]:
+                entry = entries.setdefault(ipaddress, HealthEntry(latency=0.0, deviation=0.0, failures=0, error="", opened=0.0,
+                                                                  updated=0.0))
+                entry.update(latency=seconds, deviation=seconds / 2)
+            else:
+                entry["deviation"] += (abs(seconds - entry["latency"]) - entry["deviation"]) / 4
+                entry["latency"] += (seconds - entry["latency"]) / 8
+
+            # file is written at once if switch recovered, otherwise not often
+            recovered = entry["failures"] > 0
+            entry.update(failures=0, error="", opened=0.0, updated=time.time())
+            SwitchHealth.__changed.add(ipaddress)
+            if recovered or entry["updated"] - SwitchHealth.__saved > CitySwitch.HEALTH_SAVE:
+                SwitchHealth.__save()
+
+    # remember failed connection with error name of exception type, open breaker after several failures in a row
+    @classmethod
+    def failure(cls, ipaddress: str, error: str) -> None:
+        with SwitchHealth.__lock:
+            entries = SwitchHealth.__load()
+            entry = entries.setdefault(ipaddress, HealthEntry(latency=0.0, deviation=0.0, failures=0, error="", opened=0.0, updated=0.0))
+            now = time.time()
+            entry.update(failures=entry["failures"] + 1, error=error, updated=now)
+            if entry["failures"] >= CitySwitch.BREAKER_FAILURES:
+                entry["opened"] = now
+            SwitchHealth.__changed.add(ipaddress)
+            SwitchHealth.__save()
+
+    # snmp of switch failed not long ago, so its counters are read by cli without waiting for agent again
+    @classmethod
+    def snmp_failed(cls, ipaddress: str) -> bool:
+        with SwitchHealth.__lock:
+            entry = SwitchHealth.__load().get(ipaddress)
+        return entry is not None and time.time() - entry.get("snmp_failed", 0.0) < CitySwitch.SNMP_RETRY
+
+    # remember failed snmp of switch for next sessions and runs
+    @classmethod
+    def snmp_failure(cls, ipaddress: str) -> None:
+        with SwitchHealth.__lock:
+            entries = SwitchHealth.__load()
+            entry = entries.setdefault(ipaddress, HealthEntry(latency=0.0, deviation=0.0, failures=0, error="", opened=0.0, updated=0.0))
+            entry["snmp_failed"] = time.time()
+            SwitchHealth.__changed.add(ipaddress)
+            SwitchHealth.__save()
+
+    # read file once per process, missing or broken file is no history
+    @staticmethod
+    def __load() -> dict[str, HealthEntry]:
+        if SwitchHealth.__entries is None:
+            SwitchHealth.__entries = json_store.load(SwitchHealth.__path)
+        return SwitchHealth.__entries
+
+    # merge changed switches into file, so history of other processes isn't overwritten and is known here too,
+    # changes are kept for next time if file isn't writable
+    @staticmethod
+    def __save() -> None:
+        SwitchHealth.__saved = time.time()
+        merged = json_store.merge_save(SwitchHealth.__path, SwitchHealth.__entries, SwitchHealth.__changed)
+        if merged is not None:
+            SwitchHealth.__entries = merged
+            SwitchHealth.__changed.clear()
@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+# user's modules
+from database_manager import SwitchPortData
+
+
+##### CLASS TO FIND USERS BY SWITCH AND PORT #####
+
+class SwitchIndex:
+    __ports: dict[str, dict[int, list[int]]]
+
+    # build from users' switches and ports, usernum as key
+    def __init__(self, rows: dict[int, SwitchPortData]) -> None:
+        # switch -> port -> usernums, ports and usernums in ascending order
+        self.__ports = {}
+        for usernum, row in sorted(rows.items(), key=lambda item: (item[1]["PortP"], item[0])):
+            self.__ports.setdefault(row["switchP"], {}).setdefault(row["PortP"], []).append(usernum)
+
+    # all switches with users
+    def switches(self) -> list[str]:
+        return list(self.__ports)
+
+    # ports of switch with their users, only one port if it's given
+    def ports(self, switch: str, port: int | None = None) -> dict[int, list[int]]:
+        ports = self.__ports.get(switch, {})
+        if port is not None:
+            return {port: list(ports[port])} if port in ports else {}
+        return {port: list(usernums) for port, usernums in ports.items()}
+
+    # usernums on switch or on its port
+    def users(self, switch: str, port: int | None = None) -> list[int]:
+        return [usernum for usernums in self.ports(switch, port).values() for usernum in usernums]
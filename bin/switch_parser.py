@@ -0,0 +1,224 @@
+#!/usr/bin/python3
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect
+# user's modules
+from const import CitySwitch
+from my_exception import ExceptionType, MyException
+import commands
+
+
+##### LINE REGEXES, EACH BOUNDED BY ONE LINE #####
+
+# regexes start with literal text, so they are searched fast, direction "R" or "T" is the byte before match
+BYTES_LINE = re.compile(rb"X Bytes[ \t]+(?P<total>\d+)[ \t]+(?P<rate>\d+)")
+PORT_LINE = re.compile(rb"Port [Nn]umber[ \t]*:[ \t]*(\d+:)?(?P<port>\d+)")
+MODEL_LINE = re.compile(rb"Device Type[ \t]+:[ \t]+(?P<model>\S+)")
+GATEWAY_LINE = re.compile(rb"Default Gateway[ \t]+:[ \t]+(?P<default_gateway>(\d{1,3}\.){3}\d{1,3})")
+UNIT_LINE = re.compile(rb"-+[ \t]*\r?\n[ \t]*1[ \t]+(?P<model>\S+)")
+
+# terminal control sequences of redrawn page: cursor positioning, erasing, colors
+ANSI_SEQUENCE = re.compile(rb"\x1b(\[[0-9;?]*[ -/]*[@-~]|[@-Z\\-_])")
+
+# bytes of directions
+RX = ord("R")
+TX = ord("T")
+
+
+##### BASE CLASS FOR PARSERS CONSUMING OUTPUT INCREMENTALLY #####
+
+# output has more lines than any expected one without its ending, session turns it into unexpected output of switch
+class OutputLimitError(Exception):
+    pass
+
+class StreamParser(ABC):
+    __terminators: list[bytes]
+    __max_lines: int
+    __lines: int
+    __pending: bytearray
+    found: bool
+    done: bool
+    end_index: int
+    rest: bytes
+    seconds: float
+
+    # init by output's possible endings, e.g. prompt or continuation, and max lines before ending
+    def __init__(self, terminators: list[bytes], max_lines: int = CitySwitch.MAX_OUTPUT_LINES) -> None:
+        self.__terminators = terminators
+        self.__max_lines = max_lines
+        self.__lines = 0
+
+        # data not parsed yet: incomplete last line
+        self.__pending = bytearray()
+
+        # required fields found, output ended, index of ending and data after it
+        self.found = False
+        self.done = False
+        self.end_index = -1
+        self.rest = b""
+
+        # time spent on parsing, without waiting for output, counted by session feeding the parser
+        self.seconds = 0.0
+
+    # consume next chunk of output, return True when output ended, every byte is scanned once, not the whole buffer again
+    def feed(self, data: bytes) -> bool:
+        if self.done:
+            self.rest += data
+            return True
+
+        # whole output in one chunk is parsed as it is, without copying it into pending data
+        if not self.__pending:
+            end = self.__find_end(data)
+            if end >= 0:
+                return self.__finish(data, end)
+        self.__pending += data
+
+        # parse complete lines or everything before ending, unless fields are already found
+        end = self.__find_end(self.__pending)
+        if end >= 0:
+            return self.__finish(bytes(self.__pending), end)
+        region_end = self.__pending.rfind(b"\n") + 1
+        if region_end and not self.found:
+            self.found = self._parse(bytes(self.__pending[:region_end]))
+
+        # output without ending is bounded by lines
+        self.__lines += self.__pending.count(b"\n", 0, region_end)
+        if self.__lines > self.__max_lines:
+            raise OutputLimitError(f"No output ending after {self.__lines} lines")
+        del self.__pending[:region_end]
+        return False
+
+    # index of earliest ending, like prompt which comes without line break, -1 if there is none yet
+    def __find_end(self, data: bytes | bytearray) -> int:
+        end = -1
+        for index, terminator in enumerate(self.__terminators):
+            position = data.find(terminator)
+            if position >= 0 and (end < 0 or position < end):
+                end, self.end_index = position, index
+        return end
+
+    # parse everything before ending, unless fields are already found, the rest of data belongs to next commands
+    def __finish(self, data: bytes, end: int) -> bool:
+        if end and not self.found:
+            self.found = self._parse(data[:end])
+        self.done = True
+        self.rest = data[end + len(self.__terminators[self.end_index]):]
+        self.__pending.clear()
+        return True
+
+    # parse complete lines, return True when all required fields are found
+    @abstractmethod
+    def _parse(self, region: bytes) -> bool:
+        raise NotImplementedError("Method _parse not implemented in child class")
+
+
+##### PARSERS OF SWITCH OUTPUTS, SHARED BY BLOCKING AND ASYNC SESSIONS #####
+
+# rx and tx bytes of one port: per second column or cumulative counters
+class PacketParser(StreamParser):
+    __group: str
+    packets: dict[int, int]
+
+    def __init__(self, terminator: bytes, counters: bool = False) -> None:
+        super().__init__([terminator])
+        self.__group = "total" if counters else "rate"
+        self.packets = {}
+
+    # take rx and tx lines, the rest of region isn't scanned after both are found
+    def _parse(self, region: bytes) -> bool:
+        position = 0
+        while len(self.packets) < 2 and (match := BYTES_LINE.search(region, position)):
+            self.packets[region[match.start() - 1]] = int(match.group(self.__group))
+            position = match.end()
+        return len(self.packets) == 2
+
+    # rx and tx bytes as integers
+    def result(self) -> tuple[int, int]:
+        return self.packets[RX], self.packets[TX]
+
+# rx and tx bytes of one redraw of self-refreshing page, control sequences are spaces, as they may be the only separators of lines
+class LivePacketParser(PacketParser):
+    def _parse(self, region: bytes) -> bool:
+        return super()._parse(ANSI_SEQUENCE.sub(b" ", region))
+
+# rx and tx bytes of every port's block, port as key
+class PortsPacketParser(StreamParser):
+    __group: str
+    __ports: set[int]
+    __port: int | None
+    packets: dict[int, dict[int, int]]
+
+    def __init__(self, terminator: bytes, user_ports: list[int], counters: bool = False) -> None:
+        super().__init__([terminator])
+        self.__group = "total" if counters else "rate"
+        self.__ports = set(user_ports)
+
+        # port of current block
+        self.__port = None
+        self.packets = {}
+
+    # take port's headers and rx and tx lines, every line belongs to the last header before it
+    def _parse(self, region: bytes) -> bool:
+        headers = [(match.start(), int(match.group("port"))) for match in PORT_LINE.finditer(region)]
+        for match in BYTES_LINE.finditer(region):
+            header = bisect(headers, (match.start(),)) - 1
+            port = headers[header][1] if header >= 0 else self.__port
+            if port is not None:
+                self.packets.setdefault(port, {})[region[match.start() - 1]] = int(match.group(self.__group))
+
+        # last header continues in next region
+        if headers:
+            self.__port = headers[-1][1]
+
+        # all asked ports have both directions
+        return all(len(self.packets.get(port, ())) == 2 for port in self.__ports)
+
+    # rx and tx bytes as integers of complete blocks, port as key
+    def result(self) -> dict[int, tuple[int, int]]:
+        return {port: (packets[RX], packets[TX]) for port, packets in self.packets.items() if len(packets) == 2}
+
+# endings of model info: continuation (index 0) or prompt (index 1)
+MODEL_TERMINATORS = [commands.MORE.pattern, commands.PROMPT.pattern]
+
+# model and default gateway from model info, output may end with continuation or prompt
+class ModelParser(StreamParser):
+    __cli_type: str
+    __last_line: bytes
+    model: str
+    default_gateway: str
+
+    def __init__(self, cli_type: str) -> None:
+        super().__init__(MODEL_TERMINATORS)
+        self.__cli_type = cli_type
+        self.__last_line = b""
+        self.model = ""
+        self.default_gateway = ""
+
+    # d-link shows model and gateway in separate lines, cisco-like shows model in line under dashes of table
+    def _parse(self, region: bytes) -> bool:
+        if self.__cli_type == "d-link":
+            if not self.model and (match := MODEL_LINE.search(region)):
+                self.model = match.group("model").decode("utf-8")
+            if not self.default_gateway and (match := GATEWAY_LINE.search(region)):
+                self.default_gateway = match.group("default_gateway").decode("utf-8")
+            return bool(self.model and self.default_gateway)
+
+        # dashes may be the last line of previous region
+        region = self.__last_line + region
+        self.__last_line = region[region.rfind(b"\n", 0, len(region) - 1) + 1:]
+        match = UNIT_LINE.search(region)
+        if match:
+            self.model = match.group("model").decode("utf-8")
+        return bool(self.model)
+
+    # model and default gateway if found, None otherwise
+    def result(self, ipaddress: str) -> tuple[str, str] | None:
+        if not self.found:
+            return None
+
+        # if model unknown, quit
+        if self.model not in commands.SWITCHES:
+            raise MyException(ExceptionType.UNKNOWN_MODEL, ipaddress)
+
+        # for d-link, default gateway is in the same output, so as not to check it later
+        return self.model, self.default_gateway if self.model != commands.CISCO_SWITCH else ""
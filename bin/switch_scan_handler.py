@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import traceback
+import signal
+import time
+import sys
+# user's modules
+from database_manager import DatabaseManager
+from L2_switch_session import L2SwitchSession
+from port_monitor import PortMonitor
+from poll_scheduler import PollScheduler
+from switch_index import SwitchIndex
+from const import PacketScan
+
+
+##### CLASS FOR PACKET SCANNING OF ALL USERS ON SWITCH #####
+
+class SwitchScanHandler:
+    # columns to rank ports by
+    SORT_KEYS: dict[str, str] = {"rx": "rx_bytes", "tx": "tx_bytes"}
+
+    __switch: str
+    __port: int | None
+    __interval: float
+    __counters: bool
+    __window_ns: int
+    __sort: str
+    _db_manager: DatabaseManager
+    __users: dict[int, list[int]]
+    __monitors: list[PortMonitor]
+
+    # init by switch ip and optionally one port, polling and rates source as in other handlers, ranking by "rx", "tx" or "total"
+    def __init__(self, switch: str, port: int | None = None, interval: float = PacketScan.INTERVAL, counters: bool = False,
+                 window: float = 0, sort: str = "total") -> None:
+        self.__switch = switch
+        self.__port = port
+        self.__interval = interval
+        self.__counters = counters
+        self.__window_ns = round(window * 1e9)
+        self.__sort = sort
+
+        # handle signal with "kill" command and CTRL+C key for safe exiting
+        signal.signal(signal.SIGTERM, self.__handle_exit)
+        signal.signal(signal.SIGINT, self.__handle_exit)
+
+        # usernums by port, monitor for every port
+        self.__users = {}
+        self.__monitors = []
+
+    # handler for safe exiting, gets signal number and stack frame and exits successfully
+    def __handle_exit(self, sig, frame) -> None:
+        sys.exit(0)
+
+    # main function
+    def check_packet(self) -> None:
+        # get all users of switch from database
+        try:
+            self.__get_users()
+        except Exception:   # exception while checking records
+            print("Exception while working with the database records:")
+            traceback.print_exc()
+            return
+
+        # nothing to scan
+        if not self.__users:
+            print(f"No users on switch {self.__switch}" + (f" port {self.__port}" if self.__port is not None else ""))
+            return
+
+        # scan all ports over one session and print them ranked
+        try:
+            self.__scan_switch()
+        # exceptions while working with L2, show traceback
+        except Exception:
+            print("Exception while working with equipment:")
+            traceback.print_exc()
+
+    # working with database, users of switch in one query
+    def __get_users(self) -> None:
+        try:
+            # connect and get ports and usernums of switch
+            self._db_manager = DatabaseManager()
+            rows = self._db_manager.get_switch_users(self.__switch)
+
+        finally:   # always close connection and delete database manager
+            del self._db_manager
+
+        # index ports of switch, one monitor for every port
+        self.__users = SwitchIndex(rows).ports(self.__switch, self.__port)
+        self.__monitors = [PortMonitor(usernums[0], port, self.__window_ns) for port, usernums in self.__users.items()]
+
+    # poll all ports over one session until interrupted
+    def __scan_switch(self) -> None:
+        session: L2SwitchSession | None = None
+        watched: list[int] = []
+        try:
+            # connect to switch once and watch every port
+            for monitor in self.__monitors:
+                session = L2SwitchSession.acquire(self.__switch, monitor.port)
+                watched.append(monitor.port)
+
+            # poll at fixed interval until interrupted
+            scheduler = PollScheduler(self.__interval, PacketScan.MAX_INTERVAL, jitter=False)
+            while True:
+                scheduler.wait()
+
+                # get bytes on all ports by one command, switch's response time slows polling if needed
+                started = time.monotonic_ns()
+                packets = session.get_packets_ports(watched, self.__counters)
+                finished = time.monotonic_ns()
+                scheduler.done((finished - started) / 1e9)
+
+                # calculate megabit with max, from counters there is no rate after first sample
+                ready = True
+                for monitor in self.__monitors:
+                    if not self.__counters:
+                        monitor.update(*packets[monitor.port], finished)
+                    elif not monitor.update_counters(*packets[monitor.port], finished):
+                        ready = False
+
+                # redraw table on terminal
+                if ready:
+                    if sys.stdout.isatty():
+                        print("\033[H\033[J", end="")
+                    print(self._format_table(), flush=True)
+
+        # catch error for correct exiting: eof ending, exit by signal
+        except (EOFError, SystemExit):
+            pass
+
+        # always stop watching ports, connection closes with the last one
+        finally:
+            for port in watched:
+                session.remove_port(port)
+
+    # ports ranked by current traffic, the busiest first
+    def _ranked(self) -> list[PortMonitor]:
+        if self.__sort in self.SORT_KEYS:
+            key = lambda monitor: getattr(monitor, self.SORT_KEYS[self.__sort])
+        else:
+            key = lambda monitor: monitor.rx_bytes + monitor.tx_bytes
+        return sorted(self.__monitors, key=key, reverse=True)
+
+    # table with port, usernums, rx and tx megabit with their maximums
+    def _format_table(self) -> str:
+        lines = [f"Switch {self.__switch}, {time.strftime('%H:%M:%S')}, sorted by {self.__sort}",
+                 f"{'Port':>4}  {'RX':>5} {'Max':>5}  {'TX':>5} {'Max':>5}  Usernums"]
+        for monitor in self._ranked():
+            lines.append(f"{monitor.port:>4}  {monitor.rx_megabit:>5} {monitor.max_rx_megabit:>5}  "
+                         f"{monitor.tx_megabit:>5} {monitor.max_tx_megabit:>5}  {','.join(map(str, self.__users[monitor.port]))}")
+        return "\n".join(lines)
@@ -0,0 +1,467 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import argparse
+import asyncio
+import ipaddress
+import math
+import random
+import time
+from typing import TypedDict
+# user's modules
+from async_telnet import IAC, DO, DONT, WILL, WONT, SB, SE, ECHO, SGA
+from const import CitySwitch
+
+
+##### SIMULATED MODELS #####
+
+# how model looks in cli: prompts, port's name in packet output, packet output as dynamic page
+class ModelBehavior(TypedDict):
+    cli_type: str
+    description: str
+    ports: int
+    username_prompt: str
+    password_prompt: str
+    unit_prefix: str
+    live_page: bool
+
+MODELS: dict[str, ModelBehavior] = {
+    "DES-3028": {"cli_type": "d-link", "description": "Fast Ethernet Switch", "ports": 28,
+                 "username_prompt": "UserName:", "password_prompt": "PassWord:", "unit_prefix": "", "live_page": False},
+    "DES-3200-28": {"cli_type": "d-link", "description": "Fast Ethernet Switch", "ports": 28,
+                    "username_prompt": "UserName:", "password_prompt": "PassWord:", "unit_prefix": "", "live_page": True},
+    "DGS-3120-24TC": {"cli_type": "d-link", "description": "Gigabit Ethernet Switch", "ports": 24,
+                      "username_prompt": "UserName:", "password_prompt": "PassWord:", "unit_prefix": "1:", "live_page": False},
+    "DGS-3630-28SC": {"cli_type": "cisco", "description": "Gigabit Ethernet L3 Switch", "ports": 28,
+                      "username_prompt": "Username:", "password_prompt": "Password:", "unit_prefix": "1/0/", "live_page": False}}
+
+# lines of page with clipaging, seconds between redraws of dynamic page, delay of lost and resent segment
+PAGE_LINES = 20
+REFRESH = 1.0
+RETRANSMIT = 0.2
+
+# continuation lines of usual and dynamic pages
+MORE_LINE = "CTRL+C ESC q Quit SPACE n Next Page ENTER Next Entry a All"
+LIVE_MORE_LINE = "CTRL+C ESC q Quit SPACE n Next Page p Previous Page r Refresh"
+
+# keys to quit page: q, ESC, CTRL+C
+QUIT_KEYS = b"q\x1b\x03"
+
+# cursor to top left before redraw of dynamic page, every line is drawn at its row and the rest of old line is erased
+CURSOR_HOME = "\x1b[1;1H"
+ERASE_LINE = "\x1b[K"
+
+
+##### PORT WITH EVOLVING COUNTERS #####
+
+class SimulatedPort:
+    __rx_mean: float
+    __tx_mean: float
+    __period: float
+    __phase: float
+    __last: float
+    rx_total: int
+    tx_total: int
+
+    # init by random generator, every port has its own mean traffic in bytes per second and daily-like wave
+    def __init__(self, rng: random.Random) -> None:
+        self.__rx_mean = rng.uniform(10e3, 5e6)
+        self.__tx_mean = rng.uniform(10e3, 2e6)
+        self.__period = rng.uniform(30, 300)
+        self.__phase = rng.uniform(0, 2 * math.pi)
+
+        # counters don't start from zero
+        self.__last = time.monotonic()
+        self.rx_total = rng.randrange(10 ** 9, 10 ** 11)
+        self.tx_total = rng.randrange(10 ** 9, 10 ** 11)
+
+    # rx and tx bytes per second now, counters grow by them since last read
+    def sample(self) -> tuple[int, int]:
+        now = time.monotonic()
+        wave = 1 + 0.5 * math.sin(2 * math.pi * now / self.__period + self.__phase)
+        rx_rate, tx_rate = round(self.__rx_mean * wave), round(self.__tx_mean * wave)
+        self.rx_total += round(rx_rate * (now - self.__last))
+        self.tx_total += round(tx_rate * (now - self.__last))
+        self.__last = now
+        return rx_rate, tx_rate
+
+
+##### SWITCH'S OUTPUTS #####
+
+class SimulatedSwitch:
+    model: str
+    behavior: ModelBehavior
+    __ipaddress: str
+    __default_gateway: str
+    __ports: list[SimulatedPort]
+
+    # init by ip and model, gateway is the first address of /24
+    def __init__(self, ipaddress_: str, model: str, rng: random.Random) -> None:
+        self.model = model
+        self.behavior = MODELS[model]
+        self.__ipaddress = ipaddress_
+        self.__default_gateway = str(ipaddress.ip_interface(f"{ipaddress_}/24").network.network_address + 1)
+        self.__ports = [SimulatedPort(rng) for _ in range(self.behavior["ports"])]
+
+    # prompt after every command
+    def prompt(self) -> str:
+        return "Switch#" if self.behavior["cli_type"] == "cisco" else f"{self.model}:admin#"
+
+    # existing ports from d-link port list, e.g. "1-3,5" or "1:1-1:3"
+    def parse_ports(self, value: str) -> list[int]:
+        ports: list[int] = []
+        for item in value.replace(self.behavior["unit_prefix"], "").split(","):
+            first, _, last = item.partition("-")
+            if not first.isdigit() or (last and not last.isdigit()):
+                return []
+            ports.extend(range(int(first), int(last or first) + 1))
+        return [port for port in ports if 1 <= port <= len(self.__ports)]
+
+    # d-link model info, longer than one page
+    def show_switch(self) -> list[str]:
+        return [f"Device Type       : {self.model} {self.behavior['description']}",
+                "MAC Address       : 00-1C-F0-" + "-".join(f"{int(part):02X}" for part in self.__ipaddress.split(".")[1:]),
+                f"IP Address        : {self.__ipaddress} (Manual)",
+                "VLAN Name         : default",
+                "Subnet Mask       : 255.255.255.0",
+                f"Default Gateway   : {self.__default_gateway}",
+                "Boot PROM Version : Build 1.00.B06",
+                "Firmware Version  : Build 2.90.B10",
+                "Hardware Version  : A3",
+                "System Name       :",
+                "System Location   :",
+                "System Uptime     : 12 days, 3 hours, 41 minutes, 6 seconds",
+                "System Contact    :",
+                "Spanning Tree     : Disabled",
+                "GVRP              : Disabled",
+                "IGMP Snooping     : Enabled",
+                "TELNET            : Enabled (TCP 23)",
+                "WEB               : Disabled",
+                "RMON              : Disabled",
+                "SSH               : Disabled",
+                "SSL               : Disabled",
+                "Syslog Global State: Disabled",
+                "Dual Image        : Supported"]
+
+    # cisco-like model info with table of units
+    def show_version(self) -> list[str]:
+        return ["System MAC Address: 00-1C-F0-00-00-01",
+                "",
+                "Unit ID  Module Name                         Versions",
+                "-------  ----------------------------------  ---------------------",
+                f"1        {self.model:<34}  H/W:A1",
+                "                                            Bootloader:1.00.010",
+                "                                            Runtime:2.00.010"]
+
+    # rx and tx bytes counters of port now, as interface counters of snmp agent
+    def counters(self, port: int) -> tuple[int, int]:
+        simulated = self.__ports[port - 1]
+        simulated.sample()
+        return simulated.rx_total, simulated.tx_total
+
+    # number of ports, interface indexes of snmp agent
+    def get_ports(self) -> int:
+        return len(self.__ports)
+
+    # packet table of port with current rates and counters
+    def show_packet(self, port: int) -> list[str]:
+        simulated = self.__ports[port - 1]
+        rx_rate, tx_rate = simulated.sample()
+        return [f"Port Number : {self.behavior['unit_prefix']}{port}",
+                " Frame Size/Type  Frame Counts  Frames/sec  Frame Type  Total        Total/sec",
+                " ---------------  ------------  ----------  ----------  -----------  ---------",
+                f" 64               {simulated.rx_total // 3000:<12}  {rx_rate // 3000:<10}  "
+                f"RX Bytes    {simulated.rx_total:<11}  {rx_rate}",
+                f" 65-127           {simulated.rx_total // 2000:<12}  {rx_rate // 2000:<10}  "
+                f"RX Frames   {simulated.rx_total // 700:<11}  {rx_rate // 700}",
+                f" 128-255          {simulated.rx_total // 9000:<12}  {rx_rate // 9000:<10}",
+                f" 256-511          {simulated.tx_total // 9000:<12}  {tx_rate // 9000:<10}  "
+                f"TX Bytes    {simulated.tx_total:<11}  {tx_rate}",
+                f" 512-1023         {simulated.tx_total // 5000:<12}  {tx_rate // 5000:<10}  "
+                f"TX Frames   {simulated.tx_total // 700:<11}  {tx_rate // 700}",
+                f" 1024-1518        {simulated.tx_total // 1500:<12}  {tx_rate // 1500:<10}",
+                f" Unicast RX       {simulated.rx_total // 800:<12}  {rx_rate // 800:<10}",
+                " Multicast RX     2103          0",
+                " Broadcast RX     71013         0",
+                ""]
+
+
+##### TELNET INPUT OF ONE CLIENT #####
+
+class TelnetInput:
+    __reader: asyncio.StreamReader
+    __data: bytearray
+    __after_cr: bool
+
+    def __init__(self, reader: asyncio.StreamReader) -> None:
+        self.__reader = reader
+        self.__data = bytearray()
+
+        # line ending "\r\n" or "\r\0" is one enter key
+        self.__after_cr = False
+
+    # next key without telnet commands, None at end of stream or after timeout
+    async def key(self, timeout: float | None = None) -> int | None:
+        while True:
+            while self.__data:
+                byte = self.__data.pop(0)
+
+                # option negotiation and subnegotiation of client are skipped
+                if byte == IAC:
+                    if not await self.__skip_command():
+                        return None
+                    continue
+
+                # the second byte of line ending
+                if self.__after_cr and byte in (0, ord("\n")):
+                    self.__after_cr = False
+                    continue
+                self.__after_cr = byte == ord("\r")
+                return byte
+
+            try:
+                data = await asyncio.wait_for(self.__reader.read(4096), timeout)
+            except asyncio.TimeoutError:
+                return None
+            if not data:
+                return None
+            self.__data += data
+
+    # line till enter key, None at end of stream
+    async def line(self) -> str | None:
+        line = bytearray()
+        while (byte := await self.key()) is not None:
+            if byte in (ord("\r"), ord("\n")):
+                return line.decode("utf-8", "replace").strip()
+            line.append(byte)
+        return None
+
+    # skip telnet command after IAC, False at end of stream
+    async def __skip_command(self) -> bool:
+        verb = await self.__raw()
+        if verb in (DO, DONT, WILL, WONT):
+            return await self.__raw() is not None
+        if verb == SB:
+            previous = None
+            while (byte := await self.__raw()) is not None:
+                if previous == IAC and byte == SE:
+                    return True
+                previous = byte
+            return False
+        return verb is not None
+
+    # next byte as is
+    async def __raw(self) -> int | None:
+        if not self.__data:
+            data = await self.__reader.read(4096)
+            if not data:
+                return None
+            self.__data += data
+        return self.__data.pop(0)
+
+
+##### TELNET SERVER OF MANY SIMULATED SWITCHES #####
+
+class SwitchSimulator:
+    __switches: dict[str, SimulatedSwitch]
+    __port: int
+    __latency: float
+    __jitter: float
+    __loss: float
+    __rng: random.Random
+    __server: asyncio.Server | None
+    connections: int
+    commands: int
+
+    # init by models of switches by ip, telnet port, seconds before every answer with random addition,
+    # part of answers delayed by lost segment
+    def __init__(self, switches: dict[str, str], port: int = CitySwitch.TELNET_PORT, latency: float = 0.0,
+                 jitter: float = 0.0, loss: float = 0.0, seed: int | None = None) -> None:
+        self.__rng = random.Random(seed)
+        self.__switches = {ip: SimulatedSwitch(ip, model, self.__rng) for ip, model in switches.items()}
+        self.__port = port
+        self.__latency = latency
+        self.__jitter = jitter
+        self.__loss = loss
+        self.__server = None
+
+        # served connections and commands
+        self.connections = 0
+        self.commands = 0
+
+    # models in turn on consecutive addresses starting from network's first host, loopback addresses need no setup on linux
+    @staticmethod
+    def addresses(count: int, models: list[str], network: str = "127.0.1.0/24") -> dict[str, str]:
+        hosts = ipaddress.ip_network(network).hosts()
+        return {str(next(hosts)): models[index % len(models)] for index in range(count)}
+
+    # simulated switches by ip, e.g. for snmp agent of the same switches
+    def get_switches(self) -> dict[str, SimulatedSwitch]:
+        return self.__switches
+
+    # listen on every switch's address
+    async def start(self) -> None:
+        self.__server = await asyncio.start_server(self.__handle, list(self.__switches), self.__port)
+
+    # serve until cancelled
+    async def serve_forever(self) -> None:
+        if self.__server is None:
+            await self.start()
+        await self.__server.serve_forever()
+
+    # stop listening
+    async def close(self) -> None:
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+
+    # one client of one switch, chosen by address it connected to
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        switch = self.__switches.get(writer.get_extra_info("sockname")[0])
+        if switch is None:
+            writer.close()
+            return
+        self.connections += 1
+        keys = TelnetInput(reader)
+        try:
+            await self.__login(switch, keys, writer)
+
+            # clipaging is on in every new session
+            paging = True
+            while (command := await keys.line()) is not None:
+                self.commands += 1
+                writer.write(f"{command}\r\n".encode())
+                words = command.split()
+                if not words:
+                    await self.__send(writer, switch.prompt())
+                elif words[0] in ("logout", "exit"):
+                    break
+                elif switch.behavior["cli_type"] == "cisco":
+                    paging = await self.__cisco_command(switch, words, paging, keys, writer)
+                else:
+                    paging = await self.__dlink_command(switch, command, words, paging, keys, writer)
+
+        # client went away
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # banner, login and password, echo is made by server
+    async def __login(self, switch: SimulatedSwitch, keys: TelnetInput, writer: asyncio.StreamWriter) -> None:
+        writer.write(bytes((IAC, WILL, ECHO, IAC, WILL, SGA)))
+        await self.__send(writer, f"\r\n{switch.model} {switch.behavior['description']} Command Line Interface\r\n\r\n"
+                                  f"{switch.behavior['username_prompt']}")
+        username = await keys.line()
+        writer.write(f"{username}\r\n".encode())
+        await self.__send(writer, switch.behavior["password_prompt"])
+        await keys.line()
+        await self.__send(writer, f"\r\n\r\n{switch.prompt()}")
+
+    # d-link commands, return clipaging state
+    async def __dlink_command(self, switch: SimulatedSwitch, command: str, words: list[str], paging: bool,
+                              keys: TelnetInput, writer: asyncio.StreamWriter) -> bool:
+        header = [f"Command: {command}", ""]
+        if words in (["enable", "clipaging"], ["disable", "clipaging"]):
+            paging = words[0] == "enable"
+            await self.__send(writer, "\r\n".join(header + ["Success.", "", switch.prompt()]))
+        elif words == ["show", "switch"]:
+            await self.__page(writer, keys, switch, header + switch.show_switch(), paging)
+        elif words[:3] == ["show", "packet", "ports"] and len(words) == 4 and (ports := switch.parse_ports(words[3])):
+            if switch.behavior["live_page"]:
+                await self.__live_page(writer, keys, switch, header, ports)
+            else:
+                await self.__page(writer, keys, switch, header + [line for port in ports for line in switch.show_packet(port)], paging)
+        else:
+            await self.__send(writer, "\r\n".join(["Available commands:", "..  ?  disable  enable  logout  show", "",
+                                                   switch.prompt()]))
+        return paging
+
+    # cisco-like commands, return clipaging state
+    async def __cisco_command(self, switch: SimulatedSwitch, words: list[str], paging: bool,
+                              keys: TelnetInput, writer: asyncio.StreamWriter) -> bool:
+        if words[:2] == ["terminal", "length"] and len(words) == 3 and words[2].isdigit():
+            paging = words[2] != "0"
+            await self.__send(writer, f"\r\n{switch.prompt()}")
+        elif words == ["show", "version"]:
+            await self.__page(writer, keys, switch, [""] + switch.show_version() + [""], paging)
+        else:
+            await self.__send(writer, "\r\n".join(["       ^", "% Invalid input detected at '^' marker.", "",
+                                                   switch.prompt()]))
+        return paging
+
+    # output by pages with clipaging, page is continued or quit by keys
+    async def __page(self, writer: asyncio.StreamWriter, keys: TelnetInput, switch: SimulatedSwitch,
+                     lines: list[str], paging: bool) -> None:
+        position = len(lines) if not paging else min(PAGE_LINES, len(lines))
+        await self.__send(writer, "\r\n".join(lines[:position]) + "\r\n")
+        while position < len(lines):
+            await self.__send(writer, MORE_LINE)
+            key = await keys.key()
+            if key is None or key in QUIT_KEYS:
+                break
+
+            # whole rest, one more line or next page
+            step = len(lines) if key == ord("a") else 1 if key == ord("\r") else PAGE_LINES
+            writer.write(b"\r" + b" " * len(MORE_LINE) + b"\r")
+            await self.__send(writer, "\r\n".join(lines[position:position + step]) + "\r\n")
+            position += step
+        await self.__send(writer, f"\r\n{switch.prompt()}")
+
+    # dynamic page of one port at a time, redrawn until it's quit
+    async def __live_page(self, writer: asyncio.StreamWriter, keys: TelnetInput, switch: SimulatedSwitch,
+                          header: list[str], ports: list[int]) -> None:
+        index = 0
+        draw = "\r\n".join(header + switch.show_packet(ports[index]) + [LIVE_MORE_LINE])
+        await self.__send(writer, draw)
+        while True:
+            key = await keys.key(REFRESH)
+            if key is not None and key in QUIT_KEYS:
+                break
+
+            # next or previous port, or the same one with new values
+            if key in (ord("n"), ord(" ")):
+                index = min(index + 1, len(ports) - 1)
+            elif key == ord("p"):
+                index = max(index - 1, 0)
+            draw = "".join(f"\x1b[{row};1H{line}{ERASE_LINE}"
+                           for row, line in enumerate(switch.show_packet(ports[index]) + [LIVE_MORE_LINE], len(header) + 1))
+            await self.__send(writer, CURSOR_HOME + draw)
+        await self.__send(writer, f"\r\n\r\n{switch.prompt()}")
+
+    # answer after switch's latency, a lost segment is resent later
+    async def __send(self, writer: asyncio.StreamWriter, text: str) -> None:
+        delay = self.__latency + self.__rng.uniform(0, self.__jitter)
+        if self.__loss and self.__rng.random() < self.__loss:
+            delay += RETRANSMIT
+        if delay:
+            await asyncio.sleep(delay)
+        writer.write(text.encode())
+        await writer.drain()
+
+
+##### RUN #####
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate telnet cli of many switches on loopback addresses")
+    parser.add_argument("--switches", type=int, default=100, help="number of simulated switches")
+    parser.add_argument("--models", default=",".join(MODELS), help="comma separated models given to switches in turn")
+    parser.add_argument("--network", default="127.0.1.0/24", help="network of switches' addresses")
+    parser.add_argument("--port", type=int, default=CitySwitch.TELNET_PORT, help="telnet port, set TELNET_PORT for clients too")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="max random seconds added to latency")
+    parser.add_argument("--loss", type=float, default=0.0, help="part of answers delayed by resent segment")
+    return parser.parse_args()
+
+def main() -> None:
+    arguments = parse_arguments()
+    switches = SwitchSimulator.addresses(arguments.switches, arguments.models.split(","), arguments.network)
+    simulator = SwitchSimulator(switches, arguments.port, arguments.latency, arguments.jitter, arguments.loss)
+    for ip, model in switches.items():
+        print(f"{ip}:{arguments.port} {model}")
+    try:
+        asyncio.run(simulator.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
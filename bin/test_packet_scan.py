@@ -1,9 +1,65 @@
 import pytest
 from random import randint
 from packet_scan_handler import PacketScanHandler
+from multi_packet_scan_handler import MultiPacketScanHandler
 from database_manager import DatabaseManager, SwitchPortData
 from L2_switch import L2Switch
+from L2_switch_session import L2SwitchSession
+from base_network_device import BaseNetworkDevice
+from port_monitor import PortMonitor
+from model_cache import ModelCache
+from scan_daemon import ScanDaemon
+from scan_client import ScanClient
+from connection_pool import ConnectionPool
+from topology_cache import TopologyCache
+from switch_index import SwitchIndex
+from switch_scan_handler import SwitchScanHandler
+from sample_encoder import StructEncoder, get_encoder
+import json
+from pipe_writer import PipeWriter
+from port_history import PortHistory
+from sample_recorder import SampleRecorder
+from record_reader import RecordReader
+from replay_handler import ReplayHandler
+import replay_handler
+from switch_simulator import SwitchSimulator
+import switch_simulator
+from async_L2_switch import AsyncL2Switch
+from async_base_switch import AsyncBaseSwitch
+from async_telnet import AsyncTelnetSession, IAC, DO, DONT, WILL, WONT, SB, SE, ECHO, SGA
+from const import CitySwitch
+import asyncio
+import socket
+from timings import Timings
+import urllib.request
+import icmplib
+from reachability import Reachability
+from switch_health import SwitchHealth
+from snmp_agent import SnmpAgent
+from snmp_client import SnmpClient
+import snmp_ber
+from snmp_ber import Message, VarBind
+from types import SimpleNamespace
+import os
+import time
+import scan_daemon
+import packet
+import threading
+from collections import OrderedDict
+import commands
 from my_exception import MyException, ExceptionType
+from connection_writer import ConnectionWriter
+from shard_supervisor import ShardSupervisor
+import shard_supervisor
+from const import PacketScan
+import const
+import signal
+import sys
+import multiprocessing
+import shutil
+import poll_scheduler
+import switch_parser
+from poll_scheduler import PollScheduler, parse_interval
 
 
 # mock class as a database manager
@@ -16,6 +72,10 @@ class FakeDatabaseManager(DatabaseManager):
     def get_switch_port(self, usernum: int) -> SwitchPortData:
         return self.test_data[usernum]
     
+    # get data for several users, unknown are skipped
+    def get_switch_ports(self, usernums: list[int]) -> dict[int, SwitchPortData]:
+        return {usernum: dict(self.test_data[usernum]) for usernum in usernums if usernum in self.test_data}
+    
     # pass while deleting
     def __del__(self) -> None:
         pass
@@ -34,6 +94,73 @@ class FakeL2Switch(L2Switch):
     def __del__(self) -> None:
         pass
 
+# mock telnet session: remembers commands, gives chunks of output in turn or the same output every time, alive until closed
+class FakeSession:
+    def __init__(self, output=b"", chunks=None):
+        self.commands = []
+        self.output = output
+        self.chunks = chunks
+        self.buffer = b""
+        self.timeout = 5
+        self.alive = True
+
+    def sendline(self, command):
+        self.commands.append(command)
+
+    def expect_list(self, patterns):
+        return 0
+
+    def read_nonblocking(self, size, timeout):
+        return self.chunks.pop(0) if self.chunks is not None else self.output
+
+    def isalive(self):
+        return self.alive
+
+    def close(self):
+        self.alive = False
+
+# mock connection of switch managers: d-link switch with fake session made by function instead of real switch
+def fake_connection(monkeypatch, make_session=FakeSession):
+    def connect(self):
+        self._session = make_session()
+        self._model = "DES-3028"
+        self._profile = commands.profile("DES-3028")
+    monkeypatch.setattr(BaseNetworkDevice, "_BaseNetworkDevice__start_connection", connect)
+
+# mock shared session of switch for daemon: fixed bytes on every port, connection may be closed by switch
+class FakeL2SwitchSession:
+    def __init__(self):
+        self.ports = []
+        self.alive = True
+
+    def get_packets_ports(self, user_ports, counters=False):
+        return {user_port: (1024 * 1024, 2 * 1024 * 1024) for user_port in user_ports}
+
+    def remove_port(self, user_port):
+        self.ports.remove(user_port)
+
+    def isalive(self):
+        return self.alive
+
+# mock function as a worker process: sends line of every user until terminated
+def fake_run_shard(rows, connection, *arguments):
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
+    writer = ConnectionWriter(connection)
+    try:
+        while True:
+            writer.put(b"".join(f"{usernum} 1 1 1 1\n".encode() for usernum in rows))
+            time.sleep(0.05)
+    finally:
+        writer.close()
+
+# mock worker process learning models and health of its own switches in files shared with other processes
+def learn_switches(directory, first):
+    ModelCache._ModelCache__path = f"{directory}/models.json"
+    SwitchHealth._SwitchHealth__path = f"{directory}/health.json"
+    for host in range(first, first + 20):
+        ModelCache.put(f"10.0.2.{host}", "DES-3028", "DES-3028", "10.0.0.1", "d-link")
+        SwitchHealth.failure(f"10.0.2.{host}", "NOT_AVAILABLE")
+
 # some fake data for tests
 fake_usernum = 12345
 fake_data = {fake_usernum: {"switchP": "192.168.1.100", "PortP": 5}}
@@ -60,6 +187,8 @@ def test_no_user_in_db(monkeypatch, capsys):
     class EmptyDB:
         def get_switch_port(self, usernum):
             return None
+        def get_switch_ports(self, usernums):
+            return {}
 
     # substitute with the fake database object
     monkeypatch.setattr("packet_scan_handler.DatabaseManager", lambda: EmptyDB())
@@ -164,3 +293,1020 @@ def test_full_integration(tmp_path, monkeypatch):
     finally:
         if test_file.exists():
             test_file.unlink()
+
+# test getting switches and ports for several users in one query
+def test_multi_get_switch_ports(monkeypatch, capsys):
+    # two users on one switch, one on another
+    multi_data = {1: {"switchP": "192.168.1.100", "PortP": 5},
+                  2: {"switchP": "192.168.1.100", "PortP": 7},
+                  3: {"switchP": "192.168.1.101", "PortP": 1}}
+    fake_db = FakeDatabaseManager(multi_data)
+    monkeypatch.setattr("multi_packet_scan_handler.DatabaseManager", lambda: fake_db)
+
+    # create handler with unknown user and get switches and ports directly
+    handler = MultiPacketScanHandler([1, 2, 3, 99999])
+    handler._MultiPacketScanHandler__get_switch_ports()
+
+    # check users are grouped by switch and unknown user is reported
+    switches = handler._MultiPacketScanHandler__switches
+    assert [(monitor.usernum, monitor.port) for monitor in switches["192.168.1.100"]] == [(1, 5), (2, 7)]
+    assert [(monitor.usernum, monitor.port) for monitor in switches["192.168.1.101"]] == [(3, 1)]
+    assert "User 99999 not found in the database" in capsys.readouterr().out
+
+# test batched packet statistics for several ports by one command
+def test_get_packets_ports(monkeypatch):
+    # output of one command for ports 1-2 on d-link switch
+    output = (b"show packet ports 1-2\r\n"
+              b"Port Number : 1\r\n"
+              b"  RX Bytes    1000    100\r\n  RX Frames   10    1\r\n"
+              b"  TX Bytes    2000    200\r\n  TX Frames   20    2\r\n"
+              b"Port Number : 2\r\n"
+              b"  RX Bytes    3000    300\r\n  RX Frames   30    3\r\n"
+              b"  TX Bytes    4000    400\r\n  TX Frames   40    4\r\n"
+              b"DES-3028:admin#")
+
+    # connect without real switch, session gives the output
+    fake_connection(monkeypatch, lambda: FakeSession(output))
+
+    # get statistics for both ports and check only one command was sent
+    session = L2SwitchSession("192.168.1.100")
+    assert session.get_packets_ports([2, 1]) == {2: (300, 400), 1: (100, 200)}
+    assert session._session.commands == [b"show packet ports 1-2"]
+
+# test session is shared by watchers of ports and closed with the last one
+def test_session_watchers(monkeypatch):
+    monkeypatch.setattr(L2SwitchSession, "_L2SwitchSession__sessions", {})
+
+    # connect without real switch, session remembers commands until it's closed
+    fake_connection(monkeypatch)
+
+    # two ports share one session, it stays open while one of them is watched
+    session = L2SwitchSession.acquire("192.168.1.100", 1)
+    assert L2SwitchSession.acquire("192.168.1.100", 2) is session
+    session.remove_port(1)
+    assert session._session.isalive() and session.get_ports() == [2]
+    assert L2SwitchSession._L2SwitchSession__sessions == {"192.168.1.100": session}
+
+    # the last port closes session with clipaging restored and forgets it, next port connects again
+    session.remove_port(2)
+    assert not session._session.isalive()
+    assert session._session.commands[-1] == commands.profile("DES-3028").clipaging_enable
+    assert L2SwitchSession._L2SwitchSession__sessions == {}
+    new_session = L2SwitchSession.acquire("192.168.1.100", 1)
+    assert new_session is not session and new_session._session.isalive()
+    new_session.remove_port(1)
+
+# test polls are planned on grid, missed ones are skipped and slow target gets longer interval up to max
+def test_poll_scheduler(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(poll_scheduler, "time", SimpleNamespace(monotonic=lambda: clock[0], sleep=lambda seconds: None))
+
+    # first poll at once without jitter, next ones on grid regardless of when poll ended
+    scheduler = PollScheduler(1.0, 4.0, jitter=False)
+    assert scheduler.delay() == 0
+    clock[0] += 0.2
+    scheduler.done(0.01)
+    assert scheduler.delay() == pytest.approx(0.8)
+    clock[0] = 101.3
+    scheduler.done(0.01)
+    assert scheduler.delay() == pytest.approx(0.7)
+
+    # polls missed while target was slow are skipped, grid is kept
+    clock[0] = 105.5
+    scheduler.done(0.01)
+    assert scheduler.delay() == pytest.approx(0.5)
+
+    # slow answers stretch interval up to max, fast ones bring it back
+    for _ in range(30):
+        scheduler.done(10.0)
+    assert scheduler.get_interval() == 4.0
+    for _ in range(30):
+        scheduler.done(0.01)
+    assert scheduler.get_interval() == 1.0
+
+# test interval is parsed with units and only positive values are accepted
+def test_parse_interval():
+    assert parse_interval("1.5") == 1.5
+    assert parse_interval("500ms") == 0.5
+    assert parse_interval(" 2m ") == 120
+    assert parse_interval(".5s") == 0.5
+    for value in ["0", "0ms", "0.0s", "-1", "1h", "", "ms"]:
+        with pytest.raises(ValueError):
+            parse_interval(value)
+
+# test parsers give the same result however output is split into chunks
+def test_stream_parser_chunks():
+    ports_output = (b"show packet ports 1-2\r\n"
+                    b"Port Number : 1\r\n  RX Bytes    1000    100\r\n  TX Bytes    2000    200\r\n"
+                    b"Port Number : 2\r\n  RX Bytes    3000    300\r\n  TX Bytes    4000    400\r\n"
+                    b"DES-3028:admin#")
+    model_output = (b"show switch\r\nDevice Type       : DES-3028 Fast Ethernet Switch\r\n"
+                    b"Default Gateway   : 10.0.0.1\r\nCTRL")
+    unit_output = b"show unit\r\nUnit  Model\r\n----  ---------\r\n 1    DGS-3630-28SC  L3\r\nDGS-3630:admin#"
+    cases = [(lambda: switch_parser.PortsPacketParser(b"#", [1, 2]), ports_output, {1: (100, 200), 2: (300, 400)}),
+             (lambda: switch_parser.ModelParser("d-link"), model_output, ("DES-3028", "10.0.0.1")),
+             (lambda: switch_parser.ModelParser("cisco"), unit_output, ("DGS-3630-28SC", ""))]
+
+    # output with data of next command after its ending
+    for make_parser, output, expected in cases:
+        results = []
+        splits = [[output + b"next"]] + [[output[:index], output[index:] + b"next"] for index in range(1, len(output))]
+        splits.append([bytes([byte]) for byte in output + b"next"])
+        for chunks in splits:
+            parser = make_parser()
+            ended = [parser.feed(chunk) for chunk in chunks]
+            result = parser.result("10.0.0.2") if isinstance(parser, switch_parser.ModelParser) else parser.result()
+            results.append((result, parser.found, parser.end_index, parser.rest, ended[-1]))
+        assert all(result == (expected, True, results[0][2], b"next", True) for result in results)
+    assert results[0][2] == 1
+
+# test data after output's ending is left in session for next command and too long output without ending is unexpected
+def test_stream_parser_rest_and_limit(monkeypatch):
+    # connect without real switch, session gives chunks of output
+    fake_connection(monkeypatch, lambda: FakeSession(chunks=[b"  RX Bytes  10  1\r\n  TX Bytes  20  2\r\nDES-3028:admin#  RX By",
+                                                             b"tes  30  3\r\n", b"  TX Bytes  40  4\r\nDES-3028:admin#"]))
+    monkeypatch.setattr(ModelCache, "invalidate", lambda ipaddress: None)
+    switch = L2SwitchSession("192.168.1.100")
+
+    # the rest after prompt stays in buffer and starts next output
+    parser = switch_parser.PacketParser(b"#")
+    switch._expect_parser(parser)
+    assert parser.result() == (1, 2) and switch._session.buffer == b"  RX By"
+    parser = switch_parser.PacketParser(b"#")
+    switch._expect_parser(parser)
+    assert parser.result() == (3, 4) and switch._session.buffer == b""
+
+    # output over line limit without prompt
+    switch._session.chunks = [b"  RX Frames  1  1\r\n" * 100] * 30
+    with pytest.raises(MyException) as error:
+        switch._expect_parser(switch_parser.PacketParser(b"#"))
+    assert "неожиданный ответ свитча с IP 192.168.1.100" in str(error.value)
+    assert len(switch._session.chunks) == 9
+    with pytest.raises(switch_parser.OutputLimitError):
+        switch_parser.PacketParser(b"#").feed(b"line\n" * (CitySwitch.MAX_OUTPUT_LINES + 1))
+
+# test rates from cumulative counters with wrap and reset of counter
+def test_rates_from_counters():
+    monitor = PortMonitor(fake_usernum, 5)
+    second = 10 ** 9
+
+    # first sample gives no rate, next one gives difference per second
+    assert not monitor.update_counters(2 ** 32 - 2 * 1024 * 1024 - 512, 0, 0)
+    assert monitor.update_counters(2 ** 32 - 512, 1024 * 1024, second)
+    assert (monitor.rx_bytes, monitor.tx_bytes) == (2 * 1024 * 1024, 1024 * 1024)
+    assert (monitor.rx_megabit, monitor.tx_megabit) == (16, 8)
+
+    # 32 bit counter wraps, rate is still correct
+    assert monitor.update_counters(512, 2 * 1024 * 1024, 2 * second)
+    assert monitor.rx_bytes == 1024
+
+    # counters are cleared on switch, rate starts again from next sample
+    assert not monitor.update_counters(10, 10, 3 * second)
+    assert monitor.update_counters(10 + 512, 10 + 256, 4 * second)
+    assert (monitor.rx_bytes, monitor.tx_bytes) == (512, 256)
+
+# test model cache kept in file between runs, expired and invalidated entries
+def test_model_cache(tmp_path, monkeypatch):
+    path = tmp_path / "models.json"
+    monkeypatch.setattr(ModelCache, "_ModelCache__path", str(path))
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+
+    # saved model is read by new process
+    ModelCache.put("192.168.1.100", "DES-3052", "DES-3028", "10.0.0.1", "d-link")
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    entry = ModelCache.get("192.168.1.100")
+    assert (entry["model"], entry["base_switch"], entry["default_gateway"], entry["cli_type"]) == ("DES-3052", "DES-3028", "10.0.0.1", "d-link")
+
+    # too old model is probed again
+    monkeypatch.setattr(ModelCache, "_ModelCache__ttl", -1)
+    assert ModelCache.get("192.168.1.100") is None
+    monkeypatch.setattr(ModelCache, "_ModelCache__ttl", 60)
+
+    # unexpected output forgets model
+    ModelCache.invalidate("192.168.1.100")
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    assert ModelCache.get("192.168.1.100") is None
+
+# test processes writing the same files at once keep switches learned by each other
+def test_shared_state_files(tmp_path, monkeypatch):
+    context = multiprocessing.get_context("spawn")
+    writers = [context.Process(target=learn_switches, args=(str(tmp_path), first)) for first in (0, 100)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(30)
+        assert writer.exitcode == 0
+
+    # new process knows switches of both writers
+    hosts = [f"10.0.2.{host}" for first in (0, 100) for host in range(first, first + 20)]
+    monkeypatch.setattr(ModelCache, "_ModelCache__path", str(tmp_path / "models.json"))
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__path", str(tmp_path / "health.json"))
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__entries", None)
+    assert all(ModelCache.get(host) is not None for host in hosts)
+    assert all(SwitchHealth.timeout(host) == CitySwitch.CONNECT_TIMEOUT and
+               SwitchHealth._SwitchHealth__load()[host]["failures"] == 1 for host in hosts)
+
+    # removed model stays removed, model learned meanwhile by another process is kept
+    ModelCache.invalidate(hosts[0])
+    writer = context.Process(target=learn_switches, args=(str(tmp_path), 200))
+    writer.start()
+    writer.join(30)
+    ModelCache.put(hosts[1], "DES-3200-28", "DES-3200-28", "10.0.0.1", "d-link")
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    assert ModelCache.get(hosts[0]) is None
+    assert ModelCache.get(hosts[1])["model"] == "DES-3200-28" and ModelCache.get("10.0.2.200") is not None
+
+# test daemon streams lines of subscribed users to client over socket and stops scanning when client leaves
+def test_scan_daemon(tmp_path, monkeypatch):
+    # fake database created by daemon for every subscribing
+    class DaemonDatabaseManager(FakeDatabaseManager):
+        def __init__(self):
+            super().__init__(fake_data)
+    monkeypatch.setattr(scan_daemon, "DatabaseManager", DaemonDatabaseManager)
+
+    # one shared session of switch, logins are counted
+    fake_session = FakeL2SwitchSession()
+    logins = []
+    def fake_acquire(ipaddress, user_port, print_output=False):
+        # the first port connects to switch
+        if not fake_session.ports:
+            logins.append(ipaddress)
+            fake_session.alive = True
+        fake_session.ports.append(user_port)
+        return fake_session
+    monkeypatch.setattr(scan_daemon.L2SwitchSession, "acquire", fake_acquire)
+
+    # session is kept shortly after the last client
+    monkeypatch.setattr(scan_daemon.PacketScan, "SESSION_IDLE", 0.5)
+
+    # switch isn't pinged
+    monkeypatch.setattr(scan_daemon.Reachability, "check", lambda ipaddresses, quick=False: {})
+
+    # socket of dead daemon refuses client, which scans directly then, and is removed by new daemon
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as dead:
+        dead.bind(str(tmp_path / "scan.sock"))
+    assert not packet.attach(str(tmp_path / "scan.sock"), [fake_usernum])
+
+    # run daemon in background
+    daemon = ScanDaemon(str(tmp_path / "scan.sock"), interval=0.01)
+    thread = threading.Thread(target=daemon.serve)
+    thread.start()
+    try:
+        # subscribe and get answer and first line
+        client = ScanClient(str(tmp_path / "scan.sock"))
+        client.subscribe([fake_usernum, 99999])
+        lines = client.lines()
+        assert [next(lines), next(lines)] == ["ok 12345 192.168.1.100 5\n", "error 99999 user not found in the database\n"]
+        assert next(lines) == "12345 8 8 16 16\n"
+
+        # session stays warm after unsubscribing, so subscribing again doesn't log in
+        client.unsubscribe([fake_usernum])
+        threading.Event().wait(0.1)
+        assert fake_session.ports == [5]
+        client.subscribe([fake_usernum])
+        assert next(line for line in lines if line.startswith("ok")) == "ok 12345 192.168.1.100 5\n"
+        assert next(lines) == "12345 8 8 16 16\n"
+        assert logins == ["192.168.1.100"]
+
+        # switch closed session while nobody watched, returning client gets lines by new connection
+        client.unsubscribe([fake_usernum])
+        threading.Event().wait(0.1)
+        fake_session.alive = False
+        client.subscribe([fake_usernum])
+        assert next(line for line in lines if line.startswith("ok")) == "ok 12345 192.168.1.100 5\n"
+        assert next(lines) == "12345 8 8 16 16\n"
+        assert logins == ["192.168.1.100", "192.168.1.100"]
+        assert fake_session.ports == [5]
+
+        # the second daemon doesn't take socket of running one
+        with pytest.raises(MyException, match="сокет уже занят"):
+            ScanDaemon(str(tmp_path / "scan.sock"))
+
+        # switch's port is left after idle time when client leaves
+        client.close()
+        for _ in range(300):
+            if not fake_session.ports:
+                break
+            threading.Event().wait(0.01)
+        assert fake_session.ports == []
+    finally:
+        daemon.shutdown()
+        thread.join()
+
+# test pool reuses released connection, is bounded and drops dead connections
+def test_connection_pool():
+    # mock connection which may die
+    class FakeConnection:
+        def __init__(self):
+            self.open = True
+            self.alive = True
+        def ping(self, reconnect=False):
+            if not self.alive:
+                raise ConnectionError
+        def close(self):
+            self.open = False
+    created = []
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+    pool = ConnectionPool(connect, max_size=1, check_after=0, timeout=0.05)
+
+    # released connection is taken again, second one isn't opened over limit
+    connection = pool.acquire()
+    pool.release(connection)
+    assert pool.acquire() is connection
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    # connection was closed by server while idle, health check opens new one
+    pool.release(connection)
+    connection.alive = False
+    assert pool.acquire() is created[1]
+    assert len(created) == 2 and not connection.open
+
+# test topology cache serves repeated lookups from memory and snapshot, and old data when database fails
+def test_topology_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(TopologyCache, "_TopologyCache__entries", OrderedDict())
+    monkeypatch.setattr(TopologyCache, "_TopologyCache__snapshot_path", str(tmp_path / "topology.sqlite"))
+    queries = []
+    def query(usernums):
+        queries.append(usernums)
+        return {usernum: dict(fake_data[usernum]) for usernum in usernums if usernum in fake_data}
+
+    # database is asked once, not found user is asked again
+    assert TopologyCache.get_switch_ports([fake_usernum, 99999], query) == fake_data
+    assert TopologyCache.get_switch_ports([fake_usernum], query) == fake_data
+    assert queries == [[fake_usernum, 99999]]
+
+    # new process reads snapshot
+    monkeypatch.setattr(TopologyCache, "_TopologyCache__entries", OrderedDict())
+    assert TopologyCache.get_switch_ports([fake_usernum], query) == fake_data
+    assert len(queries) == 1
+
+    # expired data is used only if database fails
+    def failed_query(usernums):
+        raise TimeoutError
+    monkeypatch.setattr(TopologyCache, "_TopologyCache__ttl", -1)
+    assert TopologyCache.get_switch_ports([fake_usernum], failed_query) == fake_data
+    with pytest.raises(TimeoutError):
+        TopologyCache.get_switch_ports([99999], failed_query)
+
+# test users of switch are indexed by port and ports are ranked by traffic
+def test_switch_scan_ranking(monkeypatch):
+    # two users share port 7, another switch is not scanned
+    switch_data = {1: {"switchP": "192.168.1.100", "PortP": 7},
+                   2: {"switchP": "192.168.1.100", "PortP": 3},
+                   3: {"switchP": "192.168.1.100", "PortP": 7},
+                   4: {"switchP": "192.168.1.101", "PortP": 1}}
+    index = SwitchIndex(switch_data)
+    assert index.ports("192.168.1.100") == {3: [2], 7: [1, 3]}
+    assert index.users("192.168.1.100", 7) == [1, 3]
+
+    # fake database returning users of switch
+    class SwitchDB(FakeDatabaseManager):
+        def get_switch_users(self, switch):
+            return {usernum: row for usernum, row in self.test_data.items() if row["switchP"] == switch}
+    monkeypatch.setattr("switch_scan_handler.DatabaseManager", lambda: SwitchDB(switch_data))
+
+    # port 3 has more rx, port 7 more in total
+    handler = SwitchScanHandler("192.168.1.100", sort="rx")
+    handler._SwitchScanHandler__get_users()
+    monitors = {monitor.port: monitor for monitor in handler._SwitchScanHandler__monitors}
+    monitors[3].update(2 * 1024 * 1024, 0)
+    monitors[7].update(1024 * 1024, 4 * 1024 * 1024)
+    assert [monitor.port for monitor in handler._ranked()] == [3, 7]
+    assert handler._format_table().splitlines()[2].split() == ["3", "16", "16", "0", "0", "2"]
+    handler._SwitchScanHandler__sort = "total"
+    assert [monitor.port for monitor in handler._ranked()] == [7, 3]
+
+# test samples encoded as text lines, struct records and json lines
+def test_sample_encoders():
+    monitor = PortMonitor(fake_usernum, 5)
+    monitor.update_counters(1000, 2000, 0)
+    monitor.update_counters(1000 + 1024 * 1024, 2000 + 2 * 1024 * 1024, 10 ** 9)
+
+    # text is the same as bash script reads it
+    assert get_encoder("text").encode(monitor) == b"8 8 16 16\n"
+    assert get_encoder("text", with_usernum=True).encode_batch([monitor, monitor]) == b"12345 8 8 16 16\n" * 2
+
+    # struct record keeps time, port and both counters and rates
+    record = get_encoder("struct").encode(monitor)
+    assert len(record) == StructEncoder.RECORD.size
+    assert StructEncoder.RECORD.unpack(record) == (10 ** 9, fake_usernum, 5, 1000 + 1024 * 1024, 2000 + 2 * 1024 * 1024,
+                                                   1024 * 1024, 2 * 1024 * 1024)
+
+    # json line
+    sample = json.loads(get_encoder("ndjson").encode(monitor))
+    assert (sample["usernum"], sample["port"], sample["rx_bytes"], sample["max_tx_megabit"]) == (fake_usernum, 5, 1024 * 1024, 16)
+
+# test writer doesn't wait for reader, keeps only the newest samples and gives them to reader when it appears
+def test_pipe_writer(tmp_path):
+    path = str(tmp_path / "pipe")
+    os.mkfifo(path)
+    pipe = PipeWriter(path, capacity=3)
+    try:
+        # nobody reads, the oldest samples are dropped without blocking
+        for sample in range(5):
+            pipe.put(f"{sample}\n".encode())
+        assert pipe.get_stats()["dropped"] == 2
+
+        # reader appears and gets the newest samples
+        reader = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        data = b""
+        for _ in range(100):
+            try:
+                data += os.read(reader, 100)
+            except BlockingIOError:
+                pass
+            if data.count(b"\n") == 3:
+                break
+            time.sleep(0.01)
+        os.close(reader)
+        assert data == b"2\n3\n4\n"
+        assert pipe.get_stats() == {"written": 3, "dropped": 2, "attached": 1}
+    finally:
+        pipe.close()
+
+    # reader doesn't take the rest in time on close, it's counted as dropped
+    pipe = PipeWriter(path, capacity=256)
+    reader = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        for _ in range(100):
+            pipe.put(b"x" * 4096)
+        pipe.close(timeout=0.2)
+        stats = pipe.get_stats()
+        assert stats["dropped"] > 0
+        assert stats["written"] + stats["dropped"] == 100
+    finally:
+        os.close(reader)
+
+    # no reader at all on close
+    pipe = PipeWriter(path, capacity=3)
+    for sample in range(5):
+        pipe.put(f"{sample}\n".encode())
+    pipe.close()
+    assert pipe.get_stats() == {"written": 0, "dropped": 5, "attached": 0}
+
+    # unset PIPE variable is an error at once, not samples silently lost by writing thread
+    with pytest.raises(MyException):
+        PipeWriter(None)
+
+# test history keeps only last samples and gives statistics of window
+def test_port_history():
+    monitor = PortMonitor(fake_usernum, 5)
+    monitor.history = PortHistory(4)
+    second = 10 ** 9
+
+    # 6 samples, only last 4 are kept: 3, 4, 5, 6 megabit rx, twice more tx
+    for sample in range(1, 7):
+        monitor.update(sample * 1024 * 1024 // 8, sample * 1024 * 1024 // 4, sample * second)
+    assert len(monitor.history) == 4
+    stats = monitor.statistics()
+    assert (stats["samples"], stats["seconds"]) == (4, 3.0)
+    assert (stats["rx_avg"], stats["rx_p95"], stats["rx_min"], stats["rx_max"]) == (4, 6, 3, 6)
+    assert (stats["tx_min"], stats["tx_max"]) == (6, 12)
+
+    # last 1 second has 2 samples
+    stats = monitor.statistics(1)
+    assert (stats["samples"], stats["rx_min"], stats["rx_max"]) == (2, 5, 6)
+    assert monitor.max_rx_megabit == 6
+
+# test recorded samples are read back in order, with unfinished block after sync and rotation by size
+def test_sample_recorder(tmp_path):
+    monitor = PortMonitor(fake_usernum, 5)
+    recorder = SampleRecorder(str(tmp_path), fake_usernum, 5, block_samples=4, max_bytes=SampleRecorder.HEADER.size + 2 * (8 + 5 * 8 * 4))
+
+    # 10 samples: two full blocks in first file, then file is rotated and last 2 samples are in unfinished block
+    for sample in range(1, 11):
+        monitor.rx_total, monitor.tx_total = sample * 100, sample * 200
+        monitor.update(sample, 2 * sample, sample * 10 ** 9)
+        recorder.append(monitor)
+    recorder.close()
+
+    samples = []
+    for path in sorted(tmp_path.iterdir()):
+        reader = RecordReader(str(path))
+        assert (reader.usernum, reader.port) == (fake_usernum, 5)
+        samples.extend(reader)
+        reader.close()
+    assert len(samples) == 10
+    assert [sample[1:] for sample in samples] == [(n * 100, n * 200, n, 2 * n) for n in range(1, 11)]
+    assert all(later[0] - earlier[0] == 10 ** 9 for earlier, later in zip(samples, samples[1:]))
+
+    # other files are refused
+    (tmp_path / "other").write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        RecordReader(str(tmp_path / "other"))
+
+    # empty file can't be mapped
+    (tmp_path / "empty").write_bytes(b"")
+    with pytest.raises(MyException, match="файл записи пуст"):
+        RecordReader(str(tmp_path / "empty"))
+
+# test replayed samples come to pipe with monotonic time of replay like scanned ones
+def test_replay_handler(tmp_path, monkeypatch):
+    monitor = PortMonitor(fake_usernum, 5)
+    recorder = SampleRecorder(str(tmp_path / "records"), fake_usernum, 5, block_samples=2)
+    for sample in range(1, 5):
+        monitor.update(sample, 2 * sample, sample * 10 ** 9)
+        recorder.append(monitor)
+    recorder.close()
+
+    # pipe keeps written samples
+    class FakePipe:
+        chunks = []
+        def __init__(self, path):
+            pass
+        def put(self, chunk, wait=False):
+            self.chunks.append(chunk)
+        def flush(self):
+            pass
+        def close(self):
+            pass
+        def report(self):
+            pass
+    monkeypatch.setattr(replay_handler, "PipeWriter", FakePipe)
+
+    # samples are replayed without pauses
+    started = time.monotonic_ns()
+    ReplayHandler(str(next((tmp_path / "records").iterdir())), 0, "ndjson").replay()
+    finished = time.monotonic_ns()
+    data = b"".join(FakePipe.chunks)
+    samples = [json.loads(line) for line in data.splitlines()]
+    assert [sample["tx_bytes"] for sample in samples] == [2, 4, 6, 8]
+    assert all(started <= sample["timestamp_ns"] <= finished for sample in samples)
+
+# test every recorded sample reaches slow reader of real pipe, though there are more of them than pipe writer keeps
+def test_replay_handler_pipe(tmp_path, monkeypatch):
+    monitor = PortMonitor(fake_usernum, 5)
+    recorder = SampleRecorder(str(tmp_path / "records"), fake_usernum, 5)
+    for sample in range(1, 1001):
+        monitor.update(sample, 2 * sample, sample * 10 ** 9)
+        recorder.append(monitor)
+    recorder.close()
+
+    path = str(tmp_path / "pipe")
+    os.mkfifo(path)
+    monkeypatch.setattr(replay_handler.PacketScan, "PIPE", path)
+
+    # reader comes late and reads slowly
+    lines = []
+    def read():
+        time.sleep(0.2)
+        with open(path, "rb", buffering=0) as pipe:
+            data = b""
+            while chunk := pipe.read(512):
+                data += chunk
+                time.sleep(0.001)
+        lines.extend(data.splitlines())
+    reader = threading.Thread(target=read)
+    reader.start()
+
+    ReplayHandler(str(next((tmp_path / "records").iterdir())), 0, "ndjson").replay()
+    reader.join(10)
+    assert [json.loads(line)["tx_bytes"] for line in lines] == [2 * sample for sample in range(1, 1001)]
+
+# test telnet commands are answered and stripped from data, also when split between reads, and waiting ends by timeout and eof
+def test_async_telnet_session():
+    TTYPE = 24
+    answers = []
+
+    # server negotiates options around prompt, then waits and closes connection
+    async def serve(reader, writer):
+        for chunk in [bytes((IAC, WILL, ECHO, IAC, DO, TTYPE)) + b"User", bytes((IAC,)), bytes((IAC,)) + b"Na" + bytes((IAC,)),
+                      bytes((WILL,)), bytes((SGA, IAC, SB, TTYPE, 1, IAC, SE, IAC, DONT, ECHO)) + b"me:"]:
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(0.02)
+        answers.append(await asyncio.wait_for(reader.readexactly(9), 2))
+        await asyncio.sleep(0.3)
+        writer.write(b"bye\r\nDES-3028")
+        writer.close()
+
+    async def session() -> tuple:
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            telnet = await AsyncTelnetSession.connect("127.0.0.1", port, timeout=2)
+
+            # escaped 255 is data, commands are gone from output
+            index = await telnet.expect(["Password:", "Name:"])
+            found = (index, telnet.before, telnet.after)
+
+            # nothing comes for a while
+            with pytest.raises(TimeoutError):
+                await telnet.expect("#", timeout=0.1)
+
+            # connection closed without prompt
+            with pytest.raises(EOFError):
+                await telnet.expect_parser(switch_parser.PacketParser(b"#"))
+            alive = telnet.isalive()
+            with pytest.raises(EOFError):
+                await telnet.expect("#")
+            await telnet.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+        return found, alive
+
+    found, alive = asyncio.run(session())
+    assert found == (1, b"User\xff", b"Name:")
+    assert not alive
+
+    # echo and suppress go ahead are accepted, everything else refused
+    assert answers == [bytes((IAC, DO, ECHO, IAC, WONT, TTYPE, IAC, DO, SGA))]
+
+# test real telnet session, model probe and parsing against simulated cli of every model
+def test_switch_simulator(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModelCache, "_ModelCache__path", str(tmp_path / "models.json"))
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__path", str(tmp_path / "health.json"))
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__entries", None)
+    monkeypatch.setenv("NET_USER", "admin")
+    monkeypatch.setenv("NET_PASSWORD", "admin")
+
+    # free port for all simulated addresses
+    with socket.socket() as probe:
+        probe.bind(("127.0.1.1", 0))
+        port = probe.getsockname()[1]
+    monkeypatch.setattr(CitySwitch, "TELNET_PORT", port)
+    switches = SwitchSimulator.addresses(4, ["DES-3028", "DES-3200-28", "DGS-3120-24TC", "DGS-3630-28SC"])
+
+    async def scan() -> dict[str, tuple]:
+        simulator = SwitchSimulator(switches, port, seed=1)
+        await simulator.start()
+        found = {}
+        try:
+            for ip, model in switches.items():
+                # L3 switch is only probed
+                if model == "DGS-3630-28SC":
+                    switch = AsyncBaseSwitch(ip, "L3 switch", False, 2)
+                    await switch.connect()
+                    found[ip] = (switch._model,)
+                else:
+                    switch = await AsyncL2Switch.create(ip, timeout=2)
+                    first = await switch.get_packets_ports([1, 3], counters=True)
+                    second = await switch.get_packets_ports([1, 3], counters=True)
+                    found[ip] = (switch._model, switch.get_default_gateway(), await switch.get_packets_port(2), first, second)
+                await switch.close()
+        finally:
+            await simulator.close()
+        return found
+
+    found = asyncio.run(scan())
+    assert [result[0] for result in found.values()] == ["DES-3028", "DES-3200-28", "DGS-3120-24TC", "DGS-3630-28SC"]
+    for result in list(found.values())[:3]:
+        _, gateway, rates, first, second = result
+        assert gateway == "127.0.1.1"
+        assert all(rate > 0 for rate in rates)
+
+        # both ports even from dynamic page, counters only grow
+        assert sorted(first) == sorted(second) == [1, 3]
+        assert all(second[port][direction] >= first[port][direction] for port in (1, 3) for direction in (0, 1))
+
+# test phases are timed by model and exported in prometheus format over http
+def test_timings():
+    Timings.reset()
+    for seconds in (0.002, 0.02, 0.2):
+        Timings.observe("poll", "DES-3028", seconds)
+    with Timings.span("connect") as span:
+        span.model = "DES-3200-28"
+    server = Timings.serve(0)
+    try:
+        text = urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics").read().decode()
+    finally:
+        Timings.stop()
+    assert 'packet_scan_phase_seconds_bucket{phase="poll",model="DES-3028",le="0.0025"} 1' in text
+    assert 'packet_scan_phase_seconds_bucket{phase="poll",model="DES-3028",le="0.25"} 3' in text
+    assert 'packet_scan_phase_seconds_bucket{phase="poll",model="DES-3028",le="+Inf"} 3' in text
+    assert 'packet_scan_phase_seconds_count{phase="connect",model="DES-3200-28"} 1' in text
+    Timings.reset()
+
+# test switches are pinged at once and classified like after failed connection, unknown ones are left for connection
+def test_reachability(monkeypatch):
+    losses = {"10.0.0.1": 0.0, "10.0.0.2": 1.0, "10.0.0.3": 0.5}
+    pinged = []
+    async def fake_ping(ipaddress, count, timeout, interval, privileged):
+        pinged.append(ipaddress)
+        if ipaddress not in losses:
+            raise PermissionError("no icmp sockets")
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(packet_loss=losses[ipaddress])
+    monkeypatch.setattr(icmplib, "async_ping", fake_ping)
+
+    # all at once, not one after another
+    started = time.monotonic()
+    found = Reachability.check(["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"])
+    assert time.monotonic() - started < 0.15
+    assert found == losses
+    assert [Reachability.get_error(found.get(ip)) for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4")] == [None, "NOT_AVAILABLE", "FREEZES", None]
+
+    # result is used by connection instead of pinging again
+    assert Reachability.get("10.0.0.2") == 1.0
+    assert Reachability.get("10.0.0.4") is None
+
+    # quick check sends one packet, its lost packet isn't remembered as unavailable switch
+    counts = []
+    async def quick_ping(ipaddress, count, timeout, interval, privileged):
+        counts.append((count, timeout))
+        return SimpleNamespace(packet_loss=losses[ipaddress])
+    monkeypatch.setattr(icmplib, "async_ping", quick_ping)
+    monkeypatch.setattr(Reachability, "_Reachability__losses", {})
+    assert Reachability.check(["10.0.0.1", "10.0.0.2"], quick=True) == {"10.0.0.1": 0.0, "10.0.0.2": 1.0}
+    assert counts == [(1, CitySwitch.PING_QUICK_TIMEOUT)] * 2
+    assert Reachability.get("10.0.0.1") == 0.0
+    assert Reachability.get("10.0.0.2") is None
+
+# test timeouts are learned from connection latencies and repeatedly failing switch fails fast with its error
+def test_switch_health(tmp_path, monkeypatch):
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__path", str(tmp_path / "health.json"))
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__entries", None)
+
+    # unknown switch gets full timeout, fast one the lowest, slow one more, retry never less than full
+    assert SwitchHealth.timeout("10.0.1.1") == CitySwitch.CONNECT_TIMEOUT
+    for _ in range(20):
+        SwitchHealth.observe("10.0.1.1", 0.02)
+        SwitchHealth.observe("10.0.1.2", 1.5)
+    assert SwitchHealth.timeout("10.0.1.1") == CitySwitch.CONNECT_TIMEOUT_MIN
+    assert 1.5 < SwitchHealth.timeout("10.0.1.2") < 3
+    assert SwitchHealth.timeout("10.0.1.1", retry=True) == CitySwitch.CONNECT_TIMEOUT
+
+    # commands get learned timeout too, but not shorter than their min
+    assert SwitchHealth.command_timeout("10.0.1.9") == CitySwitch.CONNECT_TIMEOUT
+    assert SwitchHealth.command_timeout("10.0.1.1") == CitySwitch.COMMAND_TIMEOUT_MIN
+
+    # breaker opens after failures in a row only and survives restart
+    for _ in range(CitySwitch.BREAKER_FAILURES - 1):
+        SwitchHealth.failure("10.0.1.3", "NOT_AVAILABLE")
+    assert SwitchHealth.check("10.0.1.3") is None
+    SwitchHealth.failure("10.0.1.3", "NOT_AVAILABLE")
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__entries", None)
+    assert SwitchHealth.check("10.0.1.3") == "NOT_AVAILABLE"
+
+    # connection fails fast with the error of device type without connecting
+    switch = AsyncBaseSwitch("10.0.1.3", "L2 switch", False, 5)
+    started = time.monotonic()
+    with pytest.raises(MyException) as error:
+        asyncio.run(switch.connect())
+    assert "L2: свитч недоступен" in str(error.value)
+    assert time.monotonic() - started < 0.5
+
+    # after cooldown one connection is tried, others still fail fast, success closes breaker
+    monkeypatch.setattr(CitySwitch, "BREAKER_COOLDOWN", 0)
+    assert SwitchHealth.check("10.0.1.3") is None
+    monkeypatch.setattr(CitySwitch, "BREAKER_COOLDOWN", 60)
+    assert SwitchHealth.check("10.0.1.3") == "NOT_AVAILABLE"
+    SwitchHealth.observe("10.0.1.3", 0.05)
+    assert SwitchHealth.check("10.0.1.3") is None
+
+    # switch hanging after login prompt fails with its error and opens breaker, though it connects every time
+    async def hang(reader, writer):
+        writer.write(b"UserName:")
+        await reader.read()
+        writer.close()
+    async def login() -> str:
+        server = await asyncio.start_server(hang, "127.0.0.1", 0)
+        monkeypatch.setattr(CitySwitch, "TELNET_PORT", server.sockets[0].getsockname()[1])
+        try:
+            with pytest.raises(MyException) as error:
+                await AsyncBaseSwitch("127.0.0.1", "L2 switch", False, 0.1).connect()
+        finally:
+            server.close()
+        return str(error.value)
+    for _ in range(CitySwitch.BREAKER_FAILURES):
+        assert "L2: свитч зависает" in asyncio.run(login())
+    assert SwitchHealth.check("127.0.0.1") == "FREEZES"
+
+# test self-refreshing page is streamed redraw by redraw through control sequences and quit only when streaming stops
+def test_live_page_stream(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModelCache, "_ModelCache__path", str(tmp_path / "models.json"))
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__path", str(tmp_path / "health.json"))
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__entries", None)
+    monkeypatch.setattr(switch_simulator, "REFRESH", 0.05)
+    monkeypatch.setenv("NET_USER", "admin")
+    monkeypatch.setenv("NET_PASSWORD", "admin")
+    with socket.socket() as probe:
+        probe.bind(("127.0.1.1", 0))
+        port = probe.getsockname()[1]
+    monkeypatch.setattr(CitySwitch, "TELNET_PORT", port)
+    switches = SwitchSimulator.addresses(1, ["DES-3200-28"])
+
+    async def stream() -> tuple[list, tuple]:
+        simulator = SwitchSimulator(switches, port, seed=1)
+        await simulator.start()
+        try:
+            switch = await AsyncL2Switch.create(next(iter(switches)), timeout=2)
+            assert switch.has_live_page()
+
+            # several redraws of one command
+            samples = []
+            redraws = switch.stream_packets_port(2, counters=True)
+            async for sample in redraws:
+                samples.append(sample)
+                if len(samples) == 4:
+                    break
+            await redraws.aclose()
+
+            # session is at prompt again
+            after = await switch.get_packets_port(2)
+            await switch.close()
+        finally:
+            await simulator.close()
+        return samples, after
+
+    samples, after = asyncio.run(stream())
+    assert all(second[0] >= first[0] and second[1] >= first[1] for first, second in zip(samples, samples[1:]))
+    assert samples[-1][0] > samples[0][0]
+    assert all(rate > 0 for rate in after)
+
+# test snmp counters by getbulk against agent stand-in, with fallback to cli when agent doesn't answer
+def test_snmp_counters(tmp_path, monkeypatch):
+    # codec keeps 64-bit counters and long oids
+    message = Message(b"public", snmp_ber.RESPONSE, 7, 0, 0, [VarBind(commands.IF_HC_IN_OCTETS + (200,), snmp_ber.COUNTER64, 2 ** 64 - 1)])
+    assert snmp_ber.decode_message(snmp_ber.encode_message(message)) == message
+
+    monkeypatch.setattr(ModelCache, "_ModelCache__path", str(tmp_path / "models.json"))
+    monkeypatch.setattr(ModelCache, "_ModelCache__entries", None)
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__path", str(tmp_path / "health.json"))
+    monkeypatch.setattr(SwitchHealth, "_SwitchHealth__entries", None)
+    monkeypatch.setenv("NET_USER", "admin")
+    monkeypatch.setenv("NET_PASSWORD", "admin")
+    with socket.socket() as probe, socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_probe:
+        probe.bind(("127.0.1.1", 0))
+        udp_probe.bind(("127.0.1.1", 0))
+        port, snmp_port = probe.getsockname()[1], udp_probe.getsockname()[1]
+    monkeypatch.setattr(CitySwitch, "TELNET_PORT", port)
+    monkeypatch.setattr(CitySwitch, "SNMP_PORT", snmp_port)
+    monkeypatch.setattr(CitySwitch, "SNMP_TIMEOUT", 0.2)
+    switches = SwitchSimulator.addresses(2, ["DGS-3120-24TC"])
+
+    async def scan() -> tuple:
+        simulator = SwitchSimulator(switches, port, seed=1)
+        # the second switch has no agent, small responses make client ask the rest of ports
+        agent = SnmpAgent({ip: switch for ip, switch in simulator.get_switches().items() if ip == "127.0.1.1"}, snmp_port,
+                          max_varbinds=6)
+        await simulator.start()
+        await agent.start()
+        try:
+            # snmp is turned on explicitly, counters of all ports by snmp only, rates after the first poll
+            switch = await AsyncL2Switch.create("127.0.1.1", timeout=2, snmp=True)
+            first = await switch.get_packets_ports([1, 5, 24], counters=True)
+            rates = await switch.get_packets_ports([1, 5, 24])
+            rates = await switch.get_packets_ports([1, 5, 24])
+            by_snmp = switch.uses_snmp()
+            await switch.close()
+
+            # switch without answer is read by cli, next session doesn't wait for agent again
+            fallback = await AsyncL2Switch.create("127.0.1.2", timeout=2, snmp=True)
+            counters = await fallback.get_packets_ports([1, 2], counters=True)
+            by_cli = not fallback.uses_snmp()
+            await fallback.close()
+            again = await AsyncL2Switch.create("127.0.1.2", timeout=2, snmp=True)
+            by_cli = by_cli and not again.uses_snmp() and SwitchHealth.snmp_failed("127.0.1.2")
+            await again.close()
+        finally:
+            await agent.close()
+            await simulator.close()
+        return first, rates, by_snmp, counters, by_cli, agent.requests, simulator.commands
+
+    first, rates, by_snmp, counters, by_cli, requests, cli_commands = asyncio.run(scan())
+    assert by_snmp and by_cli
+    assert sorted(first) == [1, 5, 24] and all(value > 10 ** 9 for packets in first.values() for value in packets)
+    assert all(value > 0 for packets in rates.values() for value in packets)
+    assert sorted(counters) == [1, 2]
+
+    # counters in several requests, as every response has 3 rows at most; rates without cli commands
+    assert requests >= 8
+    assert cli_commands < 20
+
+    # plain client sees the end of columns
+    async def walk() -> dict:
+        simulator = SwitchSimulator(switches, port, seed=1)
+        agent = SnmpAgent(simulator.get_switches(), snmp_port)
+        await agent.start()
+        try:
+            client = SnmpClient("127.0.1.2", snmp_port, "public", 0.5, 0)
+            values = await client.async_get_columns([commands.IF_HC_IN_OCTETS, commands.IF_HC_OUT_OCTETS], 20, 40)
+            client.close()
+        finally:
+            await agent.close()
+        return values
+    values = asyncio.run(walk())
+    assert sorted(values[commands.IF_HC_IN_OCTETS]) == sorted(values[commands.IF_HC_OUT_OCTETS]) == [20, 21, 22, 23, 24]
+
+# test plain .env file is read without dotenv, quoted values are left to dotenv, variables of environment are kept
+def test_env_file(tmp_path, monkeypatch):
+    for key in ("PACKET_TEST_A", "PACKET_TEST_B", "PACKET_TEST_C"):
+        monkeypatch.setenv(key, "")
+        monkeypatch.delenv(key)
+    monkeypatch.setenv("PACKET_TEST_B", "kept")
+    path = tmp_path / ".env"
+    path.write_text("# comment\n\nPACKET_TEST_A=/tmp/pipe\nPACKET_TEST_B = two\n")
+    const._load_env_file(str(path))
+    assert (os.environ["PACKET_TEST_A"], os.environ["PACKET_TEST_B"]) == ("/tmp/pipe", "kept")
+
+    path.write_text('PACKET_TEST_C="x # y"\n')
+    const._load_env_file(str(path))
+    assert os.environ["PACKET_TEST_C"] == "x # y"
+
+# test switches are split between worker processes, their samples come into one pipe and crashed worker is restarted alone
+def test_shard_supervisor(tmp_path, monkeypatch):
+    # four switches with one user each, unknown user is skipped
+    data = {usernum: {"switchP": f"10.0.0.{usernum}", "PortP": usernum} for usernum in range(1, 5)}
+    monkeypatch.setattr("shard_supervisor.DatabaseManager", lambda: FakeDatabaseManager(data))
+    monkeypatch.setattr(TopologyCache, "_TopologyCache__entries", OrderedDict())
+    monkeypatch.setattr(shard_supervisor, "run_shard", fake_run_shard)
+    monkeypatch.setattr(PacketScan, "WORKER_RESTART", 0.1)
+    path = str(tmp_path / "pipe")
+    os.mkfifo(path)
+    monkeypatch.setattr(PacketScan, "PIPE", path)
+
+    # users whose lines come until all of them are seen
+    reader = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    def read_users() -> set[int]:
+        users, data = set(), b""
+        deadline = time.monotonic() + 30
+        while len(users) < 4 and time.monotonic() < deadline:
+            try:
+                data += os.read(reader, 65536)
+            except BlockingIOError:
+                time.sleep(0.01)
+            lines = data.split(b"\n")
+            data = lines.pop()
+            users.update(int(line.split()[0]) for line in lines)
+        return users
+
+    supervisor = ShardSupervisor([1, 2, 3, 4, 99999], workers=2)
+    thread = threading.Thread(target=supervisor.check_packet)
+    thread.start()
+    try:
+        assert read_users() == {1, 2, 3, 4}
+        assert supervisor.get_shards() == [[1, 3], [2, 4]]
+
+        # killed worker is started again, the other one keeps its process
+        pids = supervisor.get_workers()
+        os.kill(pids[0], signal.SIGKILL)
+        deadline = time.monotonic() + 30
+        while supervisor.get_workers().get(0) in (None, pids[0]) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        workers = supervisor.get_workers()
+        assert workers[0] != pids[0] and workers[1] == pids[1]
+        assert read_users() == {1, 2, 3, 4}
+    finally:
+        supervisor.stop()
+        thread.join(30)
+        os.close(reader)
+
+    # workers exit and are cleaned up
+    assert not thread.is_alive()
+    assert supervisor.get_workers() == {}
+
+# test real worker scans simulated switches, sends samples to supervisor's end of pipe and exits when supervisor goes away
+@pytest.mark.skipif(shutil.which("telnet") is None, reason="switch sessions need telnet client")
+def test_shard_worker(tmp_path, monkeypatch):
+    # worker process reads settings from environment
+    with socket.socket() as probe:
+        probe.bind(("127.0.1.1", 0))
+        port = probe.getsockname()[1]
+    monkeypatch.setenv("TELNET_PORT", str(port))
+    monkeypatch.setenv("NET_USER", "admin")
+    monkeypatch.setenv("NET_PASSWORD", "admin")
+    monkeypatch.setenv("MODEL_CACHE", str(tmp_path / "models.json"))
+    monkeypatch.setenv("SWITCH_HEALTH", str(tmp_path / "health.json"))
+    monkeypatch.setenv("TOPOLOGY_SNAPSHOT", "")
+
+    # simulated switches answer in event loop of background thread
+    switches = SwitchSimulator.addresses(2, ["DES-3028"])
+    simulator = SwitchSimulator(switches, port, seed=1)
+    loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+    loop_thread.start()
+    asyncio.run_coroutine_threadsafe(simulator.start(), loop).result(10)
+    try:
+        # one user on every switch
+        rows = {usernum: {"switchP": ip, "PortP": usernum} for usernum, ip in enumerate(switches, 1)}
+        context = multiprocessing.get_context("spawn")
+        reader, writer = context.Pipe(duplex=False)
+        worker = context.Process(target=shard_supervisor.run_shard, args=(rows, writer, 0.1, False, 0, "text", None))
+        worker.start()
+        writer.close()
+
+        # lines of both users come through pipe
+        users = set()
+        deadline = time.monotonic() + 30
+        while users != {1, 2} and time.monotonic() < deadline:
+            if reader.poll(0.1):
+                users.update(int(line.split()[0]) for line in reader.recv_bytes().decode().splitlines())
+        assert users == {1, 2}
+
+        # supervisor is gone, worker leaves its switches and exits successfully
+        reader.close()
+        worker.join(30)
+        assert worker.exitcode == 0
+    finally:
+        asyncio.run_coroutine_threadsafe(simulator.close(), loop).result(10)
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join(10)
+        loop.close()
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+from __future__ import annotations
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING
+# user's modules
+from const import PacketScan
+
+# import as type only, http server is imported when timings are served
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+##### HISTOGRAM OF ONE PHASE OF ONE MODEL #####
+
+class Histogram:
+    # upper bounds of buckets in seconds, the last bucket is infinite
+    BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    counts: list[int]
+    total: float
+    count: int
+
+    def __init__(self) -> None:
+        # observations in every bucket, not cumulative, sum and number of observations
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    # add duration in seconds
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+##### SPAN MEASURING ONE PHASE #####
+
+class Span:
+    phase: str
+    model: str
+    __started: float
+
+    # init by phase and model, model may be set later inside span when it's found out
+    def __init__(self, phase: str, model: str = "") -> None:
+        self.phase = phase
+        self.model = model
+
+    def __enter__(self) -> Span:
+        self.__started = time.perf_counter()
+        return self
+
+    # phase is counted even if it failed, slow failures are the most interesting
+    def __exit__(self, *exception) -> None:
+        Timings.observe(self.phase, self.model, time.perf_counter() - self.__started)
+
+
+##### TIMINGS OF HOT PATH PHASES FOR THE WHOLE PROCESS #####
+
+class Timings:
+    __histograms: dict[tuple[str, str], Histogram] = {}
+    __lock: threading.RLock = threading.RLock()   # reentrant, as dump by signal may interrupt observing in the same thread
+    __server: ThreadingHTTPServer | None = None
+
+    # span of phase to use in "with" block
+    @staticmethod
+    def span(phase: str, model: str = "") -> Span:
+        return Span(phase, model)
+
+    # add duration of phase of model's switch in seconds
+    @classmethod
+    def observe(cls, phase: str, model: str, seconds: float) -> None:
+        with cls.__lock:
+            histogram = cls.__histograms.get((phase, model))
+            if histogram is None:
+                histogram = cls.__histograms[(phase, model)] = Histogram()
+            histogram.observe(seconds)
+
+    # forget all timings
+    @classmethod
+    def reset(cls) -> None:
+        with cls.__lock:
+            cls.__histograms.clear()
+
+    # all histograms in prometheus text format
+    @classmethod
+    def export(cls) -> str:
+        lines = ["# HELP packet_scan_phase_seconds Duration of scan phases by switch model",
+                 "# TYPE packet_scan_phase_seconds histogram"]
+        with cls.__lock:
+            for (phase, model), histogram in sorted(cls.__histograms.items()):
+                labels = f'phase="{phase}",model="{model}"'
+                cumulative = 0
+                for bound, count in zip(Histogram.BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'packet_scan_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"packet_scan_phase_seconds_sum{{{labels}}} {histogram.total!r}")
+                lines.append(f"packet_scan_phase_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    # short table of phases: number and average milliseconds
+    @classmethod
+    def summary(cls) -> str:
+        with cls.__lock:
+            return "\n".join(f"{phase:<8} {model or '-':<16} {histogram.count:>8} x {histogram.total / histogram.count * 1e3:8.3f} ms"
+                             for (phase, model), histogram in sorted(cls.__histograms.items()))
+
+    # print timings for signal, gets signal number and stack frame, output goes to stderr as stdout may be read by script
+    @classmethod
+    def dump(cls, sig: int | None = None, frame: object = None) -> None:
+        sys.stderr.write(cls.export())
+        sys.stderr.flush()
+
+    # serve timings over http on local port in background thread
+    @classmethod
+    def serve(cls, port: int = PacketScan.METRICS_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        from http.server import ThreadingHTTPServer
+        from metrics_request_handler import MetricsRequestHandler
+        cls.__server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        threading.Thread(target=cls.__server.serve_forever, daemon=True).start()
+        return cls.__server
+
+    # stop http server if it's running
+    @classmethod
+    def stop(cls) -> None:
+        if cls.__server is not None:
+            cls.__server.shutdown()
+            cls.__server.server_close()
+            cls.__server = None
+
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import closing
+# user's modules
+from database_manager import SwitchPortData
+from const import Database
+
+
+##### CLASS TO KEEP USERS' SWITCHES AND PORTS BETWEEN LOOKUPS #####
+
+class TopologyCache:
+    __SNAPSHOT_TABLE: str = "CREATE TABLE IF NOT EXISTS topology (Number INTEGER PRIMARY KEY, switchP TEXT, PortP INTEGER, updated REAL)"
+
+    __max_size: int = Database.TOPOLOGY_SIZE
+    __ttl: float = Database.TOPOLOGY_TTL
+    __snapshot_path: str = Database.TOPOLOGY_SNAPSHOT
+    __entries: OrderedDict[int, tuple[float, SwitchPortData]] = OrderedDict()
+    __lock: threading.Lock = threading.Lock()
+
+    # switches and ports of users: fresh ones from memory or snapshot, others by one database query,
+    # if database fails, old data is better than no scan at all, users not found anywhere are absent in result
+    @classmethod
+    def get_switch_ports(cls, usernums: list[int], query: Callable[[list[int]], dict[int, SwitchPortData]]) -> dict[int, SwitchPortData]:
+        now = time.time()
+        found: dict[int, SwitchPortData] = {}
+        stale: dict[int, SwitchPortData] = {}
+
+        # the least recently used users are dropped first
+        with TopologyCache.__lock:
+            for usernum in usernums:
+                entry = TopologyCache.__entries.get(usernum)
+                if entry is None:
+                    continue
+                TopologyCache.__entries.move_to_end(usernum)
+                (found if now - entry[0] <= TopologyCache.__ttl else stale)[usernum] = dict(entry[1])
+
+        # fresh users from snapshot written by previous runs
+        missing = [usernum for usernum in usernums if usernum not in found]
+        if missing:
+            for usernum, (updated, row) in TopologyCache.__read_snapshot(missing).items():
+                if now - updated <= TopologyCache.__ttl:
+                    found[usernum] = row
+                    TopologyCache.__store({usernum: row}, updated)
+                else:
+                    stale.setdefault(usernum, row)
+            missing = [usernum for usernum in missing if usernum not in found]
+        if not missing:
+            return found
+
+        # the rest from database
+        try:
+            rows = query(missing)
+
+        # use old data if database is not available or slow, fail if there is nothing
+        except Exception:
+            old = {usernum: stale[usernum] for usernum in missing if usernum in stale}
+            if not old:
+                raise
+            print("Database is not available, old switches and ports are used")
+            return found | old
+
+        TopologyCache.__store(rows, now)
+        TopologyCache.__write_snapshot(rows, now, replace=False)
+        return found | {usernum: dict(row) for usernum, row in rows.items()}
+
+    # replace cache and snapshot with all users from database, return number of users
+    @classmethod
+    def refresh(cls, rows: dict[int, SwitchPortData]) -> int:
+        now = time.time()
+
+        # users already in memory are updated, removed users are forgotten
+        with TopologyCache.__lock:
+            known = [usernum for usernum in TopologyCache.__entries if usernum in rows]
+            TopologyCache.__entries.clear()
+        TopologyCache.__store({usernum: rows[usernum] for usernum in known}, now)
+        TopologyCache.__write_snapshot(rows, now, replace=True)
+        return len(rows)
+
+    # forget user, e.g. user's port didn't answer as expected
+    @classmethod
+    def invalidate(cls, usernum: int) -> None:
+        with TopologyCache.__lock:
+            TopologyCache.__entries.pop(usernum, None)
+
+    # put users into memory with time of update, the oldest ones over limit are dropped
+    @staticmethod
+    def __store(rows: dict[int, SwitchPortData], updated: float) -> None:
+        with TopologyCache.__lock:
+            for usernum, row in rows.items():
+                TopologyCache.__entries[usernum] = (updated, dict(row))
+                TopologyCache.__entries.move_to_end(usernum)
+            while len(TopologyCache.__entries) > TopologyCache.__max_size:
+                TopologyCache.__entries.popitem(last=False)
+
+    # users from snapshot with time of update, snapshot is optional
+    @staticmethod
+    def __read_snapshot(usernums: list[int]) -> dict[int, tuple[float, SwitchPortData]]:
+        if not TopologyCache.__snapshot_path:
+            return {}
+        try:
+            # connection as context manager only commits, so it's closed separately
+            with closing(sqlite3.connect(TopologyCache.__snapshot_path)) as connection:
+                connection.execute(TopologyCache.__SNAPSHOT_TABLE)
+                cursor = connection.execute(f"SELECT Number, switchP, PortP, updated FROM topology WHERE Number IN ({', '.join('?' * len(usernums))})",
+                                            usernums)
+                return {usernum: (updated, SwitchPortData(switchP=switch, PortP=port)) for usernum, switch, port, updated in cursor}
+        except sqlite3.Error:
+            return {}
+
+    # save users into snapshot, all users are replaced on bulk refresh
+    @staticmethod
+    def __write_snapshot(rows: dict[int, SwitchPortData], updated: float, replace: bool) -> None:
+        if not TopologyCache.__snapshot_path:
+            return
+        try:
+            with closing(sqlite3.connect(TopologyCache.__snapshot_path)) as connection, connection:
+                connection.execute(TopologyCache.__SNAPSHOT_TABLE)
+                if replace:
+                    connection.execute("DELETE FROM topology")
+                connection.executemany("INSERT OR REPLACE INTO topology VALUES (?, ?, ?, ?)",
+                                       [(usernum, row["switchP"], row["PortP"], updated) for usernum, row in rows.items()])
+        except sqlite3.Error:
+            pass